@@ -62,11 +62,12 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 MIDDLEWARE = [
+    "carservice.performance.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "users.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -102,6 +103,130 @@ DATABASES = {
     }
 }
 
+# SQLITE_TUNED=True switches to a WAL-mode SQLite that lets readers run next to a writer and makes concurrent
+# writers queue for the lock instead of failing with "database is locked".
+
+if os.getenv("SQLITE_TUNED") == "True":
+    DATABASES["default"].update({
+        "ENGINE": "Carshering.sqlite",
+        "OPTIONS": {
+            "timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)) / 1000,
+            "transaction_mode": os.getenv("SQLITE_TRANSACTION_MODE", "IMMEDIATE"),
+            "pragmas": {
+                "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+                "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+                "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 2 ** 20)),
+                "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64 * 2 ** 10)),
+            },
+        },
+    })
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[os.getenv("CACHE_BACKEND", "locmem")],
+        "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / "cache" / "django")),
+        "OPTIONS": {
+            "MAX_ENTRIES": 100000,
+        },
+    }
+}
+
+
+# Rendered rent confirmation PDFs, keyed by a hash of their content
+
+RENT_PDF_CACHE_DIR = os.getenv("RENT_PDF_CACHE_DIR", str(BASE_DIR / "cache" / "pdf"))
+
+
+# The facet counts next to the catalogue are recounted in the background (see gunicorn.conf.py): checked every
+# FACET_COUNTS_REFRESH_INTERVAL seconds, recounted when offers or rents changed or after FACET_COUNTS_TIMEOUT
+
+FACET_COUNTS_TIMEOUT = int(os.getenv("FACET_COUNTS_TIMEOUT", 30))
+FACET_COUNTS_REFRESH_INTERVAL = float(os.getenv("FACET_COUNTS_REFRESH_INTERVAL", 5))
+
+
+# Rows of a fleet file imported through the web form; the import_fleet command has no limit
+
+FLEET_IMPORT_MAX_ROWS = int(os.getenv("FLEET_IMPORT_MAX_ROWS", 10000))
+
+
+# Threads rendering the size variants of uploaded images; 0 renders them in the request thread
+
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", 2))
+
+
+# Images a process queues for those threads at most; further uploads get their variants from generate_image_variants
+
+IMAGE_VARIANT_QUEUE = int(os.getenv("IMAGE_VARIANT_QUEUE", 100))
+
+
+# Milliseconds a fresh process may take for django.setup() and the first URL resolution (profile_startup)
+
+STARTUP_BUDGET_MS = int(os.getenv("STARTUP_BUDGET_MS", 1000))
+
+
+# Per-request timing (carservice.performance): a Server-Timing header on every response and a JSON log line
+# for a sample of the requests plus every request slower than PERFORMANCE_LOG_SLOW_MS
+
+PERFORMANCE_SERVER_TIMING = os.getenv("PERFORMANCE_SERVER_TIMING", "True") == "True"
+PERFORMANCE_LOG_SAMPLE_RATE = float(os.getenv("PERFORMANCE_LOG_SAMPLE_RATE", 0.01))
+PERFORMANCE_LOG_SLOW_MS = float(os.getenv("PERFORMANCE_LOG_SLOW_MS", 1000))
+
+
+# Prometheus metrics at /metrics (carservice.metrics). Every process writes its request metrics to a file in
+# METRICS_DIR at most every METRICS_FLUSH_INTERVAL seconds and a scrape sums them (without METRICS_DIR each
+# process exposes its own). The rental gauges are recomputed in the background (see gunicorn.conf.py) by one
+# process when they are older than METRICS_GAUGE_INTERVAL seconds; with METRICS_TOKEN set, scrapes must send it
+# as a bearer token
+
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 1))
+METRICS_GAUGE_INTERVAL = int(os.getenv("METRICS_GAUGE_INTERVAL", 60))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+# Slow query log (carservice.slow_queries): statements slower than SLOW_QUERY_THRESHOLD_MS are written with
+# their origin and query plan to a file per process named after SLOW_QUERY_LOG_FILE (`slow_queries.<pid>.log`);
+# `manage.py slow_queries` summarizes them
+
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG") == "True"
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 100))
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", str(BASE_DIR / "logs" / "slow_queries.log"))
+
+
+# Logging
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "performance": {"class": "logging.StreamHandler", "formatter": "message"},
+        "slow_queries": {
+            "class": "carservice.slow_queries.ProcessRotatingFileHandler",
+            "formatter": "message",
+            "filename": SLOW_QUERY_LOG_FILE,
+            "maxBytes": 10 * 2 ** 20,
+            "backupCount": 5,
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "carservice.performance": {"handlers": ["performance"], "level": "INFO", "propagate": False},
+        "carservice.slow_queries": {"handlers": ["slow_queries"], "level": "WARNING", "propagate": False},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -122,6 +247,25 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Authentication and sessions
+# The users of authenticated requests are cached with their profiles; see users.backends.
+
+AUTHENTICATION_BACKENDS = ["users.backends.CachedModelBackend"]
+
+USER_CACHE_TIMEOUT = int(os.getenv("USER_CACHE_TIMEOUT", 300))
+
+# cached_db reads sessions from the cache and falls back to the database; signed_cookies keeps them in the
+# cookie and needs no storage at all.
+
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+
+SESSION_ENGINE = SESSION_ENGINES[os.getenv("SESSION_BACKEND", "cached_db")]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
 
@@ -143,6 +287,29 @@ STATICFILES_DIRS = [
     BASE_DIR / STATIC_URL, 'static',
 ]
 
+# collectstatic target. With STATIC_PIPELINE=True the files get content hashes in their names and gzip/brotli
+# copies, and carservice.views.static_asset serves them with immutable caching.
+
+STATIC_ROOT = os.getenv("STATIC_ROOT", str(BASE_DIR / "staticfiles"))
+STATIC_PIPELINE = os.getenv("STATIC_PIPELINE") == "True"
+
+# Uploads are stored once per content hash, see carservice.storage.ContentAddressedStorage
+
+MEDIA_URL = "/media/"
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", str(BASE_DIR / "media"))
+
+STORAGES = {
+    "default": {
+        "BACKEND": "carservice.storage.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": (
+            "carservice.staticfiles.CompressedManifestStaticFilesStorage" if STATIC_PIPELINE
+            else "django.contrib.staticfiles.storage.StaticFilesStorage"
+        ),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
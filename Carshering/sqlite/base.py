@@ -0,0 +1,45 @@
+"""
+SQLite backend for concurrent writers.
+
+It is the stock backend plus two OPTIONS that are not sqlite3.connect() arguments:
+
+- `pragmas`: a dict of PRAGMAs run on every new connection, e.g. {"journal_mode": "WAL"}.
+- `transaction_mode`: "DEFERRED" (SQLite's default), "IMMEDIATE" or "EXCLUSIVE", the BEGIN used for atomic
+  blocks. A deferred transaction that reads and then writes can't wait for a busy lock (SQLite returns
+  "database is locked" at once to avoid a deadlock), while an immediate one takes the write lock up front
+  and waits for it up to the connection `timeout`.
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+PRAGMA_VALUE = re.compile(r'^-?[A-Za-z0-9_]+$')
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('pragmas', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas().items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def pragmas(self):
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            if not PRAGMA_VALUE.match(name) or not PRAGMA_VALUE.match(str(value)):
+                raise ImproperlyConfigured(f'Invalid SQLite pragma {name} = {value}.')
+        return pragmas
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode', 'DEFERRED').upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f'Invalid SQLite transaction mode {mode}.')
+        self.cursor().execute(f'BEGIN {mode}')
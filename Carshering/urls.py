@@ -1,14 +1,13 @@
 from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.views.generic import TemplateView
-from django.conf.urls.static import static
 
 from carservice.views import (
     CarCreateView, CarReadView, OfferReadView, OfferCreateView, RentCreateView, CarUpdateView,
     CarDeleteView, OfferUpdateView, OfferDeleteView, RentUpdateView, RentDeleteView, carsearch,
     offer_result, all_offers, rent_panel, rent_detail, offer_detail, offer_detail_search, close_rent, rent_archive,
-    rent_confirmation_pdf
+    rent_confirmation_pdf, CarImportView, media, static_asset, metrics
     )
 
 
@@ -21,6 +20,7 @@ urlpatterns = [
     path('users/', include('users.urls')),
     path('car/create/', CarCreateView.as_view(), name='car_create'),
     path('car/read/', CarReadView.as_view(), name='car_read'),
+    path('car/import/', CarImportView.as_view(), name='car_import'),
     path('car/update/<int:car_id>/', CarUpdateView.as_view(), name='update_car'),
     path('car/delete/<int:pk>/', CarDeleteView.as_view(), name='delete_car'),
     path('offer/create/', OfferCreateView.as_view(), name='offer_create'),
@@ -37,6 +37,8 @@ urlpatterns = [
     path('offer_detail_search/<int:offer_id>/', offer_detail_search, name='offer_detail_search'),
     path('close_rent/<int:rent_id>/', close_rent, name='close_rent'),
     path('rent_archive/', rent_archive, name='rent_archive'),
-    path('rent_confirmation_pdf/<int:rent_id>/', rent_confirmation_pdf, name='rent_confirmation_pdf')
-
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('rent_confirmation_pdf/<int:rent_id>/', rent_confirmation_pdf, name='rent_confirmation_pdf'),
+    path('metrics', metrics, name='metrics'),
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.*)$', media, name='media'),
+    re_path(rf'^{settings.STATIC_URL.lstrip("/")}(?P<path>.*)$', static_asset, name='static_asset'),
+]
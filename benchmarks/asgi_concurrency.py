@@ -0,0 +1,172 @@
+"""
+Compare the read-heavy endpoints served through the WSGI handler and through the ASGI handler with many
+simultaneous clients.
+
+In WSGI mode every client is a thread with its own `Client`, like a threaded server with one thread per
+connection. In ASGI mode every client is a task with its own `AsyncClient` on a single event loop, so the
+views run as coroutines and the async ORM does the queries on Django's shared database thread. Each client
+is signed in up front and then loads the catalogue, an offer page, a search and the rent panel, `--rounds` times.
+
+The data lives in an SQLite file, since an in-memory database is private to the connection that created it.
+
+Usage:
+    python -m benchmarks.asgi_concurrency --clients 500 --rounds 2 --offers 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.utils import print_table, setup_django
+
+
+def prepare(offers, clients):
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from carservice.models import Car, Offer
+
+    owner = User.objects.create(username='owner')
+    cars = Car.objects.bulk_create([
+        Car(vin=f'BENCH{index:012d}', car_mileage=1000, car_brand='Opel', car_model='Astra', user=owner)
+        for index in range(offers)
+    ])
+    offers = Offer.objects.bulk_create([
+        Offer(car=car, price=100.0 + index, user=owner) for index, car in enumerate(cars)
+    ])
+    password = make_password(None)
+    users = User.objects.bulk_create([
+        User(username=f'client{index}', password=password) for index in range(clients)
+    ])
+    return users, [offer.id for offer in offers]
+
+
+def urls(offer_ids, index):
+    from django.urls import reverse
+
+    offer_id = offer_ids[index % len(offer_ids)]
+    return [
+        reverse('all_offers'),
+        reverse('offer_detail', kwargs={'offer_id': offer_id}),
+        reverse('carsearch') + '?search=opel+astra',
+        reverse('rent_panel'),
+    ]
+
+
+def percentile(latencies, share):
+    return sorted(latencies)[min(len(latencies) - 1, int(len(latencies) * share))]
+
+
+def signed_in(client_class, users):
+    # Signing in writes a session, so do it up front rather than with hundreds of concurrent writers.
+    clients = []
+    for user in users:
+        client = client_class()
+        client.force_login(user)
+        clients.append(client)
+    return clients
+
+
+def record(latencies, errors, began, response):
+    latencies.append(time.perf_counter() - began)
+    if response.status_code != 200:
+        errors.append(response.status_code)
+
+
+def run_wsgi(users, offer_ids, rounds):
+    from django.db import connection
+    from django.test import Client
+
+    latencies, errors = [], []
+    clients = signed_in(Client, users)
+    start = threading.Barrier(len(clients) + 1)
+
+    def client_thread(index, client):
+        start.wait()
+        try:
+            for _ in range(rounds):
+                for url in urls(offer_ids, index):
+                    began = time.perf_counter()
+                    record(latencies, errors, began, client.get(url))
+        except Exception as error:
+            errors.append(type(error).__name__)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=client_thread, args=(index, client)) for index, client in enumerate(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    peak_threads = threading.active_count()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - began, latencies, errors, peak_threads
+
+
+def run_asgi(users, offer_ids, rounds):
+    from django.test import AsyncClient
+
+    latencies, errors = [], []
+    clients = signed_in(AsyncClient, users)
+
+    async def client_task(index, client):
+        try:
+            for _ in range(rounds):
+                for url in urls(offer_ids, index):
+                    began = time.perf_counter()
+                    record(latencies, errors, began, await client.get(url))
+        except Exception as error:
+            errors.append(type(error).__name__)
+
+    async def main():
+        await asyncio.gather(*(client_task(index, client) for index, client in enumerate(clients)))
+        return threading.active_count()
+
+    began = time.perf_counter()
+    peak_threads = asyncio.run(main())
+    return time.perf_counter() - began, latencies, errors, peak_threads
+
+
+MODES = {'wsgi': run_wsgi, 'asgi': run_asgi}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=2, help='Page sequences loaded by every client.')
+    parser.add_argument('--offers', type=int, default=200)
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()
+    setup_django(os.path.join(directory.name, 'db.sqlite3'))
+
+    from django.conf import settings
+    from django.db import connection
+
+    settings.ALLOWED_HOSTS = ['*']
+    users, offer_ids = prepare(args.offers, args.clients)
+    connection.close()
+
+    rows = []
+    for mode, run in MODES.items():
+        elapsed, latencies, errors, peak_threads = run(users, offer_ids, args.rounds)
+        rows.append([
+            mode, args.clients, len(latencies), f'{elapsed:.2f}', f'{len(latencies) / elapsed:.0f}',
+            f'{statistics.median(latencies) * 1000:.0f}', f'{percentile(latencies, 0.95) * 1000:.0f}',
+            f'{percentile(latencies, 0.99) * 1000:.0f}', len(errors), peak_threads,
+        ])
+    directory.cleanup()
+
+    print_table(
+        ['mode', 'clients', 'requests', 'seconds', 'requests/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors', 'threads'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Measure booking throughput with many concurrent renters competing for a few hot offers.
+
+Every renter thread repeatedly picks one of the hot offers and a random date range in the two week window
+and books it the way RentCreateView does: lock the offer, check for overlaps, save the rent.
+
+Usage:
+    python -m benchmarks.booking_throughput --renters 32 --offers 4 --attempts 200
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from benchmarks.utils import setup_django, print_table
+
+
+def book(offer_id, user, rent_start, duration):
+    from django.db import transaction
+    from carservice.availability import is_available, rent_end_for
+    from carservice.models import Offer, Rent
+
+    with transaction.atomic():
+        offer = Offer.objects.select_for_update().get(pk=offer_id)
+        if not is_available(offer, rent_start, rent_end_for(rent_start, duration)):
+            return False
+        Rent.objects.create(offer=offer, user=user, rent_start=rent_start, duration=duration)
+        return True
+
+
+def renter(user, offer_ids, attempts, seed, outcomes, lock):
+    from django.db import OperationalError, connection
+    from django.utils.timezone import now
+
+    rng = random.Random(seed)
+    today = now().date()
+    local = Counter()
+    for _ in range(attempts):
+        rent_start = today + timedelta(days=rng.randint(0, 14))
+        try:
+            local['booked' if book(rng.choice(offer_ids), user, rent_start, rng.randint(1, 3)) else 'overlap'] += 1
+        except OperationalError:
+            local['locked'] += 1
+    connection.close()
+    with lock:
+        outcomes.update(local)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--renters', type=int, default=32)
+    parser.add_argument('--offers', type=int, default=4)
+    parser.add_argument('--attempts', type=int, default=200, help='Booking attempts per renter.')
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+    db_file.close()
+    setup_django(db_file.name)
+
+    from django.contrib.auth.models import User
+    from carservice.models import Car, Offer, Rent
+
+    owner = User.objects.create(username='owner')
+    offer_ids = []
+    for index in range(args.offers):
+        car = Car.objects.create(
+            vin=f'BENCH{index:012d}', car_mileage=1000, car_brand='Opel', car_model='Astra', user=owner,
+        )
+        offer_ids.append(Offer.objects.create(car=car, price=100.0, user=owner).id)
+    renters = User.objects.bulk_create([User(username=f'renter{index}') for index in range(args.renters)])
+
+    outcomes = Counter()
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=renter, args=(user, offer_ids, args.attempts, seed, outcomes, lock))
+        for seed, user in enumerate(renters)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    attempts = sum(outcomes.values())
+    print_table(
+        ('renters', 'offers', 'attempts', 'booked', 'overlap', 'locked', 'seconds', 'attempts/s'),
+        [(args.renters, args.offers, attempts, outcomes['booked'], outcomes['overlap'], outcomes['locked'],
+          f'{elapsed:.2f}', f'{attempts / elapsed:.0f}')],
+    )
+
+    overlapping = 0
+    for offer_id in offer_ids:
+        rents = list(Rent.objects.filter(offer_id=offer_id).order_by('rent_start'))
+        overlapping += sum(1 for previous, rent in zip(rents, rents[1:]) if rent.rent_start <= previous.rent_end)
+    print(f'Overlapping bookings found: {overlapping}')
+
+    os.unlink(db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Measure the throughput and peak memory of the bulk fleet import against a file-backed SQLite database.
+Peak memory is traced with tracemalloc, which roughly halves the throughput; the numbers are comparable
+between runs, not with an untraced import.
+
+Usage:
+    python -m benchmarks.fleet_import --sizes 10000,100000,1000000 --batch-size 1000
+"""
+import argparse
+import csv
+import os
+import random
+import string
+import tempfile
+import tracemalloc
+
+from benchmarks.utils import parse_sizes, print_table, setup_django, timer
+
+VIN_CHARACTERS = ''.join(char for char in string.digits + string.ascii_uppercase if char not in 'IOQ')
+BRANDS = ['Volkswagen', 'BMW', 'Audi', 'Ford', 'Opel', 'Toyota', 'Skoda']
+MODELS = ['Astra', 'Golf', 'Corolla', 'Focus', 'Octavia', 'X5']
+
+
+def write_fleet(path, size, rng):
+    from carservice.validators import vin_check_digit
+
+    with open(path, 'w', newline='') as fleet_file:
+        writer = csv.writer(fleet_file)
+        writer.writerow(['vin', 'car_brand', 'car_model', 'car_mileage', 'date_of_prod', 'price', 'description'])
+        for _ in range(size):
+            vin = ''.join(rng.choices(VIN_CHARACTERS, k=17))
+            vin = vin[:8] + vin_check_digit(vin) + vin[9:]
+            has_offer = rng.random() < 0.5
+            writer.writerow([
+                vin, rng.choice(BRANDS), rng.choice(MODELS), rng.randrange(0, 300000), rng.randrange(1995, 2024),
+                rng.randrange(50, 800) if has_offer else '', 'Imported' if has_offer else '',
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=parse_sizes, default=parse_sizes('10000,100000'))
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='fleet-import-')
+    setup_django(os.path.join(directory, 'db.sqlite3'))
+
+    from django.contrib.auth.models import User
+    from carservice.importer import import_fleet, read_rows
+    from carservice.models import Car
+
+    user = User.objects.create_user(username='importer')
+    rng = random.Random(args.seed)
+    rows = []
+    for size in args.sizes:
+        Car.objects.all().delete()
+        path = os.path.join(directory, f'fleet-{size}.csv')
+        write_fleet(path, size, rng)
+
+        results = {}
+        tracemalloc.start()
+        with open(path, newline='') as fleet_file, timer(results, 'import'):
+            result = import_fleet(read_rows(fleet_file, 'csv'), user, batch_size=args.batch_size)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        rows.append([
+            size, result.cars, result.offers, f'{results["import"]:.1f}',
+            f'{size / results["import"]:.0f}', f'{peak / 2 ** 20:.1f}',
+        ])
+
+    print_table(['rows', 'cars', 'offers', 'seconds', 'rows/s', 'peak MiB'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Measure the per-request cost of PerformanceMiddleware by serving the same pages with and without it.
+
+Each page is requested `--repeat` times per mode with a signed-in test client, after a warm-up request that
+fills the caches. The modes alternate in blocks of `--block` requests, so drift in machine load affects both
+alike. Logging is sampled at the default rate.
+
+Usage:
+    python -m benchmarks.instrumentation_overhead --repeat 500 --offers 200
+"""
+import argparse
+import time
+
+from benchmarks.utils import print_table, setup_django
+
+PAGES = ('home', 'all_offers', 'car_read', 'rent_panel')
+MIDDLEWARE = 'carservice.performance.PerformanceMiddleware'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--offers', type=int, default=200)
+    parser.add_argument('--block', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import Client, override_settings
+    from django.urls import reverse
+    from carservice.models import Car, Offer
+
+    owner = User.objects.create(username='owner')
+    cars = Car.objects.bulk_create([
+        Car(vin=f'BENCH{index:012d}', car_mileage=1000, car_brand='Opel', car_model='Astra', user=owner)
+        for index in range(args.offers)
+    ])
+    Offer.objects.bulk_create([Offer(car=car, price=100.0 + index, user=owner) for index, car in enumerate(cars)])
+    client = Client()
+    client.force_login(User.objects.create(username='client'))
+
+    modes = {
+        'plain': [name for name in settings.MIDDLEWARE if name != MIDDLEWARE],
+        'instrumented': settings.MIDDLEWARE,
+    }
+    timings = {(mode, page): 0.0 for mode in modes for page in PAGES}
+    for page in PAGES:
+        url = reverse(page)
+        client.get(url)
+        for _ in range(0, args.repeat, args.block):
+            for mode, middleware in modes.items():
+                with override_settings(MIDDLEWARE=middleware, ALLOWED_HOSTS=['*']):
+                    start = time.perf_counter()
+                    for _ in range(args.block):
+                        client.get(url)
+                    timings[mode, page] += time.perf_counter() - start
+    requests = -(-args.repeat // args.block) * args.block
+    timings = {key: total / requests for key, total in timings.items()}
+
+    rows = []
+    for page in PAGES:
+        plain, instrumented = timings['plain', page], timings['instrumented', page]
+        rows.append([
+            page, f'{plain * 1e6:.0f}', f'{instrumented * 1e6:.0f}', f'{(instrumented - plain) * 1e6:+.0f}',
+            f'{(instrumented / plain - 1) * 100:+.1f}%',
+        ])
+    print_table(['page', 'plain us', 'instrumented us', 'overhead us', 'overhead'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+"""
+Load-test the main endpoints against a local server and check the results against a stored baseline.
+
+The server (gunicorn by default, see `serving_modes`) runs against an SQLite file filled by `generate_dataset`.
+Then, one endpoint at a time, `--concurrency` client threads send requests for `--seconds` after a short
+warm-up. Every client is signed in as a different user:
+
+    all_offers             the catalogue
+    carsearch              a brand search
+    rent_panel             the client's rents
+    rent_create            booking a free offer of another user, every booking in its own date range
+    rent_confirmation_pdf  the confirmation of one of the client's rents
+
+Requests per second, errors and p50/p95/p99 latency of every endpoint are printed as JSON. With `--baseline`,
+an endpoint whose throughput drops or whose latency percentiles grow by more than `--tolerance` (a fraction),
+or that fails a larger share of its requests than in the baseline, is reported as a regression and the run
+exits with status 1; failed requests are usually fast, so they would otherwise make an endpoint look faster. `--save-baseline` stores the results as the new
+baseline instead. Baselines are only comparable on the same machine and with the same options.
+
+Usage:
+    python -m benchmarks.load_test --concurrency 8 --seconds 10 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.load_test --concurrency 8 --seconds 10 --baseline benchmarks/baseline.json
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import timedelta
+
+from benchmarks.serving_modes import ROOT, SETTINGS, modes, wait_until_ready
+from benchmarks.utils import setup_django
+
+ENDPOINTS = ('all_offers', 'carsearch', 'rent_panel', 'rent_create', 'rent_confirmation_pdf')
+PERCENTILES = (50, 95, 99)
+# Any 32 character alphanumeric string is a valid CSRF secret; sent as both the cookie and the header.
+CSRF_TOKEN = 'loadtest' * 4
+# Bookings can start up to two weeks ahead; each one gets a date range of its own on an offer free till then.
+BOOKING_WINDOW_DAYS = 14
+BOOKING_DAYS = 1
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+opener = urllib.request.build_opener(NoRedirect)
+
+
+def send(url, session, data=None):
+    """
+    Send a request without following redirects and read the whole response.
+
+    Returns:
+        int: The status code.
+    """
+    headers = {'Cookie': f'sessionid={session}; csrftoken={CSRF_TOKEN}'}
+    if data is not None:
+        data = urllib.parse.urlencode(data).encode()
+        headers['X-CSRFToken'] = CSRF_TOKEN
+    request = urllib.request.Request(url, data=data, headers=headers)
+    try:
+        with opener.open(request, timeout=30) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def prepare(directory, options):
+    db_name = os.path.join(directory, 'db.sqlite3')
+    with open(os.path.join(directory, 'benchmark_settings.py'), 'w') as settings_file:
+        settings_file.write(SETTINGS.format(db_name=db_name))
+    setup_django(db_name)
+
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.utils.timezone import now
+    from carservice.availability import available_offers
+    from carservice.models import Offer, Rent
+    from carservice.synthetic import generate_dataset
+
+    generate_dataset(options.users, options.cars, options.rents, seed=options.seed)
+
+    clients = []
+    # Clients with rents of their own, so the rent panel and the confirmations have something to show.
+    users = list(User.objects.filter(rent__isnull=False).distinct().order_by('id')[:options.concurrency])
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        clients.append({
+            'session': client.cookies['sessionid'].value,
+            'rent_ids': list(Rent.objects.filter(user=user).values_list('id', flat=True)[:100]),
+        })
+    bookable = list(available_offers().exclude(user__in=users).order_by('id').values_list('id', flat=True))
+    search = Offer.objects.values_list('car__car_brand', flat=True).first()
+    return clients, bookable, search, now().date()
+
+
+def request_paths(clients, bookable, search, today):
+    """
+    Build a function per endpoint that sends the next request of a client and tells whether it succeeded.
+    """
+    bookings = itertools.count()
+    bookings_lock = threading.Lock()
+
+    def rent_create(base_url, index, number):
+        with bookings_lock:
+            booking = next(bookings)
+        offer_id = bookable[booking % len(bookable)]
+        slot = booking // len(bookable) % (BOOKING_WINDOW_DAYS // (BOOKING_DAYS + 1))
+        start = today + timedelta(days=1 + slot * (BOOKING_DAYS + 1))
+        data = {'rent_start': start.isoformat(), 'duration': BOOKING_DAYS}
+        # A booking redirects to the rent panel; the form is shown again when it was refused.
+        return send(f'{base_url}/rent/create/{offer_id}/', clients[index]['session'], data) == 302
+
+    def rent_confirmation_pdf(base_url, index, number):
+        rent_ids = clients[index]['rent_ids']
+        url = f'{base_url}/rent_confirmation_pdf/{rent_ids[number % len(rent_ids)]}/'
+        return send(url, clients[index]['session']) == 200
+
+    def page(path):
+        return lambda base_url, index, number: send(base_url + path, clients[index]['session']) == 200
+
+    return {
+        'all_offers': page('/all_offers'),
+        'carsearch': page(f'/carsearch?{urllib.parse.urlencode({"search": search})}'),
+        'rent_panel': page('/rent_panel'),
+        'rent_create': rent_create,
+        'rent_confirmation_pdf': rent_confirmation_pdf,
+    }
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of a sorted list.
+    """
+    if not values:
+        return None
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def load(base_url, send_request, clients, seconds, warmup):
+    """
+    Send requests from every client for `warmup` seconds, and at least once so cold caches are filled, then
+    measure for `seconds` starting at the same moment for all of them.
+    """
+    latencies = []
+    counts = {'requests': 0, 'errors': 0}
+    lock = threading.Lock()
+    warmup_until = time.perf_counter() + warmup
+    window = {}
+    barrier = threading.Barrier(len(clients), action=lambda: window.update(deadline=time.perf_counter() + seconds))
+
+    def client(index):
+        timings = []
+        number = errors = 0
+        while number == 0 or time.perf_counter() < warmup_until:
+            run(index, number)
+            number += 1
+        barrier.wait()
+        while True:
+            start = time.perf_counter()
+            if start >= window['deadline']:
+                break
+            errors += not run(index, number)
+            timings.append(time.perf_counter() - start)
+            number += 1
+        with lock:
+            latencies.extend(timings)
+            counts['requests'] += len(timings)
+            counts['errors'] += errors
+
+    def run(index, number):
+        try:
+            return send_request(base_url, index, number)
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            return False
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(len(clients))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    result = {
+        'requests': counts['requests'],
+        'errors': counts['errors'],
+        'requests_per_second': round(counts['requests'] / seconds, 1),
+    }
+    for percent in PERCENTILES:
+        value = percentile(latencies, percent)
+        result[f'p{percent}_ms'] = round(value * 1000, 2) if value is not None else None
+    return result
+
+
+def error_rate(result):
+    return result.get('errors', 0) / result['requests'] if result['requests'] else 0
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare load test results with a baseline.
+
+    The tolerance applies to throughput and latency; any rise of the error rate is a regression.
+
+    Parameters:
+        results (dict): The `endpoints` of this run.
+        baseline (dict): The `endpoints` of the baseline run.
+        tolerance (float): The allowed slowdown as a fraction, e.g. 0.2 for 20%.
+
+    Returns:
+        list: A message for every endpoint whose throughput or latency got worse by more than the tolerance
+            or whose error rate rose.
+    """
+    regressions = []
+    for endpoint, result in results.items():
+        expected = baseline.get(endpoint)
+        if not expected:
+            continue
+        if error_rate(result) > error_rate(expected):
+            regressions.append(
+                f'{endpoint}: {result["errors"]} of {result["requests"]} requests failed, '
+                f'baseline {expected.get("errors", 0)} of {expected["requests"]}'
+            )
+        if result['requests_per_second'] < expected['requests_per_second'] * (1 - tolerance):
+            regressions.append(
+                f'{endpoint}: {result["requests_per_second"]} requests/s, baseline {expected["requests_per_second"]}'
+            )
+        for percent in PERCENTILES:
+            key = f'p{percent}_ms'
+            if result[key] is not None and expected.get(key) and result[key] > expected[key] * (1 + tolerance):
+                regressions.append(f'{endpoint}: {key} {result[key]}, baseline {expected[key]}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', default='gunicorn', choices=['runserver', 'gunicorn', 'gunicorn+uvicorn'])
+    parser.add_argument('--workers', type=int, default=4, help='Gunicorn worker processes.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Client threads, each signed in as another user.')
+    parser.add_argument('--seconds', type=float, default=10, help='Measured time per endpoint.')
+    parser.add_argument('--warmup', type=float, default=1, help='Unmeasured time per endpoint before that.')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='Comma separated, from the list above.')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--cars', type=int, default=2000)
+    parser.add_argument('--rents', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', help='Also write the JSON results to this file.')
+    parser.add_argument('--baseline', help='Fail when the results are worse than this stored run.')
+    parser.add_argument('--save-baseline', help='Store the results as the baseline in this file.')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    endpoints = [endpoint for endpoint in args.endpoints.split(',') if endpoint]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f'unknown endpoints: {", ".join(sorted(unknown))}')
+    available = modes(args.port, args.workers)
+    if args.server not in available:
+        parser.error(f'{args.server} is not installed')
+
+    directory = tempfile.TemporaryDirectory()
+    # The caches, the rent confirmation PDFs and the request metrics are shared by the server workers and this
+    # process, but not with the project, and go away with the directory.
+    os.environ.update({
+        'CACHE_LOCATION': os.path.join(directory.name, 'cache'),
+        'RENT_PDF_CACHE_DIR': os.path.join(directory.name, 'pdf'),
+        'METRICS_DIR': os.path.join(directory.name, 'metrics'),
+    })
+    try:
+        clients, bookable, search, today = prepare(directory.name, args)
+        paths = request_paths(clients, bookable, search, today)
+        env = {
+            **os.environ,
+            'PYTHONPATH': os.pathsep.join([directory.name, ROOT]),
+            'DJANGO_SETTINGS_MODULE': 'benchmark_settings',
+            'DEBUG': 'False',
+        }
+
+        base_url = f'http://127.0.0.1:{args.port}'
+        command, server_env = available[args.server]
+        process = subprocess.Popen(
+            command, cwd=ROOT, env={**env, **server_env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(base_url + '/', process)
+            results = {
+                endpoint: load(base_url, paths[endpoint], clients, args.seconds, args.warmup)
+                for endpoint in endpoints
+            }
+        finally:
+            process.terminate()
+            process.wait()
+    finally:
+        directory.cleanup()
+
+    report = {
+        'server': args.server,
+        'workers': args.workers,
+        'concurrency': args.concurrency,
+        'seconds': args.seconds,
+        'data': {'users': args.users, 'cars': args.cars, 'rents': args.rents},
+        'endpoints': results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as report_file:
+            report_file.write(output + '\n')
+
+    if args.baseline and not args.save_baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline['endpoints'], args.tolerance)
+        if regressions:
+            print(f'Slower than the baseline by more than {args.tolerance:.0%}:', file=sys.stderr)
+            for regression in regressions:
+                print(f'  {regression}', file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
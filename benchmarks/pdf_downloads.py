@@ -0,0 +1,66 @@
+"""
+Measure rent confirmation download throughput with a cold and a warm PDF cache.
+
+Cold downloads render the PDF with ReportLab, warm ones stream the cached file, and conditional downloads
+send the ETag back and get a 304.
+
+Usage:
+    python -m benchmarks.pdf_downloads --downloads 500
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks.utils import setup_django, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--downloads', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.urls import reverse
+    from django.utils.timezone import now
+    from carservice.models import Car, Offer, Rent
+    from carservice.pdf import invalidate_confirmation
+
+    settings.RENT_PDF_CACHE_DIR = tempfile.mkdtemp()
+    user = User.objects.create(username='benchmark')
+    car = Car.objects.create(vin='1G8MG35X48Y106575', car_mileage=1000, car_brand='Opel', car_model='Astra', user=user)
+    offer = Offer.objects.create(car=car, price=100.0, user=user)
+    rent = Rent.objects.create(offer=offer, user=user, rent_start=now().date(), duration=3)
+    url = reverse('rent_confirmation_pdf', args=[rent.id])
+
+    client = Client()
+    client.force_login(user)
+
+    def download(**headers):
+        response = client.get(url, **headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        response.close()
+        return response
+
+    def run(label, before=None, **headers):
+        start = time.perf_counter()
+        for _ in range(args.downloads):
+            if before:
+                before()
+            download(**headers)
+        elapsed = time.perf_counter() - start
+        return label, f'{elapsed / args.downloads * 1000:.2f}ms', f'{args.downloads / elapsed:.0f}'
+
+    etag = download()['ETag']
+    print_table(('mode', 'per download', 'downloads/s'), [
+        run('cold', before=lambda: invalidate_confirmation(rent.id)),
+        run('warm'),
+        run('conditional (304)', HTTP_IF_NONE_MATCH=etag),
+    ])
+
+
+if __name__ == '__main__':
+    main()
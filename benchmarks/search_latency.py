@@ -0,0 +1,87 @@
+"""
+Compare the latency of the old iexact car search with the indexed search columns as the fleet grows.
+
+Usage:
+    python -m benchmarks.search_latency --sizes 1000,10000,100000 --repeat 50
+"""
+import argparse
+import random
+import time
+
+from benchmarks.utils import setup_django, parse_sizes, print_table
+
+BRANDS = ['Volkswagen', 'BMW', 'Audi', 'Ford', 'Opel', 'Mercedes-Benz', 'Toyota', 'Skoda', 'Other']
+MODELS = ['Astra', 'C-Class', 'Model 3', 'Corolla', 'Golf', 'X5'] + [f'Series {index}' for index in range(200)]
+PHRASES = ['Opel Astra', 'Mercedes-Benz C-Class', 'corolla', 'Model 3', 'golf']
+
+
+def legacy_search(search):
+    from django.db.models import Q
+    from carservice.models import Offer
+
+    terms = search.split()
+    if len(terms) > 1:
+        return Offer.objects.filter(Q(car__car_brand__iexact=terms[0]) & Q(car__car_model__iexact=terms[1]))
+    return Offer.objects.filter(Q(car__car_brand__iexact=terms[0]) | Q(car__car_model__iexact=terms[0]))
+
+
+def indexed_search(search):
+    from carservice.models import Offer
+    from carservice.search import search_offers
+
+    return search_offers(Offer.objects.all(), search)
+
+
+def grow_fleet(size, created, user, rng):
+    from carservice.models import Car, Offer
+
+    cars = []
+    for index in range(created, size):
+        car = Car(
+            vin=f'{index:017d}', car_mileage=1000, car_brand=rng.choice(BRANDS), car_model=rng.choice(MODELS),
+            user=user,
+        )
+        car.update_search_fields()
+        cars.append(car)
+    cars = Car.objects.bulk_create(cars, batch_size=5000)
+    Offer.objects.bulk_create([Offer(car=car, price=100.0, user=user) for car in cars], batch_size=5000)
+
+
+def measure(search, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for phrase in PHRASES:
+            list(search(phrase))
+    return (time.perf_counter() - start) / (repeat * len(PHRASES)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=parse_sizes, default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+
+    user = User.objects.create(username='benchmark')
+    rng = random.Random(0)
+    rows = []
+    created = 0
+    for size in sorted(args.sizes):
+        grow_fleet(size, created, user, rng)
+        created = size
+        matches = sum(indexed_search(phrase).count() for phrase in PHRASES) / len(PHRASES)
+        rows.append((
+            size, f'{matches:.0f}',
+            f'{measure(legacy_search, args.repeat):.2f}ms', f'{measure(indexed_search, args.repeat):.2f}ms',
+        ))
+
+    print_table(('cars', 'avg matches', 'iexact search', 'indexed search'), rows)
+    print()
+    print('Query plan of the indexed search for "Opel Astra":')
+    print(indexed_search('Opel Astra').explain())
+
+
+if __name__ == '__main__':
+    main()
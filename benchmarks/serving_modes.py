@@ -0,0 +1,153 @@
+"""
+Compare the startup time and the throughput of `manage.py runserver` with the production servers configured
+in gunicorn.conf.py: preloaded sync workers and uvicorn workers running the ASGI application.
+
+Every server runs as a subprocess against the same SQLite file. The startup time is measured from launching
+the process to the first successful response. Then `--concurrency` client threads, each with a signed-in
+session, load the home page, the offer list and an offer page for `--seconds`.
+
+Usage:
+    python -m benchmarks.serving_modes --workers 4 --concurrency 16 --seconds 10
+"""
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.utils import print_table, setup_django
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SETTINGS = '''
+from Carshering.settings import *
+
+DATABASES["default"]["NAME"] = {db_name!r}
+ALLOWED_HOSTS = ["*"]
+'''
+
+
+def modes(port, workers):
+    gunicorn = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+                '--workers', str(workers), '--access-logfile', os.devnull]
+    available = {
+        'runserver': ([sys.executable, 'manage.py', 'runserver', '--nostatic', f'127.0.0.1:{port}'], {}),
+        'gunicorn': (gunicorn, {'GUNICORN_WORKER': 'sync'}),
+    }
+    if importlib.util.find_spec('uvicorn') is not None:
+        available['gunicorn+uvicorn'] = (gunicorn, {'GUNICORN_WORKER': 'uvicorn'})
+    return available
+
+
+def prepare(directory, offers):
+    db_name = os.path.join(directory, 'db.sqlite3')
+    with open(os.path.join(directory, 'benchmark_settings.py'), 'w') as settings_file:
+        settings_file.write(SETTINGS.format(db_name=db_name))
+    setup_django(db_name)
+
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from carservice.models import Car, Offer
+
+    owner = User.objects.create(username='owner')
+    cars = Car.objects.bulk_create([
+        Car(vin=f'BENCH{index:012d}', car_mileage=1000, car_brand='Opel', car_model='Astra', user=owner)
+        for index in range(offers)
+    ])
+    offers = Offer.objects.bulk_create([Offer(car=car, price=100.0 + index, user=owner) for index, car in enumerate(cars)])
+    client = Client()
+    client.force_login(User.objects.create(username='client'))
+    return client.cookies['sessionid'].value, [offer.id for offer in offers]
+
+
+def fetch(url, session):
+    request = urllib.request.Request(url, headers={'Cookie': f'sessionid={session}'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+        return response.status
+
+
+def wait_until_ready(url, process, timeout=60):
+    began = time.perf_counter()
+    while time.perf_counter() - began < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f'The server exited with code {process.returncode}.')
+        try:
+            fetch(url, '')
+            return time.perf_counter() - began
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.02)
+    raise RuntimeError('The server did not start in time.')
+
+
+def load(base_url, session, offer_ids, concurrency, seconds):
+    counts = {'requests': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(index):
+        paths = ['/', '/all_offers', f'/offer_detail/{offer_ids[index % len(offer_ids)]}/']
+        requests = errors = 0
+        while time.perf_counter() < deadline:
+            try:
+                fetch(base_url + paths[requests % len(paths)], session)
+            except (urllib.error.URLError, ConnectionError):
+                errors += 1
+            requests += 1
+        with lock:
+            counts['requests'] += requests
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='Gunicorn worker processes.')
+    parser.add_argument('--concurrency', type=int, default=16, help='Client threads.')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--offers', type=int, default=200)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()
+    session, offer_ids = prepare(directory.name, args.offers)
+    env = {
+        **os.environ,
+        'PYTHONPATH': os.pathsep.join([directory.name, ROOT]),
+        'DJANGO_SETTINGS_MODULE': 'benchmark_settings',
+        'CACHE_LOCATION': os.path.join(directory.name, 'cache'),
+        'DEBUG': 'False',
+    }
+
+    base_url = f'http://127.0.0.1:{args.port}'
+    rows = []
+    for mode, (command, mode_env) in modes(args.port, args.workers).items():
+        process = subprocess.Popen(
+            command, cwd=ROOT, env={**env, **mode_env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            startup = wait_until_ready(base_url + '/', process)
+            counts = load(base_url, session, offer_ids, args.concurrency, args.seconds)
+        finally:
+            process.terminate()
+            process.wait()
+        rows.append([
+            mode, f'{startup:.2f}', counts['requests'], f'{counts["requests"] / args.seconds:.0f}', counts['errors'],
+        ])
+    directory.cleanup()
+
+    print_table(['mode', 'startup s', 'requests', 'requests/s', 'errors'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Measure write and read throughput of concurrent processes on one SQLite file, with the default engine and
+with the tuned one (SQLITE_TUNED=True: WAL, synchronous=NORMAL, mmap, cache size, busy timeout and
+BEGIN IMMEDIATE transactions).
+
+Writer processes book rents the way RentCreateView does and now and then run the rent status sweep;
+reader processes list the catalogue and open offer pages. Each mode runs on a fresh database file.
+
+Usage:
+    python -m benchmarks.sqlite_concurrency --writers 4 --readers 4 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+
+from benchmarks.utils import print_table, setup_django
+
+MODES = {'default': 'False', 'tuned': 'True'}
+
+
+def configure(mode, db_name, migrate=False):
+    os.environ['SQLITE_TUNED'] = MODES[mode]
+    setup_django(db_name, migrate=migrate)
+
+
+def prepare(mode, db_name, offers, users):
+    configure(mode, db_name, migrate=True)
+
+    from django.contrib.auth.models import User
+    from carservice.models import Car, Offer
+
+    owner = User.objects.create(username='owner')
+    cars = Car.objects.bulk_create([
+        Car(vin=f'BENCH{index:012d}', car_mileage=1000, car_brand='Opel', car_model='Astra', user=owner)
+        for index in range(offers)
+    ])
+    Offer.objects.bulk_create([Offer(car=car, price=100.0 + index, user=owner) for index, car in enumerate(cars)])
+    User.objects.bulk_create([User(username=f'user{index}') for index in range(users)])
+
+
+def writer(mode, db_name, seed, start, deadline, results):
+    configure(mode, db_name)
+
+    from django.contrib.auth.models import User
+    from django.db import OperationalError, connection
+    from django.utils.timezone import now
+    from benchmarks.booking_throughput import book
+    from carservice.models import Offer
+    from carservice.tasks import apply_status_transitions
+
+    rng = random.Random(seed)
+    offer_ids = list(Offer.objects.values_list('id', flat=True))
+    users = list(User.objects.exclude(username='owner'))
+    today = now().date()
+    counts = Counter()
+    start.wait()
+    while time.time() < deadline.value:
+        try:
+            if rng.random() < 0.05:
+                apply_status_transitions()
+            else:
+                book(rng.choice(offer_ids), rng.choice(users), today + timedelta(days=rng.randint(0, 14)), 1)
+            counts['writes'] += 1
+        except OperationalError:
+            counts['locked'] += 1
+    connection.close()
+    results.put(counts)
+
+
+def reader(mode, db_name, seed, start, deadline, results):
+    configure(mode, db_name)
+
+    from django.db import OperationalError, connection
+    from carservice.availability import available_offers
+    from carservice.models import Offer
+
+    rng = random.Random(seed)
+    offer_ids = list(Offer.objects.values_list('id', flat=True))
+    counts = Counter()
+    start.wait()
+    while time.time() < deadline.value:
+        try:
+            list(available_offers().select_related('car').order_by('price', 'id')[:24])
+            Offer.objects.select_related('car').get(pk=rng.choice(offer_ids))
+            counts['reads'] += 1
+        except OperationalError:
+            counts['locked'] += 1
+    connection.close()
+    results.put(counts)
+
+
+def run(mode, args, context):
+    directory = tempfile.TemporaryDirectory()
+    db_name = os.path.join(directory.name, 'db.sqlite3')
+    process = context.Process(target=prepare, args=(mode, db_name, args.offers, args.writers * 10))
+    process.start()
+    process.join()
+
+    start = context.Event()
+    deadline = context.Value('d', 0.0)
+    results = context.Queue()
+    workers = [
+        context.Process(target=writer, args=(mode, db_name, seed, start, deadline, results))
+        for seed in range(args.writers)
+    ] + [
+        context.Process(target=reader, args=(mode, db_name, seed, start, deadline, results))
+        for seed in range(args.readers)
+    ]
+    for worker in workers:
+        worker.start()
+    # Give the workers time to import Django before the clock starts.
+    time.sleep(args.warmup)
+    deadline.value = time.time() + args.seconds
+    start.set()
+
+    counts = Counter()
+    for _ in workers:
+        counts.update(results.get())
+    for worker in workers:
+        worker.join()
+    directory.cleanup()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--offers', type=int, default=50)
+    parser.add_argument('--warmup', type=float, default=3, help='Seconds to wait for the workers to start.')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    for mode in MODES:
+        counts = run(mode, args, context)
+        rows.append([
+            mode, args.writers, args.readers, counts['writes'], f'{counts["writes"] / args.seconds:.0f}',
+            counts['reads'], f'{counts["reads"] / args.seconds:.0f}', counts['locked'],
+        ])
+
+    print_table(['mode', 'writers', 'readers', 'writes', 'writes/s', 'reads', 'reads/s', 'locked'], rows)
+
+
+if __name__ == '__main__':
+    main()
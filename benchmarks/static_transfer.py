@@ -0,0 +1,92 @@
+"""
+Compare the bytes and requests a browser needs for cold and warm page loads with plain collected static
+files and with the hashed, precompressed pipeline (STATIC_PIPELINE=True).
+
+A cold load fetches the page and every local asset it references. A warm load fetches the page again;
+assets served as immutable are taken from the browser cache, the others are revalidated with
+If-Modified-Since. Only response bodies are counted, and the page HTML is identical in both modes.
+
+Usage:
+    python -m benchmarks.static_transfer --pages home,about,login --repeat 3
+"""
+import argparse
+import io
+import re
+import tempfile
+
+from benchmarks.utils import print_table, setup_django
+
+ASSET_URL = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+ACCEPT_ENCODING = 'gzip, deflate, br'
+STORAGES = {
+    'plain': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    'pipeline': 'carservice.staticfiles.CompressedManifestStaticFilesStorage',
+}
+
+
+def body_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def load_page(client, url, browser_cache):
+    """
+    Load a page like a browser with the given cache of asset URL -> response headers.
+
+    Returns:
+        tuple: The number of requests made and the bytes received.
+    """
+    page = client.get(url)
+    requests, received = 1, len(page.content)
+    for asset in ASSET_URL.findall(page.content.decode()):
+        cached = browser_cache.get(asset)
+        if cached is not None and 'immutable' in cached.get('Cache-Control', ''):
+            continue
+        headers = {'HTTP_ACCEPT_ENCODING': ACCEPT_ENCODING}
+        if cached is not None and 'Last-Modified' in cached:
+            headers['HTTP_IF_MODIFIED_SINCE'] = cached['Last-Modified']
+        response = client.get(asset, **headers)
+        requests += 1
+        received += body_size(response)
+        if response.status_code == 200:
+            browser_cache[asset] = {
+                name: response[name] for name in ('Cache-Control', 'Last-Modified') if name in response
+            }
+    return requests, received
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', default='home,about,login', help='Comma separated URL names to load.')
+    parser.add_argument('--repeat', type=int, default=3, help='Warm loads per page.')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    rows = []
+    for mode, backend in STORAGES.items():
+        storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': backend}}
+        with tempfile.TemporaryDirectory() as static_root, \
+                override_settings(STATIC_ROOT=static_root, STORAGES=storages, ALLOWED_HOSTS=['*']):
+            call_command('collectstatic', interactive=False, verbosity=0, stdout=io.StringIO())
+            client = Client()
+            for name in args.pages.split(','):
+                url = reverse(name)
+                browser_cache = {}
+                cold_requests, cold_bytes = load_page(client, url, browser_cache)
+                warm = [load_page(client, url, browser_cache) for _ in range(args.repeat)]
+                warm_requests = sum(requests for requests, _ in warm) / len(warm)
+                warm_bytes = sum(received for _, received in warm) / len(warm)
+                rows.append([mode, name, cold_requests, cold_bytes, f'{warm_requests:.0f}', f'{warm_bytes:.0f}'])
+
+    print_table(['mode', 'page', 'cold requests', 'cold bytes', 'warm requests', 'warm bytes'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare the per-row rent status loop with the set-based status engine.
+
+Usage:
+    python -m benchmarks.status_engine --sizes 10000,100000,1000000
+"""
+import argparse
+import random
+from datetime import timedelta
+
+from benchmarks.utils import setup_django, parse_sizes, timer, print_table
+
+
+def legacy_update_status():
+    from django.utils.timezone import now
+    from carservice.models import Rent
+
+    rents = Rent.objects.exclude(status=Rent.FINISHED)
+    for rent in rents:
+        if rent.rent_start <= now().date() <= rent.rent_end:
+            rent.status = Rent.ACTIVE
+        elif now().date() > rent.rent_end:
+            rent.status = Rent.OVERDUE
+        rent.save()
+
+
+def populate(size, seed=0):
+    from django.contrib.auth.models import User
+    from django.utils.timezone import now
+    from carservice.models import Car, Offer, Rent
+
+    Rent.objects.all().delete()
+    user, _ = User.objects.get_or_create(username='benchmark')
+    car, _ = Car.objects.get_or_create(
+        vin='1G8MG35X48Y106575', defaults={'car_mileage': 1000, 'car_brand': 'Opel', 'car_model': 'Astra', 'user': user}
+    )
+    offer, _ = Offer.objects.get_or_create(car=car, defaults={'price': 100.0, 'user': user})
+
+    rng = random.Random(seed)
+    today = now().date()
+    batch = []
+    for _ in range(size):
+        rent_start = today + timedelta(days=rng.randint(-60, 14))
+        duration = rng.randint(1, 30)
+        batch.append(Rent(
+            rent_start=rent_start, duration=duration, rent_end=rent_start + timedelta(days=duration),
+            status=Rent.PENDING, offer=offer, user=user,
+        ))
+        if len(batch) == 10000:
+            Rent.objects.bulk_create(batch)
+            batch = []
+    Rent.objects.bulk_create(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=parse_sizes, default=[10000, 100000, 1000000])
+    parser.add_argument('--legacy-limit', type=int, default=None, help='Skip the legacy loop above this many rents.')
+    parser.add_argument('--db', default=':memory:')
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from carservice.models import Rent
+    from carservice.tasks import apply_status_transitions
+
+    rows = []
+    for size in args.sizes:
+        results = {}
+        populate(size)
+        if args.legacy_limit is None or size <= args.legacy_limit:
+            with timer(results, 'legacy'):
+                legacy_update_status()
+            Rent.objects.update(status=Rent.PENDING)
+        with timer(results, 'engine'):
+            counts = apply_status_transitions()
+
+        legacy = results.get('legacy')
+        rows.append((
+            size,
+            f'{legacy:.3f}s' if legacy is not None else 'skipped',
+            f'{results["engine"]:.3f}s',
+            f'{legacy / results["engine"]:.1f}x' if legacy is not None else '-',
+            ', '.join(f'{status}: {count}' for status, count in counts.items()),
+        ))
+
+    print_table(('rents', 'legacy loop', 'engine', 'speedup', 'transitions'), rows)
+
+
+if __name__ == '__main__':
+    main()
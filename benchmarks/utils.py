@@ -0,0 +1,45 @@
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup_django(db_name=':memory:', migrate=True):
+    """
+    Configure Django for a standalone benchmark run against a throwaway SQLite database and create the schema.
+
+    Parameters:
+        db_name (str): Path of the SQLite database file, or ':memory:'.
+        migrate (bool): Create the schema; worker processes sharing a database file set this to False.
+
+    Returns:
+        None
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Carshering.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = db_name
+    django.setup()
+
+    if migrate:
+        from django.core.management import call_command
+        call_command('migrate', run_syncdb=True, verbosity=0)
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(',') if size]
+
+
+@contextmanager
+def timer(results, label):
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    for row in [headers, *rows]:
+        print('  '.join(str(cell).rjust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,106 @@
+"""
+Compare the old dict-building VIN validator with the table-driven one, one VIN at a time and in batches.
+
+Usage:
+    python -m benchmarks.vin_validation --sizes 1000,100000,1000000 --invalid 0.1
+"""
+import argparse
+import random
+import string
+
+from benchmarks.utils import parse_sizes, print_table, timer
+
+VIN_CHARACTERS = ''.join(char for char in string.digits + string.ascii_uppercase if char not in 'IOQ')
+
+
+def legacy_vin_validator(vin):
+    values = {
+        'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8,
+        'J': 1, 'K': 2, 'L': 3, 'M': 4, 'N': 5, 'P': 7, 'R': 9,
+        'S': 2, 'T': 3, 'U': 4, 'V': 5, 'W': 6, 'X': 7, 'Y': 8, 'Z': 9,
+    }
+    weights = {
+        1: 8, 2: 7, 3: 6, 4: 5, 5: 4, 6: 3, 7: 2, 8: 10, 9: 0, 10: 9,
+        11: 8, 12: 7, 13: 6, 14: 5, 15: 4, 16: 3, 17: 2
+    }
+    if len(vin) != 17:
+        return False
+    checksum = 0
+    for index, char in enumerate(vin):
+        if index == 8:
+            continue
+        if char.isdigit():
+            value = int(char)
+        else:
+            value = values.get(char.upper())
+            if value is None:
+                return False
+        checksum += value * weights[index + 1]
+    if vin[8].isdigit():
+        expected_checksum = int(vin[8])
+    else:
+        expected_checksum = 10
+    return checksum % 11 == expected_checksum
+
+
+def legacy_check_vin_number(vin):
+    return legacy_vin_validator(vin) and len(vin) == 17 and vin.isalnum()
+
+
+def make_vins(size, invalid, rng):
+    from carservice.validators import vin_check_digit
+
+    vins = []
+    for _ in range(size):
+        vin = ''.join(rng.choices(VIN_CHARACTERS, k=17))
+        vin = vin[:8] + vin_check_digit(vin) + vin[9:]
+        if rng.random() < invalid:
+            vin = vin[:16] + rng.choice('IOQ-')
+        vins.append(vin)
+    return vins
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=parse_sizes, default=parse_sizes('1000,100000,1000000'))
+    parser.add_argument('--invalid', type=float, default=0.1, help='share of VINs with a bad character')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from carservice.validators import validate_vins, vin_validator
+
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    rng = random.Random(args.seed)
+    rows = []
+    for size in args.sizes:
+        vins = make_vins(size, args.invalid, rng)
+        results = {}
+        with timer(results, 'legacy'):
+            for vin in vins:
+                legacy_check_vin_number(vin)
+        with timer(results, 'single'):
+            for vin in vins:
+                vin_validator(vin)
+        with timer(results, 'batch'):
+            validate_vins(vins)
+        if numpy is not None:
+            array = numpy.array(vins)
+            with timer(results, 'numpy'):
+                validate_vins(array)
+
+        rows.append([
+            size,
+            *(f'{results[label] / size * 1e9:.0f}' if label in results else '-'
+              for label in ('legacy', 'single', 'batch', 'numpy')),
+            f'{results["legacy"] / results["batch"]:.1f}x',
+        ])
+
+    print_table(['vins', 'legacy ns/vin', 'single ns/vin', 'batch ns/vin', 'numpy ns/vin', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CarserviceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'carservice'
+
+    def ready(self):
+        from carservice import signals  # noqa: F401
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from carservice.models import Offer, Rent
+
+
+def rent_end_for(rent_start, duration):
+    return rent_start + timedelta(days=duration)
+
+
+def overlapping_rents(offer, rent_start, rent_end):
+    """
+    Return the open rents of an offer whose `rent_start`..`rent_end` range overlaps the given one.
+
+    Both ends are inclusive, matching the way rent statuses treat `rent_end` as the last day of the rent.
+    The lookup is a range query served by the (offer, rent_start, rent_end) index.
+
+    Parameters:
+        offer (Offer): The offer to check.
+        rent_start (date): The first day of the requested rent.
+        rent_end (date): The last day of the requested rent.
+
+    Returns:
+        QuerySet: The overlapping rents.
+    """
+    return Rent.objects.filter(
+        offer=offer, rent_start__lte=rent_end, rent_end__gte=rent_start, close_rent=False,
+    ).exclude(status=Rent.FINISHED)
+
+
+def is_available(offer, rent_start, rent_end, exclude=None):
+    # `exclude` is a rent being moved, which can't overlap itself.
+    rents = overlapping_rents(offer, rent_start, rent_end)
+    if exclude is not None:
+        rents = rents.exclude(pk=exclude.pk)
+    return not rents.exists()
+
+
+def available_offers():
+    """
+    Return the offers listed in the public catalogue: those without an active or pending rent.
+
+    Reads the denormalized `Offer.is_available` flag, served by a partial index on the available offers, instead
+    of joining the rents.
+    """
+    return Offer.objects.filter(is_available=True)
+
+
+def stale_offers():
+    """
+    Return the ids of the offers whose stored availability doesn't match their rents, e.g. after rents were
+    written with `bulk_create`, `QuerySet.update` or raw SQL, which bypass the receivers that maintain it.
+
+    Returns:
+        list: The ids of the inconsistent offers.
+    """
+    rows = Offer.objects.with_booking_state().values_list(
+        'id', 'is_available', 'current_rent_end', 'booked', 'booking_end'
+    )
+    return [
+        offer_id for offer_id, available, rent_end, booked, booking_end in rows.iterator()
+        if available == booked or rent_end != booking_end
+    ]
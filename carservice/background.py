@@ -0,0 +1,49 @@
+import logging
+import threading
+import time
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_threads = {}
+_threads_lock = threading.Lock()
+
+
+def run_periodically(job, interval):
+    while True:
+        try:
+            job()
+        except Exception:
+            logger.exception('Background job %s failed.', job.__name__)
+        finally:
+            # Every round opens a connection of its own, so a restarted database or a closed one is recovered.
+            connection.close()
+        time.sleep(interval())
+
+
+def start_periodic(job, interval):
+    """
+    Run a job every few seconds in a daemon thread of this process, e.g. to keep cached aggregates fresh off
+    the request path. Calling it again while the thread runs does nothing.
+
+    Parameters:
+        job (callable): Called without arguments; exceptions are logged.
+        interval (callable): Returns the seconds to wait after each run, so settings changes are picked up.
+
+    Returns:
+        None
+    """
+    with _threads_lock:
+        thread = _threads.get(job)
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(
+                target=run_periodically, args=(job, interval), name=f'periodic-{job.__name__}', daemon=True,
+            )
+            thread.start()
+            _threads[job] = thread
+
+
+def is_running(job):
+    thread = _threads.get(job)
+    return thread is not None and thread.is_alive()
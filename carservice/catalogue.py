@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from carservice.availability import available_offers
+from carservice.models import Offer
+
+CARD_PREFIX = 'catalogue:card:'
+
+
+def catalogue_offers(user):
+    """
+    Return the offers listed in the catalogue for a user: the available offers of everyone else.
+
+    Ordered by price and id, the query is served by the partial index on the available offers, so a page of it
+    reads only the rows of that page however large the catalogue is. Only the fields needed for paging are
+    loaded; the cards come from `offer_cards`.
+
+    Parameters:
+        user (User): The user looking at the catalogue.
+
+    Returns:
+        QuerySet: The listed offers.
+    """
+    return available_offers().exclude(user=user).only('id', 'price')
+
+
+def offer_cards(offer_ids):
+    """
+    Return the rendered catalogue cards of the given offers, rendering and caching only the missing ones.
+
+    Parameters:
+        offer_ids (list): The ids of the offers, in display order.
+
+    Returns:
+        list: The HTML of each card, in the order of `offer_ids`.
+    """
+    keys = card_keys(offer_ids)
+    cards, missing = split_cached(keys, cache.get_many(keys.values()))
+    if missing:
+        rendered = render_cards(Offer.objects.select_related('car').filter(id__in=missing))
+        cache.set_many({keys[offer_id]: card for offer_id, card in rendered.items()}, timeout=None)
+        cards.update(rendered)
+    return ordered_cards(offer_ids, cards)
+
+
+async def aoffer_cards(offer_ids):
+    """
+    Async version of `offer_cards`, with the cache read and written through the async cache API. The offers
+    are loaded with their cars, so the missing cards render on the event loop.
+    """
+    keys = card_keys(offer_ids)
+    cards, missing = split_cached(keys, await cache.aget_many(keys.values()))
+    if missing:
+        offers = [offer async for offer in Offer.objects.select_related('car').filter(id__in=missing)]
+        rendered = render_cards(offers)
+        await cache.aset_many({keys[offer_id]: card for offer_id, card in rendered.items()}, timeout=None)
+        cards.update(rendered)
+    return ordered_cards(offer_ids, cards)
+
+
+def card_keys(offer_ids):
+    return {offer_id: f'{CARD_PREFIX}{offer_id}' for offer_id in offer_ids}
+
+
+def split_cached(keys, cached):
+    cards = {offer_id: cached.get(key) for offer_id, key in keys.items()}
+    missing = [offer_id for offer_id, card in cards.items() if card is None]
+    return cards, missing
+
+
+def render_cards(offers):
+    return {offer.id: render_to_string('offer_card.html', {'offer': offer}) for offer in offers}
+
+
+def ordered_cards(offer_ids, cards):
+    return [mark_safe(cards[offer_id]) for offer_id in offer_ids if cards.get(offer_id) is not None]
+
+
+def invalidate_offer_card(offer_id):
+    if offer_id is not None:
+        cache.delete(f'{CARD_PREFIX}{offer_id}')
@@ -0,0 +1,26 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.utils.functional import SimpleLazyObject
+
+from users.middleware import resolve_user
+
+
+def alogin_required(view):
+    """
+    `login_required` for async views.
+
+    Under ASGI the user was loaded by `users.middleware.AuthenticationMiddleware`. Under WSGI the session and
+    the user (with their profile) are loaded here in a single thread hop, and `request.user` is replaced by the
+    loaded user, so the view and its templates don't touch the lazy, sync-only user object.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # type() rather than isinstance(), which would evaluate the lazy user.
+        if type(request.user) is SimpleLazyObject:
+            request.user = await sync_to_async(resolve_user)(request)
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
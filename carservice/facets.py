@@ -0,0 +1,214 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from carservice.availability import available_offers
+from carservice.background import is_running, start_periodic
+from carservice.models import Car
+
+PRICE_BUCKETS = ((None, 100), (100, 200), (200, 500), (500, None))
+YEAR_BUCKETS = ((None, 2000), (2000, 2010), (2010, 2015), (2015, 2020), (2020, None))
+MILEAGE_BUCKETS = ((None, 50000), (50000, 100000), (100000, 200000), (200000, None))
+
+RANGE_FACETS = {
+    'price': ('price', PRICE_BUCKETS),
+    'year': ('car__date_of_prod', YEAR_BUCKETS),
+    'mileage': ('car__car_mileage', MILEAGE_BUCKETS),
+}
+FACET_TITLES = {'brand': 'Brand', 'price': 'Price (PLN/day)', 'year': 'Production year', 'mileage': 'Mileage (km)'}
+
+# The counts with the time they were counted, a lock held while counting and a flag set when they changed.
+COUNTS_KEY = 'facets:counts'
+COUNTS_LOCK = 'facets:counts:lock'
+STALE_KEY = 'facets:counts:stale'
+
+
+def bucket_value(bounds):
+    low, high = bounds
+    return f'{"" if low is None else low}-{"" if high is None else high}'
+
+
+def bucket_label(bounds):
+    low, high = bounds
+    if low is None:
+        return f'under {high}'
+    if high is None:
+        return f'{low}+'
+    return f'{low}-{high}'
+
+
+def bucket_q(field, bounds):
+    low, high = bounds
+    q = Q()
+    if low is not None:
+        q &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        q &= Q(**{f'{field}__lt': high})
+    return q
+
+
+def facet_filters():
+    filters = [(('brand', brand), Q(car__car_brand=brand)) for brand, _ in Car.BRAND_CHOICES]
+    for facet, (field, buckets) in RANGE_FACETS.items():
+        filters += [((facet, bucket_value(bounds)), bucket_q(field, bounds)) for bounds in buckets]
+    return filters
+
+
+def count_aggregates(filters):
+    return {f'facet_{index}': Count('id', filter=q) for index, (_, q) in enumerate(filters)}
+
+
+def count_facets():
+    """
+    Count the listed offers per facet value with a single aggregate query over the available offers.
+
+    Returns:
+        dict: The counts keyed by (facet, value).
+    """
+    filters = facet_filters()
+    totals = available_offers().aggregate(**count_aggregates(filters))
+    return {key: totals[f'facet_{index}'] for index, (key, _) in enumerate(filters)}
+
+
+def refresh_stale_facet_counts():
+    """
+    Recount the facets when offers or rents changed since the last count (see `invalidate_facet_counts`) or
+    the count is older than FACET_COUNTS_TIMEOUT seconds.
+
+    Only the process that takes the lock in the cache recounts, the others keep showing the previous counts.
+
+    Returns:
+        bool: True if this process recounted them.
+    """
+    stored = cache.get(COUNTS_KEY)
+    fresh = stored is not None and time.time() - stored['updated'] < settings.FACET_COUNTS_TIMEOUT
+    if fresh and not cache.get(STALE_KEY) or not cache.add(COUNTS_LOCK, True, timeout=60):
+        return False
+    try:
+        # Cleared before counting, so a change committed during the count marks the result stale again.
+        cache.delete(STALE_KEY)
+        cache.set(COUNTS_KEY, {'counts': count_facets(), 'updated': time.time()}, timeout=None)
+    finally:
+        cache.delete(COUNTS_LOCK)
+    return True
+
+
+def start_facet_refresher():
+    """
+    Keep the facet counts fresh from a daemon thread of this process, e.g. of a server worker once it has
+    loaded the application, so catalogue pages only read them from the cache.
+
+    Returns:
+        None
+    """
+    start_periodic(refresh_stale_facet_counts, lambda: settings.FACET_COUNTS_REFRESH_INTERVAL)
+
+
+def facet_counts():
+    """
+    Return the per-facet counts of the listed offers from the cache.
+
+    The counts cover the whole catalogue, including the offers of the user looking at it. Server workers
+    recount them in the background (`start_facet_refresher`); a process without that thread, like the
+    development server, recounts them here instead when they are stale.
+
+    Returns:
+        dict: The counts keyed by (facet, value), or None before they were first counted.
+    """
+    if not is_running(refresh_stale_facet_counts):
+        refresh_stale_facet_counts()
+    stored = cache.get(COUNTS_KEY)
+    return stored and stored['counts']
+
+
+async def afacet_counts():
+    """
+    Async version of `facet_counts`.
+    """
+    if not is_running(refresh_stale_facet_counts):
+        await sync_to_async(refresh_stale_facet_counts)()
+    stored = await cache.aget(COUNTS_KEY)
+    return stored and stored['counts']
+
+
+def invalidate_facet_counts():
+    """
+    Mark the facet counts stale after offers or rents changed, so they are recounted in the next round.
+    """
+    cache.set(STALE_KEY, True, timeout=None)
+
+
+def selected_facets(params):
+    brand_values = {brand for brand, _ in Car.BRAND_CHOICES}
+    selected = {}
+    if params.get('brand') in brand_values:
+        selected['brand'] = params['brand']
+    for facet, (_, buckets) in RANGE_FACETS.items():
+        for bounds in buckets:
+            if params.get(facet) == bucket_value(bounds):
+                selected[facet] = bounds
+    return selected
+
+
+def filter_offers(queryset, params):
+    """
+    Apply the brand, price, year and mileage facets selected in the GET parameters to an offer queryset.
+
+    Unknown values are ignored.
+
+    Parameters:
+        queryset (QuerySet): The offers to filter.
+        params (QueryDict): The GET parameters of the request.
+
+    Returns:
+        QuerySet: The filtered offers.
+    """
+    for facet, value in selected_facets(params).items():
+        if facet == 'brand':
+            queryset = queryset.filter(car__car_brand=value)
+        else:
+            queryset = queryset.filter(bucket_q(RANGE_FACETS[facet][0], value))
+    return queryset
+
+
+def facet_options(params, counts=None):
+    """
+    Build the facet lists shown next to the catalogue: every value with its count and a link that toggles it.
+
+    Parameters:
+        params (QueryDict): The GET parameters of the request.
+        counts (dict): The facet counts, if already loaded (e.g. with `afacet_counts`). Without counts, the
+            options are listed without them.
+
+    Returns:
+        list: One dict per facet with its title and options.
+    """
+    if counts is None:
+        counts = facet_counts() or {}
+    selected = {facet: value for facet, value in params.items() if facet in FACET_TITLES}
+    facets = []
+    for facet, title in FACET_TITLES.items():
+        if facet == 'brand':
+            values = [(brand, brand) for brand, _ in Car.BRAND_CHOICES]
+        else:
+            values = [(bucket_value(bounds), bucket_label(bounds)) for bounds in RANGE_FACETS[facet][1]]
+
+        options = []
+        for value, label in values:
+            query = params.copy()
+            query.pop('after', None)
+            query.pop('before', None)
+            is_selected = selected.get(facet) == value
+            if is_selected:
+                query.pop(facet)
+            else:
+                query[facet] = value
+            options.append({
+                'label': label, 'count': counts.get((facet, value)), 'selected': is_selected,
+                'query': query.urlencode(),
+            })
+        facets.append({'title': title, 'options': options})
+    return facets
@@ -1,5 +1,6 @@
 from .models import Car, Offer, Rent
 from django import forms
+from django.conf import settings
 
 
 class CarUpdateForm(forms.ModelForm):
@@ -30,3 +31,19 @@ class RentDeleteForm(forms.Form):
 
 class UpdateStatusForm(forms.Form):
     pass
+
+
+class FleetImportForm(forms.Form):
+    fleet_file = forms.FileField(help_text='CSV with a header line or NDJSON (.ndjson, .jsonl) file.')
+
+    def clean_fleet_file(self):
+        # The import runs in the request, so bigger files go through the import_fleet command instead.
+        fleet_file = self.cleaned_data['fleet_file']
+        lines = sum(1 for _ in fleet_file.file)
+        fleet_file.file.seek(0)
+        if lines > settings.FLEET_IMPORT_MAX_ROWS + 1:
+            raise forms.ValidationError(
+                f'The file has more than {settings.FLEET_IMPORT_MAX_ROWS} rows. '
+                'Ask an administrator to import it with the import_fleet command.'
+            )
+        return fleet_file
@@ -0,0 +1,210 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> maximum width in pixels. The height keeps the aspect ratio.
+VARIANTS = {'thumb': 160, 'card': 400, 'full': 1200}
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+QUALITY = 80
+# Whether an image has its variants is cached under this prefix plus its storage name: for good once they exist,
+# for MISSING_TIMEOUT seconds while they don't, so other workers see them soon after they were rendered.
+VARIANTS_PREFIX = 'image-variants:'
+MISSING_TIMEOUT = 60
+
+_executor = None
+_executor_lock = threading.Lock()
+_queue_slots = None
+
+
+def variant_name(name, variant, extension):
+    """
+    Return the storage name of one variant of an image, e.g. `static/image/variants/car.card.webp` for
+    `static/image/car.jpg`.
+
+    Parameters:
+        name (str): The storage name of the original image.
+        variant (str): A key of VARIANTS.
+        extension (str): A key of FORMATS.
+
+    Returns:
+        str: The storage name of the variant.
+    """
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f'{stem}.{variant}.{extension}')
+
+
+def has_variants(name, storage=default_storage):
+    """
+    Tell whether the variants of an image have been rendered, asking the storage only when the cache doesn't
+    know yet.
+
+    Parameters:
+        name (str): The storage name of the original image.
+        storage (Storage): The storage holding the image.
+
+    Returns:
+        bool: True if they exist.
+    """
+    key = VARIANTS_PREFIX + name
+    exists = cache.get(key)
+    if exists is None:
+        # The largest JPEG is written last, so its presence means the whole set is there.
+        exists = storage.exists(variant_name(name, list(VARIANTS)[-1], 'jpeg'))
+        cache.set(key, exists, None if exists else MISSING_TIMEOUT)
+    return exists
+
+
+def forget_variants(name):
+    cache.delete(VARIANTS_PREFIX + name)
+
+
+def generate_variants(name, storage=default_storage, force=False):
+    """
+    Render every size variant of an image in WebP and JPEG and save them next to it.
+
+    Images smaller than a variant are not upscaled. Variants that exist already are kept unless `force` is
+    set. A missing or unreadable original is logged and skipped.
+
+    Parameters:
+        name (str): The storage name of the original image.
+        storage (Storage): The storage holding the image.
+        force (bool): Render the variants even if they exist.
+
+    Returns:
+        list: The storage names of the variants that were written.
+    """
+    if not force and has_variants(name, storage):
+        return []
+    # Imported on first use: every process imports this module, but only the variant workers need Pillow.
+    from PIL import Image, ImageOps
+
+    try:
+        with storage.open(name, 'rb') as original:
+            image = ImageOps.exif_transpose(Image.open(original))
+            image.load()
+    except (OSError, ValueError):
+        logger.warning('Cannot read image %s, skipping its variants.', name)
+        return []
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    # A content-addressed storage would rename the variants after their hash, so use its derived save.
+    save = getattr(storage, 'save_derived', storage.save)
+    written = []
+    for variant, width in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((width, width * 4), Image.LANCZOS)
+        for extension, image_format in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, quality=QUALITY, optimize=True)
+            target = variant_name(name, variant, extension)
+            storage.delete(target)
+            written.append(save(target, ContentFile(buffer.getvalue())))
+    cache.set(VARIANTS_PREFIX + name, True, None)
+    return written
+
+
+def executor():
+    global _executor, _queue_slots
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS, thread_name_prefix='image-variants',
+            )
+            _queue_slots = threading.BoundedSemaphore(settings.IMAGE_VARIANT_QUEUE)
+    return _executor
+
+
+def shutdown():
+    """
+    Wait for the queued variants of this process to be rendered, e.g. before a recycled worker exits.
+    """
+    global _executor
+    with _executor_lock:
+        pool, _executor = _executor, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def run_job(job, *args):
+    try:
+        job(*args)
+    except Exception:
+        logger.exception('Generating image variants failed.')
+
+
+def run_queued_job(job, slots):
+    try:
+        run_job(job)
+    finally:
+        slots.release()
+
+
+def schedule_variants(name, callback=None):
+    """
+    Generate the variants of an image in the worker pool once the current transaction commits.
+
+    With IMAGE_VARIANT_WORKERS set to 0 they are generated in the calling thread instead. At most
+    IMAGE_VARIANT_QUEUE images wait for a worker thread; more are skipped with a warning. The queue lives in
+    the process: a worker that exits normally renders it first (see `shutdown`), but the images queued in a
+    killed one are lost. `manage.py generate_image_variants` renders whatever was skipped or lost.
+
+    Parameters:
+        name (str): The storage name of the original image.
+        callback (callable): Called without arguments after the variants were written, e.g. to evict caches
+            of pages showing the image. It runs in the worker thread.
+
+    Returns:
+        None
+    """
+    def job():
+        if generate_variants(name) and callback is not None:
+            callback()
+
+    def submit():
+        if not settings.IMAGE_VARIANT_WORKERS:
+            run_job(job)
+            return
+        pool, slots = executor(), _queue_slots
+        if slots.acquire(blocking=False):
+            pool.submit(run_queued_job, job, slots)
+        else:
+            logger.warning('Image variant queue is full, skipping %s.', name)
+
+    transaction.on_commit(submit)
+
+
+def image_sources(field_file):
+    """
+    Return the URLs an <img>/<picture> needs to show an image in the size the browser picks.
+
+    Until the variants have been generated only the original is offered.
+
+    Parameters:
+        field_file (FieldFile): The image, e.g. `car.car_photo`.
+
+    Returns:
+        dict: `src` (the URL of the original or the card JPEG) and `srcsets`, the srcset string of every
+            format keyed by extension (empty when there are no variants).
+    """
+    name, storage = field_file.name, field_file.storage
+    if not has_variants(name, storage):
+        return {'src': field_file.url, 'srcsets': {}}
+    srcsets = {
+        extension: ', '.join(
+            f'{storage.url(variant_name(name, variant, extension))} {width}w' for variant, width in VARIANTS.items()
+        )
+        for extension in FORMATS
+    }
+    return {'src': storage.url(variant_name(name, 'card', 'jpeg')), 'srcsets': srcsets}
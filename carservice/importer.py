@@ -0,0 +1,286 @@
+import csv
+import json
+import math
+from collections import namedtuple
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from carservice.facets import invalidate_facet_counts
+from carservice.models import Car, Offer
+from carservice.validators import VIN_ERROR_MESSAGES, VIN_OK, validate_mileage, validate_vins, validate_year
+
+BATCH_SIZE = 1000
+FORMATS = ('csv', 'ndjson')
+COLUMNS = ('vin', 'car_brand', 'car_model', 'car_mileage', 'date_of_prod', 'price', 'description')
+# The types a column may have in an NDJSON row; CSV values are always strings.
+COLUMN_TYPES = {
+    'vin': str, 'car_brand': str, 'car_model': str, 'description': str,
+    'car_mileage': (str, int), 'date_of_prod': (str, int), 'price': (str, int, float),
+}
+DUPLICATE_VIN = 'Car with this Vin already exists.'
+
+RowError = namedtuple('RowError', ['line', 'vin', 'errors'])
+ImportResult = namedtuple('ImportResult', ['rows', 'cars', 'offers', 'failed'])
+
+
+def detect_format(name):
+    """
+    Guess the format of a fleet file from its name.
+
+    Parameters:
+        name (str): The file name.
+
+    Returns:
+        str: 'ndjson' for .ndjson, .jsonl and .json files, 'csv' otherwise.
+    """
+    return 'ndjson' if name.lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+
+def read_rows(stream, file_format):
+    """
+    Yield the rows of a CSV file with a header line, or of a file with one JSON object per line.
+
+    The file is read line by line, so only the current row is held in memory.
+
+    Parameters:
+        stream (file): The file, opened in text mode.
+        file_format (str): 'csv' or 'ndjson'.
+
+    Returns:
+        generator: (line number, row dict) pairs. Rows that can't be parsed are yielded as None.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def clean_value(row, field):
+    value = row.get(field)
+    if value is None:
+        return ''
+    return value.strip() if isinstance(value, str) else value
+
+
+def clean_row(row):
+    """
+    Check the fields of one row, except the VIN, the way the car and offer forms do.
+
+    Parameters:
+        row (dict): The parsed row.
+
+    Returns:
+        tuple: The Car and the Offer (or None if the row has no price) to create, and a dict of field errors.
+    """
+    errors = {}
+    values = {field: clean_value(row, field) for field in COLUMNS}
+    for field, value in values.items():
+        if not isinstance(value, COLUMN_TYPES[field]) or isinstance(value, bool):
+            errors[field] = 'Enter a valid value.'
+
+    brands = {brand for brand, _ in Car.BRAND_CHOICES}
+    if 'car_brand' not in errors and values['car_brand'] not in brands:
+        errors['car_brand'] = 'Select a valid brand.'
+
+    model = values['car_model']
+    if 'car_model' not in errors:
+        if not model:
+            errors['car_model'] = 'This field is required.'
+        elif len(model) > Car._meta.get_field('car_model').max_length:
+            errors['car_model'] = 'Ensure this value has at most 15 characters.'
+
+    numbers = {}
+    for field, validator in (('car_mileage', validate_mileage), ('date_of_prod', validate_year)):
+        if field in errors:
+            continue
+        try:
+            numbers[field] = int(values[field])
+            if numbers[field] < 0:
+                raise ValueError
+            validator(numbers[field])
+        except ValueError:
+            errors[field] = 'Enter a whole number.'
+        except ValidationError as error:
+            errors[field] = ' '.join(error.messages)
+
+    price = None
+    if values['price'] != '' and 'price' not in errors:
+        try:
+            price = float(values['price'])
+            if not math.isfinite(price):
+                raise ValueError
+            if price < 10.0:
+                errors['price'] = 'Ensure this value is greater than or equal to 10.0.'
+        except ValueError:
+            errors['price'] = 'Enter a number.'
+        max_length = Offer._meta.get_field('description').max_length
+        if 'description' not in errors and len(values['description']) > max_length:
+            errors['description'] = 'Ensure this value has at most 300 characters.'
+
+    if errors:
+        return None, None, errors
+
+    car = Car(
+        vin=values['vin'].upper(), car_brand=values['car_brand'], car_model=model,
+        car_mileage=numbers['car_mileage'], date_of_prod=numbers['date_of_prod'],
+    )
+    car.update_search_fields()
+    offer = Offer(car=car, price=price, description=values['description']) if price is not None else None
+    return car, offer, errors
+
+
+def check_batch(rows, user):
+    """
+    Validate one batch of rows.
+
+    The VINs of the batch are checked with one `validate_vins` call and one query for VINs that already exist.
+
+    Parameters:
+        rows (list): (line number, row dict) pairs.
+        user (User): The owner of the imported cars and offers.
+
+    Returns:
+        tuple: The (line number, Car, Offer or None) triples to insert and the list of RowErrors.
+    """
+    parsed = []
+    failed = []
+    for line, row in rows:
+        if row is None:
+            failed.append(RowError(line, '', {'row': 'The row could not be parsed.'}))
+            continue
+        car, offer, errors = clean_row(row)
+        vin = clean_value(row, 'vin')
+        parsed.append((line, vin.upper() if isinstance(vin, str) else '', car, offer, errors))
+
+    vins = [vin for _, vin, _, _, _ in parsed]
+    existing = set(Car.objects.filter(vin__in=vins).values_list('vin', flat=True))
+    seen = set()
+    accepted = []
+    for (line, vin, car, offer, errors), code in zip(parsed, validate_vins(vins)):
+        if 'vin' not in errors:
+            if code != VIN_OK:
+                errors['vin'] = str(VIN_ERROR_MESSAGES[code])
+            elif vin in existing or vin in seen:
+                errors['vin'] = DUPLICATE_VIN
+        seen.add(vin)
+        if errors:
+            failed.append(RowError(line, vin, errors))
+            continue
+        car.user = user
+        if offer is not None:
+            offer.user = user
+        accepted.append((line, car, offer))
+    return accepted, failed
+
+
+def insert_rows(accepted):
+    cars = [car for _, car, _ in accepted]
+    offers = [offer for _, _, offer in accepted if offer is not None]
+    with transaction.atomic():
+        Car.objects.bulk_create(cars)
+        if offers and offers[0].car.pk is None:
+            # The database can't return the ids of bulk inserted rows, so look them up by VIN.
+            ids = dict(Car.objects.filter(vin__in=[offer.car.vin for offer in offers]).values_list('vin', 'id'))
+            for offer in offers:
+                offer.car.pk = ids[offer.car.vin]
+        Offer.objects.bulk_create(offers)
+    return len(cars), len(offers)
+
+
+def insert_batch(accepted):
+    """
+    Insert the cars and offers of a checked batch in a single transaction.
+
+    A VIN added by someone else after `check_batch` makes the whole insert fail; the batch is then inserted
+    row by row, each row in its own transaction, and the rows whose VIN exists by now are reported.
+
+    Parameters:
+        accepted (list): (line number, Car, Offer or None) triples from `check_batch`.
+
+    Returns:
+        tuple: The number of cars and offers created and the list of RowErrors.
+    """
+    try:
+        cars, offers = insert_rows(accepted)
+        return cars, offers, []
+    except IntegrityError:
+        pass
+
+    cars = offers = 0
+    failed = []
+    for line, car, offer in accepted:
+        try:
+            created_cars, created_offers = insert_rows([(line, car, offer)])
+        except IntegrityError:
+            failed.append(RowError(line, car.vin, {'vin': DUPLICATE_VIN}))
+            continue
+        cars += created_cars
+        offers += created_offers
+    return cars, offers, failed
+
+
+def import_batch(rows, user):
+    """
+    Validate one batch of rows and insert its valid cars and offers.
+
+    Parameters:
+        rows (list): (line number, row dict) pairs.
+        user (User): The owner of the imported cars and offers.
+
+    Returns:
+        tuple: The number of cars and offers created and the list of RowErrors.
+    """
+    accepted, failed = check_batch(rows, user)
+    cars, offers, duplicates = insert_batch(accepted)
+    return cars, offers, failed + duplicates
+
+
+def import_fleet(rows, user, batch_size=BATCH_SIZE, on_error=None):
+    """
+    Import cars, and optionally their offers, from a stream of rows.
+
+    Each row has the columns `vin`, `car_brand`, `car_model`, `car_mileage` and `date_of_prod`; a row with a
+    `price` (and optionally a `description`) also gets an offer. The rows are validated and inserted in
+    batches with `bulk_create`, each batch in its own transaction, so memory use does not grow with the file
+    and an invalid row only skips itself. `bulk_create` doesn't send signals, so the cached facet counts are
+    invalidated once at the end.
+
+    Parameters:
+        rows (iterable): (line number, row dict) pairs, e.g. from `read_rows`.
+        user (User): The owner of the imported cars and offers.
+        batch_size (int): The number of rows validated and inserted at once.
+        on_error (callable): Called with every RowError as soon as its batch is done.
+
+    Returns:
+        ImportResult: The number of rows read, cars and offers created and rows that failed.
+    """
+    rows = iter(rows)
+    total = cars = offers = failed = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        created_cars, created_offers, errors = import_batch(batch, user)
+        total += len(batch)
+        cars += created_cars
+        offers += created_offers
+        failed += len(errors)
+        if on_error is not None:
+            for error in errors:
+                on_error(error)
+
+    if offers:
+        invalidate_facet_counts()
+    return ImportResult(total, cars, offers, failed)
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from carservice.storage import GARBAGE_GRACE_PERIOD, collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Recount the references of the stored uploads and delete the files no car or profile uses any more.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=GARBAGE_GRACE_PERIOD.total_seconds() / 3600,
+            help='Keep unreferenced files younger than this many hours (default: 24).',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted.')
+
+    def handle(self, *args, **options):
+        stats = collect_garbage(
+            grace_period=timedelta(hours=options['grace_hours']), batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        prefix = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(
+            f'{prefix} {stats["deleted"]} unreferenced files and {stats["orphans"]} files without a record, '
+            f'{stats["freed"]} bytes. Repaired {stats["repaired"]} reference counts.'
+        )
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from carservice.synthetic import BATCH_SIZE, generate_dataset
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with synthetic users, cars, offers and rents for performance testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--cars', type=int, default=10000)
+        parser.add_argument('--rents', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0, help='The same seed gives the same data set.')
+        parser.add_argument('--password', default='password', help='The password of every created user.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            counts = generate_dataset(
+                options['users'], options['cars'], options['rents'], seed=options['seed'],
+                password=options['password'], batch_size=options['batch_size'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(
+            f'Created {counts["users"]} users, {counts["cars"]} cars, {counts["offers"]} offers and '
+            f'{counts["rents"]} rents in {time.perf_counter() - start:.1f} s.'
+        )
@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from carservice.catalogue import invalidate_offer_card
+from carservice.images import generate_variants
+from carservice.models import Car, Offer
+from users.models import Profile
+
+
+class Command(BaseCommand):
+    help = 'Render the size variants of every uploaded car photo and profile image that does not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Render the variants again even if they exist.')
+        parser.add_argument(
+            '--workers', type=int, default=max(settings.IMAGE_VARIANT_WORKERS, 1),
+            help='Number of images rendered in parallel.',
+        )
+
+    def handle(self, *args, **options):
+        names = set(Car.objects.exclude(car_photo='').values_list('car_photo', flat=True).distinct().iterator())
+        names |= set(Profile.objects.exclude(image='').values_list('image', flat=True).distinct().iterator())
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            generated = sum(
+                1 for written in pool.map(lambda name: generate_variants(name, force=options['force']), sorted(names))
+                if written
+            )
+        if generated:
+            # The cached catalogue cards still point at the original photos.
+            for offer_id in Offer.objects.exclude(car__car_photo='').values_list('id', flat=True).iterator():
+                invalidate_offer_card(offer_id)
+        self.stdout.write(f'Rendered variants of {generated} of {len(names)} images.')
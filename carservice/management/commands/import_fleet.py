@@ -0,0 +1,56 @@
+import csv
+import json
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from carservice.importer import BATCH_SIZE, FORMATS, detect_format, import_fleet, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import cars, and optionally their offers, from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The file to import, or "-" to read standard input.')
+        parser.add_argument('--user', required=True, help='Username of the owner of the imported cars.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='The file format (default: guessed from the file name, CSV for standard input).',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--report',
+            help='Write the rows that failed to this CSV file instead of the standard error.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["user"]}" does not exist.')
+
+        path = options['path']
+        file_format = options['format'] or detect_format(path)
+        report = open(options['report'], 'w', newline='') if options['report'] else self.stderr
+        writer = csv.writer(report)
+        writer.writerow(['line', 'vin', 'errors'])
+
+        def on_error(error):
+            writer.writerow([error.line, error.vin, json.dumps(error.errors)])
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            result = import_fleet(
+                read_rows(stream, file_format), user, batch_size=options['batch_size'], on_error=on_error,
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if report is not self.stderr:
+                report.close()
+
+        self.stdout.write(
+            f'Read {result.rows} rows: imported {result.cars} cars and {result.offers} offers, '
+            f'{result.failed} rows failed.'
+        )
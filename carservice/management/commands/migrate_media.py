@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from carservice.storage import migrate_legacy_files
+
+
+class Command(BaseCommand):
+    help = 'Copy car photos and avatars stored before content addressing into the content-addressed storage.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', action='append', dest='sources',
+            help='A directory to look for the old files in; repeat for several (default: MEDIA_ROOT and the '
+                 'project directory).',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be migrated.')
+
+    def handle(self, *args, **options):
+        stats = migrate_legacy_files(sources=options['sources'], dry_run=options['dry_run'])
+        prefix = 'Would copy' if options['dry_run'] else 'Copied'
+        self.stdout.write(f'{prefix} {stats["files"]} files for {stats["rows"]} cars and profiles.')
+        for name in stats['missing']:
+            self.stderr.write(f'Not found, left unchanged: {name}')
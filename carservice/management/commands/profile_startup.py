@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from carservice.startup import profile_startup
+
+
+class Command(BaseCommand):
+    help = 'Measure django.setup() and the first URL resolution in a fresh process and list the slowest imports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/', help='The URL path to resolve (default: /).')
+        parser.add_argument('--limit', type=int, default=25, help='The number of imports to list.')
+        parser.add_argument(
+            '--sort', choices=['cumulative', 'self'], default='cumulative',
+            help='Order by the time including (cumulative) or excluding (self) nested imports.',
+        )
+        parser.add_argument(
+            '--budget', type=float, default=settings.STARTUP_BUDGET_MS,
+            help='Fail when the startup takes longer than this many milliseconds.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            profile = profile_startup(options['path'])
+        except RuntimeError as error:
+            raise CommandError(error)
+
+        imports = sorted(profile.imports, key=lambda entry: getattr(entry, options['sort']), reverse=True)
+        width = max([len('module'), *(len(entry.module) for entry in imports[:options['limit']])])
+        self.stdout.write(f'{"module":<{width}}  {"self ms":>9}  {"cumulative ms":>13}')
+        for entry in imports[:options['limit']]:
+            self.stdout.write(f'{entry.module:<{width}}  {entry.self:>9.1f}  {entry.cumulative:>13.1f}')
+
+        self.stdout.write(
+            f'\n{len(profile.imports)} modules imported, startup took {profile.elapsed:.0f} ms '
+            f'(budget {options["budget"]:.0f} ms).'
+        )
+        if profile.elapsed > options['budget']:
+            raise CommandError(f'Startup took {profile.elapsed:.0f} ms, over the {options["budget"]:.0f} ms budget.')
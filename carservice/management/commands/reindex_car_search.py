@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from carservice.models import Car
+
+
+class Command(BaseCommand):
+    help = 'Recompute the normalized brand/model search columns of every car.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated = 0
+        last_id = 0
+        while True:
+            cars = list(Car.objects.filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not cars:
+                break
+            for car in cars:
+                car.update_search_fields()
+            Car.objects.bulk_update(cars, ['search_brand', 'search_model'])
+            updated += len(cars)
+            last_id = cars[-1].id
+        self.stdout.write(f'Reindexed {updated} cars.')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from carservice.tasks import repair_offer_availability
+
+
+class Command(BaseCommand):
+    help = 'Recompute Offer.is_available and Offer.current_rent_end wherever they disagree with the rents.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only report the inconsistent offers.')
+
+    def handle(self, *args, **options):
+        offer_ids = repair_offer_availability(options['batch_size'], options['dry_run'])
+        if not offer_ids:
+            self.stdout.write('Offer availability is consistent.')
+            return
+        ids = ', '.join(map(str, offer_ids[:20])) + (', ...' if len(offer_ids) > 20 else '')
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(f'{verb} {len(offer_ids)} inconsistent offers: {ids}.')
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from carservice.slow_queries import read_entries, summarize
+
+
+class Command(BaseCommand):
+    help = 'List the statements of the slow query log that took the most time in total.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=settings.SLOW_QUERY_LOG_FILE, help='The slow query log to read.')
+        parser.add_argument('--limit', type=int, default=10, help='The number of statements to list.')
+
+    def handle(self, *args, **options):
+        summaries = summarize(read_entries(options['file']), options['limit'])
+        if not summaries:
+            self.stdout.write('No slow queries logged.')
+            return
+        for rank, summary in enumerate(summaries, start=1):
+            views = ', '.join(
+                f'{view} ({count})' for view, count in sorted(summary.views.items(), key=lambda item: -item[1])[:3]
+            )
+            scans = f'  FULL SCAN of {", ".join(summary.full_scans)}' if summary.full_scans else ''
+            self.stdout.write(
+                f'{rank}. {summary.total_ms:.0f} ms total, {summary.count} times, max {summary.max_ms:.0f} ms{scans}\n'
+                f'   views: {views}\n'
+                f'   {summary.sql}\n'
+            )
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from carservice.tasks import sweep_rent_status
+
+
+class Command(BaseCommand):
+    help = 'Keep Rent.status up to date by sweeping rents that crossed a date boundary since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=300,
+            help='Seconds to wait between sweeps (default: 300).',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Run a single sweep and exit instead of running as a daemon.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            counts = sweep_rent_status()
+            if counts:
+                summary = ', '.join(f'{status}: {count}' for status, count in counts.items())
+                self.stdout.write(f'Rent statuses updated ({summary}).')
+            else:
+                self.stdout.write('Rent statuses already up to date.')
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
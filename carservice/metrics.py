@@ -0,0 +1,371 @@
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils.timezone import now
+
+from carservice.availability import available_offers
+from carservice.background import start_periodic
+from carservice.models import Rent
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Upper bounds in seconds of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# The request metrics of processes that exited, summed, in METRICS_DIR next to a file per running process.
+ARCHIVE_FILE = 'archive.json'
+GAUGES_KEY = 'metrics:gauges'
+GAUGES_LOCK = 'metrics:gauges:lock'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return [[list(labels), value] for labels, value in self.values.items()]
+
+    def zero(self):
+        return 0
+
+    def add(self, total, value):
+        return total + value
+
+    def merge(self, snapshots):
+        """
+        Sum the snapshots of this metric taken in several processes.
+
+        Parameters:
+            snapshots (iterable): Results of `snapshot`, possibly read back from JSON.
+
+        Returns:
+            dict: The summed values keyed by label values.
+        """
+        merged = {}
+        for snapshot in snapshots:
+            for labels, value in snapshot:
+                labels = tuple(labels)
+                merged[labels] = self.add(merged.get(labels, self.zero()), value)
+        return merged
+
+    def samples(self, values=None):
+        if values is None:
+            with self.lock:
+                values = dict(self.values)
+        return [(self.name, labels, (), value) for labels, value in sorted(values.items())]
+
+    def expose(self, metric_type='counter', values=None):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {metric_type}']
+        for name, labels, extra, value in self.samples(values):
+            lines.append(f'{name}{format_labels(self.labels, labels, extra)} {format_value(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    def set_all(self, values):
+        with self.lock:
+            self.values = dict(values)
+
+    def expose(self, metric_type='gauge', values=None):
+        return super().expose(metric_type, values)
+
+
+class Histogram(Counter):
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = (*buckets, float('inf'))
+
+    def observe(self, labels, value):
+        with self.lock:
+            counts, total = self.values.get(labels, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self.values[labels] = (counts, total + value)
+
+    def snapshot(self):
+        with self.lock:
+            return [[list(labels), [list(counts), total]] for labels, (counts, total) in self.values.items()]
+
+    def zero(self):
+        return [0] * len(self.buckets), 0.0
+
+    def add(self, total, value):
+        (counts, total_sum), (more_counts, more_sum) = total, value
+        return [count + more for count, more in zip(counts, more_counts)], total_sum + more_sum
+
+    def samples(self, values=None):
+        if values is None:
+            with self.lock:
+                values = {labels: (list(counts), total) for labels, (counts, total) in self.values.items()}
+        samples = []
+        for labels, (counts, total) in sorted(values.items()):
+            for bound, count in zip(self.buckets, counts):
+                samples.append((f'{self.name}_bucket', labels, (('le', format_value(bound)),), count))
+            samples.append((f'{self.name}_sum', labels, (), total))
+            samples.append((f'{self.name}_count', labels, (), counts[-1]))
+        return samples
+
+    def expose(self, metric_type='histogram', values=None):
+        return super().expose(metric_type, values)
+
+
+REQUEST_DURATION = Histogram(
+    'carservice_request_duration_seconds', 'Time to handle a request, by URL name.', ['view'],
+)
+REQUESTS = Counter('carservice_requests_total', 'Requests handled, by URL name and status code.', ['view', 'status'])
+DB_QUERIES = Counter('carservice_db_queries_total', 'SQL queries run by requests, by URL name.', ['view'])
+DB_DURATION = Counter('carservice_db_query_seconds_total', 'Time spent in SQL queries, by URL name.', ['view'])
+OPEN_RENTS = Gauge('carservice_open_rents', 'Rents that are not closed, by status.', ['status'])
+AVAILABLE_OFFERS = Gauge('carservice_available_offers', 'Offers without an active or pending rent.')
+OVERDUE_RENTS = Gauge('carservice_overdue_rents', 'Open rents past their end date.')
+GAUGES_UPDATED = Gauge('carservice_gauges_updated_seconds', 'Unix time the rental gauges were last computed.')
+
+REQUEST_METRICS = (REQUEST_DURATION, REQUESTS, DB_QUERIES, DB_DURATION)
+GAUGES = (OPEN_RENTS, AVAILABLE_OFFERS, OVERDUE_RENTS, GAUGES_UPDATED)
+
+
+def record_request(sender, request, metrics, **kwargs):
+    """
+    request_measured receiver that adds a request to the latency histogram and the request and query counters.
+    """
+    REQUEST_DURATION.observe((metrics.view,), metrics.duration)
+    REQUESTS.inc((metrics.view, metrics.status))
+    DB_QUERIES.inc((metrics.view,), metrics.queries)
+    DB_DURATION.inc((metrics.view,), metrics.sql_duration)
+    request_store.flush(interval=settings.METRICS_FLUSH_INTERVAL)
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_snapshot(path):
+    try:
+        with open(path) as snapshot_file:
+            return json.load(snapshot_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_snapshot(path, snapshot):
+    fd, temporary_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'w') as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def merge_snapshots(snapshots):
+    snapshots = list(snapshots)
+    return {metric.name: metric.merge(snapshot.get(metric.name, []) for snapshot in snapshots)
+            for metric in REQUEST_METRICS}
+
+
+def as_snapshot(values):
+    return {name: [[list(labels), value] for labels, value in metric_values.items()]
+            for name, metric_values in values.items()}
+
+
+@contextmanager
+def directory_lock(directory):
+    with open(os.path.join(directory, '.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def archive_snapshots(directory, paths):
+    """
+    Add the snapshots in `paths` to the archive of exited processes and remove them. Call with the lock held.
+    """
+    paths = [path for path in paths if os.path.exists(path)]
+    if not paths:
+        return
+    archive = os.path.join(directory, ARCHIVE_FILE)
+    snapshots = [read_snapshot(archive), *map(read_snapshot, paths)]
+    write_snapshot(archive, as_snapshot(merge_snapshots(snapshots)))
+    for path in paths:
+        os.unlink(path)
+
+
+class RequestMetricsStore:
+    """
+    Shares the request metrics of every worker process through files in METRICS_DIR.
+
+    Each process writes the snapshot of its own counters and histograms to `<pid>.json`, at most once per
+    flush interval while it serves requests and once more when gunicorn stops it. A scrape, answered by any
+    worker, sums the files of all processes. The files of processes that exited are folded into one archive
+    file, so the totals survive worker recycling without the number of files growing. Without METRICS_DIR
+    every process only exposes its own metrics.
+    """
+
+    def __init__(self):
+        self.pid = None
+        self.flushed = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def path(pid):
+        return os.path.join(settings.METRICS_DIR, f'{pid}.json')
+
+    def flush(self, interval=0):
+        directory = settings.METRICS_DIR
+        if not directory or time.monotonic() - self.flushed < interval:
+            return
+        with self.lock:
+            os.makedirs(directory, exist_ok=True)
+            if self.pid != os.getpid():
+                # A file with this pid was left by a process that exited before this one got the same pid.
+                self.pid = os.getpid()
+                with directory_lock(directory):
+                    archive_snapshots(directory, [self.path(self.pid)])
+            write_snapshot(self.path(self.pid), {metric.name: metric.snapshot() for metric in REQUEST_METRICS})
+            self.flushed = time.monotonic()
+
+    def collect(self):
+        """
+        Return the request metrics of all processes, keyed by metric name.
+        """
+        directory = settings.METRICS_DIR
+        if not directory:
+            return {metric.name: dict(metric.values) for metric in REQUEST_METRICS}
+        self.flush()
+        with directory_lock(directory):
+            running = []
+            exited = []
+            for name in os.listdir(directory):
+                pid, extension = os.path.splitext(name)
+                if extension == '.json' and pid.isdigit():
+                    (running if process_alive(int(pid)) else exited).append(os.path.join(directory, name))
+            archive_snapshots(directory, exited)
+            paths = [os.path.join(directory, ARCHIVE_FILE), *running]
+            return merge_snapshots(map(read_snapshot, paths))
+
+
+request_store = RequestMetricsStore()
+
+
+def refresh_gauges(today=None):
+    """
+    Compute the rental gauges: open rents by status, available offers and overdue rents.
+
+    The values are stored in the cache as well, for the other worker processes.
+
+    Parameters:
+        today (date): The date rents are overdue after, today by default.
+
+    Returns:
+        None
+    """
+    today = today or now().date()
+    open_rents = Rent.objects.filter(close_rent=False)
+    OPEN_RENTS.set_all({
+        (row['status'] or '',): row['rents']
+        for row in open_rents.values('status').annotate(rents=Count('id')).order_by()
+    })
+    AVAILABLE_OFFERS.set_all({(): available_offers().count()})
+    OVERDUE_RENTS.set_all({(): open_rents.filter(rent_end__lt=today).count()})
+    GAUGES_UPDATED.set_all({(): time.time()})
+    cache.set(GAUGES_KEY, {gauge.name: dict(gauge.values) for gauge in GAUGES}, timeout=None)
+
+
+def refresh_stale_gauges():
+    """
+    Recompute the rental gauges when they are older than METRICS_GAUGE_INTERVAL seconds.
+
+    Only the process that takes the lock in the cache recomputes them, so the queries run once per interval
+    however many workers check.
+
+    Returns:
+        bool: True if this process recomputed them.
+    """
+    stored = cache.get(GAUGES_KEY) or {}
+    updated = stored.get(GAUGES_UPDATED.name, {}).get((), 0)
+    if time.time() - updated < settings.METRICS_GAUGE_INTERVAL or not cache.add(GAUGES_LOCK, True, timeout=60):
+        return False
+    try:
+        refresh_gauges()
+    finally:
+        cache.delete(GAUGES_LOCK)
+    return True
+
+
+def start_gauge_refresher():
+    """
+    Keep the rental gauges in the cache fresh from a daemon thread, e.g. of a server worker once it has loaded
+    the application. Scrapes only read the cache, so the aggregates never run in a request.
+
+    Returns:
+        None
+    """
+    start_periodic(refresh_stale_gauges, lambda: max(settings.METRICS_GAUGE_INTERVAL / 4, 1))
+
+
+def load_gauges():
+    """
+    Load the rental gauges last computed by any process from the cache.
+
+    Returns:
+        None
+    """
+    stored = cache.get(GAUGES_KEY) or {}
+    for gauge in GAUGES:
+        gauge.set_all(stored.get(gauge.name, {}))
+
+
+def exposition():
+    """
+    Render every metric in the Prometheus text exposition format.
+    """
+    load_gauges()
+    values = request_store.collect()
+    lines = [line for metric in REQUEST_METRICS for line in metric.expose(values=values[metric.name])]
+    lines += [line for gauge in GAUGES for line in gauge.expose()]
+    return '\n'.join(lines) + '\n'
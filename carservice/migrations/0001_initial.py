@@ -0,0 +1,101 @@
+# Generated by Django 4.2.2 on 2026-10-18 09:16
+
+import carservice.validators
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Car',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('car_photo', models.ImageField(blank=True, null=True, upload_to='static/image')),
+                ('vin', models.CharField(max_length=17, unique=True, validators=[carservice.validators.check_vin_number])),
+                ('car_mileage', models.PositiveIntegerField(validators=[carservice.validators.validate_mileage])),
+                ('car_brand', models.CharField(choices=[('Volkswagen', 'Volkswagen'), ('BMW', 'BMW'), ('Audi', 'Audi'), ('Ford', 'Ford'), ('Opel', 'Opel'), ('Mercedes-Benz', 'Mercedes-Benz'), ('Renault', 'Renault'), ('Skoda', 'Skoda'), ('Toyota', 'Toyota'), ('Peugeot', 'Peugeot'), ('Hyundai', 'Hyundai'), ('Citroën', 'Citroën'), ('Volvo', 'Volvo'), ('Nissan', 'Nissan'), ('Fiat', 'Fiat'), ('Seat', 'Seat'), ('Mazda', 'Mazda'), ('Honda', 'Honda'), ('Suzuki', 'Suzuki'), ('Jeep', 'Jeep'), ('Dacia', 'Dacia'), ('Mitsubishi', 'Mitsubishi'), ('MINI', 'MINI'), ('Other', 'Other')], max_length=15)),
+                ('car_model', models.CharField(max_length=15)),
+                ('date_of_prod', models.IntegerField(null=True, validators=[carservice.validators.validate_year])),
+                ('search_brand', models.CharField(default='', editable=False, max_length=30)),
+                ('search_model', models.CharField(default='', editable=False, max_length=30)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Offer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.TextField(max_length=300)),
+                ('price', models.FloatField(validators=[django.core.validators.MinValueValidator(10.0)])),
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='carservice.car')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StatusWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('swept_until', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('references', models.PositiveIntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['references', 'updated'], name='carservice__referen_8ef094_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Rent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(blank=True, choices=[('pending', 'pending'), ('Rent active', 'Rent active'), ('Rent finished', 'Rent finished'), ('Rent overdue', 'Rent overdue')], max_length=30, null=True)),
+                ('rent_start', models.DateField(null=True, validators=[carservice.validators.past_rent, carservice.validators.future_rent])),
+                ('duration', models.PositiveIntegerField(validators=[django.core.validators.MaxValueValidator(30), django.core.validators.MinValueValidator(1)])),
+                ('rent_end', models.DateField(null=True, validators=[carservice.validators.past_rent])),
+                ('close_rent', models.BooleanField(default=False)),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='carservice.offer')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['rent_start'], name='carservice__rent_st_4b90e8_idx'), models.Index(fields=['rent_end'], name='carservice__rent_en_9c3eb2_idx'), models.Index(fields=['offer', 'rent_start', 'rent_end'], name='carservice__offer_i_03e693_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['price', 'id'], name='carservice__price_ce96cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['search_brand', 'search_model'], name='carservice__search__79591e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['search_model'], name='carservice__search__f70810_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['car_brand', 'date_of_prod', 'car_mileage'], name='carservice__car_bra_2926ad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['date_of_prod', 'car_mileage'], name='carservice__date_of_70caeb_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.2 on 2026-10-18 09:49
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Subquery
+
+
+def fill_availability(apps, schema_editor):
+    Offer = apps.get_model('carservice', 'Offer')
+    Rent = apps.get_model('carservice', 'Rent')
+    bookings = Rent.objects.filter(offer=OuterRef('pk'), status__in=['pending', 'Rent active'])
+    Offer.objects.update(
+        is_available=~Exists(bookings),
+        current_rent_end=Subquery(bookings.order_by('-rent_end').values('rent_end')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carservice', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='offer',
+            name='carservice__price_ce96cb_idx',
+        ),
+        migrations.AddField(
+            model_name='offer',
+            name='current_rent_end',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='offer',
+            name='is_available',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['price', 'id'], name='offer_available_price_idx'),
+        ),
+        migrations.RunPython(fill_availability, migrations.RunPython.noop),
+    ]
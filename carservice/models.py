@@ -1,10 +1,12 @@
 from datetime import timedelta
 
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
+from django.db.models import Exists, OuterRef, Q, Subquery
 from django.utils.timezone import now
 
+from .search import normalize
 from .validators import (
     check_vin_number, validate_mileage, validate_year, past_rent, future_rent
     )
@@ -44,20 +46,89 @@ class Car(models.Model):
     car_brand = models.CharField(max_length=15, choices=BRAND_CHOICES)
     car_model = models.CharField(max_length=15)
     date_of_prod = models.IntegerField(null=True, validators=[validate_year])
+    search_brand = models.CharField(max_length=30, default='', editable=False)
+    search_model = models.CharField(max_length=30, default='', editable=False)
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['search_brand', 'search_model']),
+            models.Index(fields=['search_model']),
+            models.Index(fields=['car_brand', 'date_of_prod', 'car_mileage']),
+            models.Index(fields=['date_of_prod', 'car_mileage']),
+        ]
+
+    def update_search_fields(self):
+        self.search_brand = normalize(self.car_brand)
+        self.search_model = normalize(self.car_model)
+
+    def save(self, *args, **kwargs):
+        self.update_search_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'car_brand', 'car_model'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'search_brand', 'search_model'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f'Model: {self.car_model} {self.car_brand}, vin number: ({self.vin})'
 
 
+class OfferQuerySet(models.QuerySet):
+    @staticmethod
+    def booking_state():
+        bookings = Rent.objects.filter(offer=OuterRef('pk'), status__in=Rent.BOOKED)
+        return Exists(bookings), Subquery(bookings.order_by('-rent_end').values('rent_end')[:1])
+
+    def with_booking_state(self):
+        """
+        Annotate the offers with `booked` and `booking_end` computed from their rents.
+        """
+        booked, booking_end = self.booking_state()
+        return self.annotate(booked=booked, booking_end=booking_end)
+
+    def refresh_availability(self):
+        """
+        Recompute `is_available` and `current_rent_end` of these offers from their rents with one UPDATE.
+
+        Returns:
+            int: The number of offers updated.
+        """
+        booked, booking_end = self.booking_state()
+        return self.update(is_available=~booked, current_rent_end=booking_end)
+
+
 class Offer(models.Model):
     description = models.TextField(max_length=300)
     price = models.FloatField(validators=[MinValueValidator(10.0)])
+    # Denormalized from the offer's rents in the same transaction as every change to them, see
+    # OfferQuerySet.refresh_availability: an offer is available without a pending or active rent, and
+    # current_rent_end is the last day of its latest such rent.
+    is_available = models.BooleanField(default=True, editable=False)
+    current_rent_end = models.DateField(null=True, blank=True, editable=False)
 
     car = models.OneToOneField(Car, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    objects = OfferQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The catalogue: the available offers ordered by price. A partial index, since a boolean filter is
+            # rendered as the bare column, which SQLite can't look up in an index on it.
+            models.Index(fields=['price', 'id'], condition=Q(is_available=True), name='offer_available_price_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Only refresh_availability writes the availability fields; an instance loaded before a rent changed
+        # would otherwise write its stale copy back.
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('is_available', 'current_rent_end')
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f'Price: ({self.price}), car:({self.car.car_model} {self.car.car_brand})'
 
@@ -74,6 +145,8 @@ class Rent(models.Model):
         (FINISHED, 'Rent finished'),
         (OVERDUE, 'Rent overdue'),
     ]
+    # Statuses that take the offer out of the catalogue.
+    BOOKED = (PENDING, ACTIVE)
 
     status = models.CharField(
         max_length=30, blank=True, null=True, choices=STATUS_CHOICES
@@ -86,15 +159,55 @@ class Rent(models.Model):
     offer = models.ForeignKey(Offer, on_delete=models.CASCADE)
     user = models.ForeignKey(User, null=True, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['rent_start']),
+            models.Index(fields=['rent_end']),
+            models.Index(fields=['offer', 'rent_start', 'rent_end']),
+        ]
+
+    @classmethod
+    def status_for(cls, rent_start, rent_end, close_rent, today):
+        if rent_start > today:
+            return cls.PENDING
+        if close_rent:
+            return cls.FINISHED
+        if rent_end < today:
+            return cls.OVERDUE
+        return cls.ACTIVE
+
     def save(self, *args, **kwargs):
         self.rent_end = self.rent_start + timedelta(days=self.duration)
-        if self.rent_start > now().date():
-            self.status = self.PENDING
-        elif self.close_rent:
-            self.status = self.FINISHED
-        else:
-            self.status = self.ACTIVE
-        super().save(*args, **kwargs)
+        self.status = self.status_for(self.rent_start, self.rent_end, self.close_rent, now().date())
+        # The post_save receiver updates the offer's availability inside this transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f'Rent status: {self.status}, rent duration: ({self.duration}), offer: {self.offer}, user: {self.user}'
+
+
+class StatusWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    swept_until = models.DateField()
+
+    def __str__(self):
+        return f'{self.name}: swept until {self.swept_until}'
+
+
+class MediaBlob(models.Model):
+    """
+    One uploaded file in the content-addressed media storage, with the number of Car and Profile rows using it.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    size = models.PositiveBigIntegerField()
+    references = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['references', 'updated']),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.references} references)'
@@ -0,0 +1,166 @@
+import base64
+import binascii
+import json
+import math
+from collections.abc import Sequence
+from functools import reduce
+from operator import or_
+
+from django.db import models
+from django.db.models import Q
+
+PAGE_SIZE = 24
+NUMBER = (int, float)
+NUMERIC_FIELDS = (models.IntegerField, models.FloatField, models.DecimalField)
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, types):
+    """
+    Decode a cursor from the query string, or return None when it isn't one this ordering could have produced.
+
+    Parameters:
+        cursor (str): The encoded cursor.
+        types (tuple): The accepted Python types of each value, e.g. from `cursor_types`.
+
+    Returns:
+        list: The ordering values, or None.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != len(types):
+        return None
+    for value, expected in zip(values, types):
+        # bool is an int subclass, and NaN or infinities don't compare as keys.
+        if isinstance(value, bool) or not isinstance(value, expected):
+            return None
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+    return values
+
+
+def cursor_types(model, ordering):
+    """
+    Return the types a cursor value can have for each ordering field: numbers for numeric fields, else strings.
+    """
+    return tuple(
+        NUMBER if isinstance(model._meta.get_field(field), NUMERIC_FIELDS) else str for field in ordering
+    )
+
+
+def keyset_filter(ordering, values, forward):
+    """
+    Build the filter that selects the rows after (or before) a cursor for a lexicographic ordering.
+
+    For ordering (price, id) and cursor (10.0, 7) going forward this is
+    `price >= 10.0 AND (price > 10.0 OR (price = 10.0 AND id > 7))`. The redundant bound on the leading field
+    lets the database seek to the cursor in an index on the ordering instead of scanning up to it.
+    """
+    lookup = 'gt' if forward else 'lt'
+    conditions = []
+    for index, field in enumerate(ordering):
+        equal = {name: value for name, value in zip(ordering[:index], values[:index])}
+        conditions.append(Q(**equal, **{f'{field}__{lookup}': values[index]}))
+    return Q(**{f'{ordering[0]}__{lookup}e': values[0]}) & reduce(or_, conditions)
+
+
+class KeysetPage(Sequence):
+    def __init__(self, object_list, request, prefix, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_query = self._query(request, prefix, 'after', next_cursor)
+        self.previous_query = self._query(request, prefix, 'before', previous_cursor)
+
+    @staticmethod
+    def _query(request, prefix, direction, cursor):
+        if cursor is None:
+            return ''
+        query = request.GET.copy()
+        query.pop(f'{prefix}after', None)
+        query.pop(f'{prefix}before', None)
+        query[f'{prefix}{direction}'] = cursor
+        return query.urlencode()
+
+    @property
+    def has_other_pages(self):
+        return bool(self.next_query or self.previous_query)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate(request, queryset, ordering=('id',), per_page=PAGE_SIZE, prefix=''):
+    """
+    Return one page of a queryset using keyset (cursor) pagination.
+
+    The rows are ordered by `ordering`, which must end with a unique field. The page is selected with a
+    filter on the ordering keys of the row next to it, so fetching a deep page costs the same as the first
+    one. The cursors are read from the `<prefix>after` and `<prefix>before` GET parameters.
+
+    Parameters:
+        request (HttpRequest): The HTTP request object.
+        queryset (QuerySet): The rows to paginate.
+        ordering (tuple): The field names to order by, ascending.
+        per_page (int): The number of rows on a page.
+        prefix (str): The prefix of the GET parameters, for pages with several paginated lists.
+
+    Returns:
+        KeysetPage: The rows of the page and the query strings of the next and previous pages.
+    """
+    ordering = tuple(ordering)
+    after, before = read_cursors(request, prefix, cursor_types(queryset.model, ordering))
+    rows = list(page_queryset(queryset, ordering, per_page, after, before))
+    return build_page(request, prefix, ordering, rows, per_page, after, before)
+
+
+async def apaginate(request, queryset, ordering=('id',), per_page=PAGE_SIZE, prefix=''):
+    """
+    Async version of `paginate`, fetching the page with the async ORM.
+    """
+    ordering = tuple(ordering)
+    after, before = read_cursors(request, prefix, cursor_types(queryset.model, ordering))
+    rows = [row async for row in page_queryset(queryset, ordering, per_page, after, before)]
+    return build_page(request, prefix, ordering, rows, per_page, after, before)
+
+
+def page_queryset(queryset, ordering, per_page, after, before):
+    # One row more than the page in the direction of travel, to tell whether there are more.
+    if before is None:
+        if after is not None:
+            queryset = queryset.filter(keyset_filter(ordering, after, forward=True))
+        return queryset.order_by(*ordering)[:per_page + 1]
+    queryset = queryset.filter(keyset_filter(ordering, before, forward=False))
+    return queryset.order_by(*[f'-{field}' for field in ordering])[:per_page + 1]
+
+
+def read_cursors(request, prefix, types):
+    after = decode_cursor(request.GET.get(f'{prefix}after', ''), types)
+    before = decode_cursor(request.GET.get(f'{prefix}before', ''), types) if after is None else None
+    return after, before
+
+
+def build_page(request, prefix, ordering, rows, per_page, after, before):
+    # `rows` holds up to per_page + 1 rows in the direction of travel; the extra one only signals more rows.
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before is None:
+        has_next, has_previous = has_more, after is not None
+    else:
+        rows = rows[::-1]
+        has_next, has_previous = True, has_more
+
+    def cursor(row):
+        return encode_cursor([getattr(row, field) for field in ordering])
+
+    return KeysetPage(
+        rows, request, prefix,
+        next_cursor=cursor(rows[-1]) if rows and has_next else None,
+        previous_cursor=cursor(rows[0]) if rows and has_previous else None,
+    )
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from django.conf import settings
+
+
+def confirmation_lines(rent):
+    price_of_rent = rent.offer.price * rent.duration
+    return [
+        f'{rent.offer.car.car_brand} {rent.offer.car.car_model}',
+        f'Rent Details for Rent ID: {rent.id}',
+        f'User: {rent.user}',
+        f'Rent Start: {rent.rent_start}',
+        f'Duration: {rent.duration}',
+        f'Rent End: {rent.rent_end}',
+        f'Amount to pay: {price_of_rent} PLN.',
+    ]
+
+
+def confirmation_digest(lines):
+    return hashlib.sha256(json.dumps(lines).encode()).hexdigest()
+
+
+def confirmation_directory(rent_id):
+    return os.path.join(settings.RENT_PDF_CACHE_DIR, str(rent_id))
+
+
+def confirmation_path(rent_id, digest):
+    return os.path.join(confirmation_directory(rent_id), f'{digest}.pdf')
+
+
+def render_confirmation(lines, path):
+    # ReportLab is slow to import and only needed here, so workers that never render a PDF don't load it.
+    from reportlab.pdfgen import canvas
+
+    p = canvas.Canvas(path)
+
+    p.setFont('Helvetica', 16)
+
+    for index, line in enumerate(lines):
+        p.drawString(100, 800 - 20 * index, line)
+
+    p.save()
+
+
+def cached_confirmation(rent):
+    """
+    Return the path of the rendered confirmation PDF of a rent, rendering it only if it is not on disk yet.
+
+    The file name contains a hash of every line printed on the confirmation, so a change to the rent, the
+    offer price, the car or the user name produces a new file instead of serving a stale one. Files of the
+    rent's earlier versions are removed once the new one is in place, never the new one itself, which a
+    concurrent request may be about to open.
+
+    Parameters:
+        rent (Rent): The rent, with its offer, car and user loaded.
+
+    Returns:
+        tuple: The path of the PDF file and its content hash.
+    """
+    lines = confirmation_lines(rent)
+    digest = confirmation_digest(lines)
+    path = confirmation_path(rent.id, digest)
+    if not os.path.exists(path):
+        directory = confirmation_directory(rent.id)
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        os.close(fd)
+        try:
+            render_confirmation(lines, temporary_path)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+        invalidate_confirmation(rent.id, keep=digest)
+    return path, digest
+
+
+def open_confirmation(rent):
+    """
+    Open the confirmation PDF of a rent, rendering it if needed (see `cached_confirmation`).
+
+    The file can still disappear between rendering and opening it, when a change of the rent invalidates it
+    meanwhile; it is rendered again then.
+
+    Parameters:
+        rent (Rent): The rent, with its offer, car and user loaded.
+
+    Returns:
+        tuple: The PDF opened for reading in binary mode and its content hash.
+    """
+    try:
+        path, digest = cached_confirmation(rent)
+        return open(path, 'rb'), digest
+    except FileNotFoundError:
+        path, digest = cached_confirmation(rent)
+        return open(path, 'rb'), digest
+
+
+def invalidate_confirmation(rent_id, keep=None):
+    """
+    Remove the cached confirmation PDFs of a rent.
+
+    Parameters:
+        rent_id (int): The id of the rent.
+        keep (str): The content hash of a file to leave in place, all of them are removed by default.
+
+    Returns:
+        None
+    """
+    directory = confirmation_directory(rent_id)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if name.endswith('.pdf') and name != f'{keep}.pdf':
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,149 @@
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+UNRESOLVED = '<unresolved>'
+
+# The query statistics of the request being handled. A context variable rather than a thread local, so the
+# queries an async view runs in the ORM's worker thread are counted for the request too.
+current_queries = ContextVar('current_queries', default=None)
+
+# Sent with the RequestMetrics of every request the middleware measured.
+request_measured = Signal()
+
+
+class QueryStats:
+    def __init__(self, request=None):
+        self.request = request
+        self.count = 0
+        self.duration = 0.0
+
+
+class RequestMetrics:
+    def __init__(self, view, method, status, duration, queries, sql_duration, size):
+        self.view = view
+        self.method = method
+        self.status = status
+        self.duration = duration
+        self.queries = queries
+        self.sql_duration = sql_duration
+        self.size = size
+
+    def as_dict(self):
+        return {
+            'view': self.view,
+            'method': self.method,
+            'status': self.status,
+            'duration_ms': round(self.duration * 1000, 2),
+            'queries': self.queries,
+            'sql_ms': round(self.sql_duration * 1000, 2),
+            'size': self.size,
+        }
+
+    def server_timing(self):
+        return (
+            f'app;dur={self.duration * 1000:.1f}, '
+            f'db;dur={self.sql_duration * 1000:.1f};desc="{self.queries} queries"'
+        )
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper that adds every statement's count and duration to the current request.
+    """
+    stats = current_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += time.perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # connection_created is sent on every reconnect, but the wrapper list belongs to the connection object.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None and match.view_name else UNRESOLVED
+
+
+def response_size(response):
+    if not response.streaming:
+        return len(response.content)
+    length = response.get('Content-Length')
+    return int(length) if length else None
+
+
+def should_log(metrics):
+    if metrics.duration * 1000 >= settings.PERFORMANCE_LOG_SLOW_MS:
+        return True
+    return random.random() < settings.PERFORMANCE_LOG_SAMPLE_RATE
+
+
+class PerformanceMiddleware:
+    """
+    Measure every request: wall time, the number and total duration of its SQL queries and the response size.
+
+    The numbers are added to the response as a `Server-Timing` header (shown in the browser's network panel),
+    sent as the `request_measured` signal and written as a JSON line to the `carservice.performance` logger for
+    a PERFORMANCE_LOG_SAMPLE_RATE share of the requests and for every request slower than
+    PERFORMANCE_LOG_SLOW_MS. Requests are tagged with the URL name of their view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, start = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        return self.finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats, token, start = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        return self.finish(request, response, stats, start)
+
+    @staticmethod
+    def start(request):
+        stats = QueryStats(request)
+        return stats, current_queries.set(stats), time.perf_counter()
+
+    @staticmethod
+    def finish(request, response, stats, start):
+        metrics = RequestMetrics(
+            view=view_name(request), method=request.method, status=response.status_code,
+            duration=time.perf_counter() - start, queries=stats.count, sql_duration=stats.duration,
+            size=response_size(response),
+        )
+        if settings.PERFORMANCE_SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing()
+        request_measured.send(sender=PerformanceMiddleware, request=request, metrics=metrics)
+        if should_log(metrics):
+            logger.info(json.dumps(metrics.as_dict()))
+        return response
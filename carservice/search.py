@@ -0,0 +1,77 @@
+import re
+import unicodedata
+
+from django.db.models import Case, IntegerField, Q, Value, When
+
+SEPARATORS = re.compile(r'[\s\-_/.]+')
+PREFIX_END = '\U0010ffff'
+
+
+def normalize(value):
+    """
+    Fold a brand, model or search phrase to the form stored in the Car search columns.
+
+    The value is case-folded, accents are stripped and runs of spaces, hyphens, underscores, slashes and dots
+    collapse to a single space, so "C-Class", "c class" and "C  CLASS" all become "c class" and "Citroën"
+    becomes "citroen".
+
+    Parameters:
+        value (str): The value to normalize.
+
+    Returns:
+        str: The normalized value.
+    """
+    decomposed = unicodedata.normalize('NFKD', value.casefold())
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return SEPARATORS.sub(' ', stripped).strip()
+
+
+def prefix_q(field, prefix):
+    # A range instead of __startswith, so SQLite can serve it from a plain B-tree index.
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + PREFIX_END})
+
+
+def search_offers(queryset, search):
+    """
+    Filter offers by a free-text brand/model phrase and order them by match quality.
+
+    Every way of splitting the phrase into a brand part and a model part is tried, as well as matching the
+    whole phrase against the brand or the model alone, so multi-word brands and models work. Each part can
+    match a prefix. Exact matches rank above prefix matches and brand + model matches rank highest.
+
+    Parameters:
+        queryset (QuerySet): The offers to search.
+        search (str): The search phrase.
+
+    Returns:
+        QuerySet: The matching offers, best matches first.
+    """
+    terms = normalize(search).split()
+    if not terms:
+        return queryset.none()
+
+    phrase = ' '.join(terms)
+    brand, model = 'car__search_brand', 'car__search_model'
+    matches = prefix_q(brand, phrase) | prefix_q(model, phrase)
+    ranked = [
+        (Q(**{brand: phrase}) | Q(**{model: phrase}), 3),
+        (matches, 1),
+    ]
+    for split in range(1, len(terms)):
+        brand_part, model_part = ' '.join(terms[:split]), ' '.join(terms[split:])
+        split_match = prefix_q(brand, brand_part) & prefix_q(model, model_part)
+        matches |= split_match
+        ranked += [
+            (Q(**{brand: brand_part, model: model_part}), 4),
+            (Q(**{brand: brand_part}) & prefix_q(model, model_part), 3),
+            (split_match, 2),
+        ]
+    ranked.sort(key=lambda condition: condition[1], reverse=True)
+
+    rank = Case(
+        *[When(condition, then=Value(rank)) for condition, rank in ranked],
+        default=Value(0), output_field=IntegerField(),
+    )
+    return queryset.filter(matches).annotate(search_rank=rank).order_by(
+        '-search_rank', brand, model, 'id'
+    )
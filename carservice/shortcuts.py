@@ -0,0 +1,11 @@
+from django.http import Http404
+
+
+async def aget_object_or_404(queryset, **kwargs):
+    """
+    Async version of `django.shortcuts.get_object_or_404` for a queryset.
+    """
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from carservice.catalogue import invalidate_offer_card
+from carservice.facets import invalidate_facet_counts
+from carservice.images import has_variants, schedule_variants
+from carservice.models import Car, Offer, Rent
+from carservice.pdf import invalidate_confirmation
+from carservice.metrics import record_request
+from carservice.performance import install_query_recorder, request_measured
+from carservice.slow_queries import install_slow_query_recorder
+from carservice.storage import previous_name, remember_name, remove_reference, update_references
+
+
+def refresh_offer(offer_id):
+    if offer_id is not None:
+        transaction.on_commit(lambda: invalidate_offer_card(offer_id))
+        transaction.on_commit(invalidate_facet_counts)
+
+
+@receiver(post_save, sender=Offer)
+@receiver(post_delete, sender=Offer)
+def offer_changed(sender, instance, **kwargs):
+    refresh_offer(instance.pk)
+
+
+@receiver(post_save, sender=Car)
+def car_changed(sender, instance, created, **kwargs):
+    if not created:
+        refresh_offer(Offer.objects.filter(car=instance).values_list('id', flat=True).first())
+
+
+@receiver(post_init, sender=Car)
+def car_loaded(sender, instance, **kwargs):
+    remember_name(instance, 'car_photo')
+
+
+@receiver(pre_save, sender=Car)
+def remember_car_photo(sender, instance, raw=False, **kwargs):
+    instance._previous_photo = previous_name(sender, instance, 'car_photo', raw)
+
+
+@receiver(post_save, sender=Car)
+def car_photo_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_references(instance._previous_photo, instance.car_photo.name)
+    remember_name(instance, 'car_photo')
+    if instance.car_photo and not has_variants(instance.car_photo.name):
+        offer_id = Offer.objects.filter(car=instance).values_list('id', flat=True).first()
+        schedule_variants(instance.car_photo.name, callback=lambda: invalidate_offer_card(offer_id))
+
+
+@receiver(post_delete, sender=Car)
+def car_deleted(sender, instance, **kwargs):
+    remove_reference(instance.car_photo.name)
+
+
+@receiver(post_save, sender=Rent)
+@receiver(post_delete, sender=Rent)
+def update_offer_availability(sender, instance, **kwargs):
+    # Runs inside the transaction of the save (Rent.save is atomic) or of the deletion.
+    Offer.objects.filter(pk=instance.offer_id).refresh_availability()
+
+
+@receiver(post_save, sender=Rent)
+@receiver(post_delete, sender=Rent)
+def rent_changed(sender, instance, **kwargs):
+    refresh_offer(instance.offer_id)
+    rent_id = instance.pk
+    transaction.on_commit(lambda: invalidate_confirmation(rent_id))
+
+
+connection_created.connect(install_query_recorder)
+connection_created.connect(install_slow_query_recorder)
+request_measured.connect(record_request)
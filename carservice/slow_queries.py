@@ -0,0 +1,248 @@
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.template.base import Node
+from django.utils.timezone import now
+
+from carservice.performance import current_queries, view_name
+
+logger = logging.getLogger(__name__)
+
+# `SCAN carservice_offer` (or `SCAN TABLE carservice_offer AS U0` in older SQLite) reads every row; a scan
+# `USING INDEX`/`USING COVERING INDEX` or a `SEARCH` does not.
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+# Collapses `IN (%s, %s, %s)` of any length, so the same query with a longer list is grouped with the others.
+PLACEHOLDER_LIST = re.compile(r'\((?:%s, )*%s\)')
+PROJECT_APPS = ('carservice', 'users', 'payment', 'Carshering')
+# Modules on the stack of every recorded query, so never the code that ran it.
+INSTRUMENTATION_MODULES = (__name__, 'carservice.performance')
+
+QuerySummary = namedtuple('QuerySummary', ['sql', 'count', 'total_ms', 'max_ms', 'full_scans', 'views'])
+
+
+def explain(connection, sql, params):
+    """
+    Return the SQLite query plan of a statement as a list of plan step descriptions.
+
+    The plan is read through a cursor without the execute wrappers, so explaining a slow query isn't recorded
+    as one. Other databases and statements SQLite can't explain give an empty plan.
+    """
+    if connection.vendor != 'sqlite':
+        return []
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[3] for row in cursor.fetchall()]
+    except Exception:
+        return []
+    finally:
+        cursor.close()
+
+
+def full_scans(plan):
+    return [match.group(1) for match in map(FULL_SCAN.match, plan) if match]
+
+
+def query_origin():
+    """
+    Find the project code and the template line that ran the current query, by walking the call stack.
+
+    Returns:
+        tuple: `file:line` of the innermost frame in the project's apps and `template:line` of the innermost
+            template node being rendered, each None when there is none.
+    """
+    code = template = None
+    frame = sys._getframe(1)
+    while frame is not None and (code is None or template is None):
+        if template is None:
+            node = frame.f_locals.get('self')
+            # type() rather than isinstance(), which would evaluate a lazy object like request.user.
+            if issubclass(type(node), Node) and getattr(node, 'origin', None) and getattr(node, 'token', None):
+                template = f'{node.origin.template_name or node.origin.name}:{node.token.lineno}'
+        if code is None:
+            module = frame.f_globals.get('__name__', '')
+            if module.partition('.')[0] in PROJECT_APPS and module not in INSTRUMENTATION_MODULES:
+                path = os.path.relpath(frame.f_code.co_filename, settings.BASE_DIR)
+                code = f'{path}:{frame.f_lineno} {frame.f_code.co_name}'
+        frame = frame.f_back
+    return code, template
+
+
+def record_slow_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper that logs every statement slower than SLOW_QUERY_THRESHOLD_MS with its plan.
+    """
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = (time.perf_counter() - start) * 1000
+    if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+        log_slow_query(context['connection'], sql, params, many, duration)
+    return result
+
+
+def log_slow_query(connection, sql, params, many, duration):
+    stats = current_queries.get()
+    code, template = query_origin()
+    plan = [] if many else explain(connection, sql, params)
+    logger.warning(json.dumps({
+        'time': now().isoformat(),
+        'duration_ms': round(duration, 2),
+        'sql': sql,
+        'view': view_name(stats.request) if stats is not None and stats.request is not None else None,
+        'code': code,
+        'template': template,
+        'plan': plan,
+        'full_scans': full_scans(plan),
+    }))
+
+
+def install_slow_query_recorder(sender, connection, **kwargs):
+    if settings.SLOW_QUERY_LOG and record_slow_query not in connection.execute_wrappers:
+        os.makedirs(os.path.dirname(settings.SLOW_QUERY_LOG_FILE), exist_ok=True)
+        connection.execute_wrappers.append(record_slow_query)
+
+
+def process_log_file(path, pid):
+    stem, extension = os.path.splitext(path)
+    return f'{stem}.{pid}{extension}'
+
+
+def log_files(path):
+    """
+    Find the files of a log written by ProcessRotatingFileHandler: the file of every process and their rotated
+    backups, plus the file at `path` itself and its backups.
+
+    Parameters:
+        path (str): The configured path of the log, e.g. `logs/slow_queries.log`.
+
+    Returns:
+        list: A (path, pid, backup) tuple per file, pid None for the file at `path` and backup 0 for a current
+            file.
+    """
+    directory = os.path.dirname(path) or '.'
+    stem, extension = os.path.splitext(os.path.basename(path))
+    pattern = re.compile(rf'^{re.escape(stem)}(?:\.(\d+))?{re.escape(extension)}(?:\.(\d+))?$')
+    if not os.path.isdir(directory):
+        return []
+    files = []
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            pid, backup = match.groups()
+            files.append((os.path.join(directory, name), pid and int(pid), int(backup or 0)))
+    return files
+
+
+def modified_time(path):
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        # Rotated or pruned by another process since the directory was listed.
+        return 0
+
+
+def prune_log_files(path, keep):
+    """
+    Delete the log files of exited processes except the `keep` most recently written ones.
+    """
+    from carservice.metrics import process_alive
+
+    exited = [file_path for file_path, pid, _ in log_files(path) if pid is not None and not process_alive(pid)]
+    for file_path in sorted(exited, key=modified_time, reverse=True)[keep:]:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+
+class ProcessRotatingFileHandler(RotatingFileHandler):
+    """
+    A RotatingFileHandler that writes to a file of its own in every process, `<stem>.<pid><extension>`, so
+    forked server workers never rotate a file another one is still writing to.
+
+    The file is named once a process logs its first record. Whenever a process opens its file or rotates it,
+    the files of exited processes are deleted except the `backupCount` newest, so recycled workers don't pile
+    them up. `read_entries` reads all of them.
+    """
+    def __init__(self, filename, *args, **kwargs):
+        self.path = os.path.abspath(filename)
+        self.pid = None
+        super().__init__(filename, *args, **kwargs)
+
+    def _open(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.baseFilename = process_log_file(self.path, self.pid)
+            prune_log_files(self.path, self.backupCount)
+        return super()._open()
+
+    def emit(self, record):
+        if self.stream is not None and self.pid != os.getpid():
+            # Forked after the parent opened its file: open the file of this process instead.
+            self.stream.close()
+            self.stream = None
+        super().emit(record)
+
+    def doRollover(self):
+        super().doRollover()
+        prune_log_files(self.path, self.backupCount)
+
+
+def read_entries(path):
+    """
+    Read the slow query log of every process and their rotated backups, oldest file first. Lines that aren't
+    valid JSON are skipped.
+
+    Parameters:
+        path (str): The configured path of the log.
+
+    Returns:
+        generator: The logged entries as dicts.
+    """
+    files = sorted(log_files(path), key=lambda file: (modified_time(file[0]), -file[2]))
+    for file_path, _, _ in files:
+        try:
+            log = open(file_path)
+        except FileNotFoundError:
+            continue
+        with log:
+            for line in log:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize(entries, limit=10):
+    """
+    Group logged slow queries by statement and rank them by the total time spent in them.
+
+    Parameters:
+        entries (iterable): Entries as written by `log_slow_query`.
+        limit (int): The number of statements to return.
+
+    Returns:
+        list: A QuerySummary per statement, slowest total first. `views` counts the views that ran it.
+    """
+    groups = {}
+    for entry in entries:
+        sql = PLACEHOLDER_LIST.sub('(...)', entry['sql'])
+        group = groups.setdefault(sql, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'full_scans': set(), 'views': {}})
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['full_scans'].update(entry.get('full_scans', []))
+        view = entry.get('view') or '-'
+        group['views'][view] = group['views'].get(view, 0) + 1
+    summaries = [
+        QuerySummary(sql, group['count'], group['total_ms'], group['max_ms'], sorted(group['full_scans']), group['views'])
+        for sql, group in groups.items()
+    ]
+    return sorted(summaries, key=lambda summary: summary.total_ms, reverse=True)[:limit]
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+from collections import namedtuple
+
+from django.conf import settings
+
+# Heavy packages only a few code paths need; they are imported on first use and must not load at startup.
+DEFERRED_MODULES = ('reportlab', 'PIL')
+STARTUP_SCRIPT = '''
+import time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import resolve
+resolve({path!r})
+print((time.perf_counter() - start) * 1000)
+'''
+
+ImportTime = namedtuple('ImportTime', ['module', 'self', 'cumulative', 'depth'])
+StartupProfile = namedtuple('StartupProfile', ['elapsed', 'imports'])
+
+
+def parse_importtime(output):
+    """
+    Parse the report `python -X importtime` writes to stderr.
+
+    Parameters:
+        output (str): The report, one `import time: self | cumulative | module` line per import.
+
+    Returns:
+        list: An ImportTime per imported module, in import order, with the times in milliseconds and the
+            nesting depth (0 for modules imported directly by the script).
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        if not self_time.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append(ImportTime(name.strip(), int(self_time) / 1000, int(cumulative) / 1000, depth))
+    return imports
+
+
+def profile_startup(path='/'):
+    """
+    Start a fresh interpreter that runs `django.setup()` and resolves a URL, and report what it imported.
+
+    Parameters:
+        path (str): The URL path to resolve, which imports the URLconf and the views.
+
+    Returns:
+        StartupProfile: The milliseconds the setup and resolution took and the parsed import times.
+    """
+    environment = {**os.environ}
+    environment.setdefault('DJANGO_SETTINGS_MODULE', 'Carshering.settings')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT.format(path=path)],
+        cwd=settings.BASE_DIR, env=environment, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f'Starting Django failed:\n{result.stderr}')
+    return StartupProfile(float(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr))
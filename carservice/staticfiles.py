@@ -0,0 +1,106 @@
+import gzip
+import mimetypes
+import os
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.html', '.txt', '.json', '.xml', '.map', '.ico')
+# Keep a compressed copy only if it saves at least this share of the original size.
+MINIMUM_SAVING = 0.05
+# ManifestStaticFilesStorage inserts the first 12 hex digits of the MD5 of the content before the extension.
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+# Content-Encoding -> file extension of the precompressed copies, best compression first.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compressors():
+    available = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        available.append(('.br', lambda data: brotli.compress(data, quality=11)))
+    return available
+
+
+def accepted_encodings(accept_encoding):
+    accepted = set()
+    for token in accept_encoding.split(','):
+        encoding, _, parameters = token.partition(';')
+        quality = parameters.strip().partition('q=')[2]
+        try:
+            if quality and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that also writes gzip (and, with the Brotli package installed, brotli) copies of the
+    collected text assets, so they can be served precompressed without compressing on every request.
+
+    A reference to a file missing from the manifest falls back to its unhashed name instead of failing the
+    page.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for original, hashed in self.hashed_files.items():
+            for name in {original, hashed}:
+                if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                    yield from self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as original:
+            data = original.read()
+        for extension, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) <= len(data) * (1 - MINIMUM_SAVING):
+                with open(path + extension, 'wb') as compressed_file:
+                    compressed_file.write(compressed)
+                yield name, name + extension, True
+
+
+def precompressed_file(path, accept_encoding):
+    """
+    Pick the smallest precompressed copy of a collected file that the client accepts.
+
+    Parameters:
+        path (str): The absolute path of the collected file.
+        accept_encoding (str): The Accept-Encoding header of the request.
+
+    Returns:
+        tuple: The path to serve and its Content-Encoding, or the original path and None.
+    """
+    accepted = accepted_encodings(accept_encoding)
+    for encoding, extension in ENCODINGS:
+        if encoding in accepted and os.path.isfile(path + extension):
+            return path + extension, encoding
+    return path, None
+
+
+def cache_control(name):
+    return IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(name) else REVALIDATE_CACHE_CONTROL
+
+
+def content_type(name):
+    content_type, _ = mimetypes.guess_type(name)
+    return content_type or 'application/octet-stream'
@@ -0,0 +1,295 @@
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import DEFERRED, F
+from django.utils._os import safe_join
+from django.utils.timezone import now
+
+from carservice.images import FORMATS, VARIANTS, forget_variants, variant_name
+from carservice.models import Car, MediaBlob
+from users.models import Profile
+
+CONTENT_PREFIX = 'content'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+GARBAGE_GRACE_PERIOD = timedelta(days=1)
+
+
+def is_content_addressed(name):
+    return name.replace('\\', '/').startswith(f'{CONTENT_PREFIX}/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that saves every upload under the SHA-256 hash of its content, e.g.
+    `content/3f/a2/3fa2...e1.jpg`, so the same photo uploaded for many cars is stored once.
+
+    The name given by `upload_to` only contributes the file extension. A MediaBlob row is kept for every
+    stored file; the Car and Profile signals count its references and `collect_garbage` deletes the files
+    nothing refers to. Since a name always has the same content, its URL can be cached forever.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Equal names mean equal content, so there's nothing to avoid.
+        return name
+
+    def write(self, name, content):
+        """
+        Write a file through a temporary file in its directory and move it into place, replacing a file of the
+        same name.
+
+        FileSystemStorage._save looks for another name when the file exists, which with the names kept as they
+        are never ends. Two processes storing the same upload, or rendering the variants of the same blob,
+        both just replace the file with identical content, and readers never see it half written.
+        """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as temporary_file:
+                for chunk in content.chunks():
+                    temporary_file.write(chunk)
+            os.chmod(temporary_path, self.file_permissions_mode or 0o644)
+            os.replace(temporary_path, full_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        hexdigest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        name = f'{CONTENT_PREFIX}/{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{extension}'
+
+        if not self.exists(name):
+            self.write(name, content)
+        blob, created = MediaBlob.objects.get_or_create(name=name, defaults={'size': content.size})
+        if not created:
+            # Keep the garbage collector away from a blob that is being reused.
+            MediaBlob.objects.filter(pk=blob.pk).update(updated=now())
+        return name
+
+    def save_derived(self, name, content):
+        """
+        Save a file derived from a stored blob, like an image variant, under the given name.
+
+        Parameters:
+            name (str): The name of the derived file.
+            content (File): Its content.
+
+        Returns:
+            str: The name the file was saved under.
+        """
+        return self.write(name, content)
+
+
+def add_reference(name):
+    if name and is_content_addressed(name):
+        MediaBlob.objects.filter(name=name).update(references=F('references') + 1, updated=now())
+
+
+def remove_reference(name):
+    if name and is_content_addressed(name):
+        MediaBlob.objects.filter(name=name, references__gt=0).update(references=F('references') - 1)
+
+
+def remember_name(instance, field_name):
+    """
+    Record the file name an instance has in the database: call it from post_init, when the instance is loaded,
+    and from post_save. A deferred field is left unrecorded.
+    """
+    value = instance.__dict__.get(field_name, DEFERRED)
+    instance.__dict__[f'_stored_{field_name}'] = getattr(value, 'name', value)
+
+
+def previous_name(sender, instance, field_name, raw=False):
+    """
+    Return the file name a model instance has in the database, before it is saved.
+
+    The name recorded by `remember_name` is used when the instance was loaded from or saved to the database,
+    so only instances built by hand with a primary key, or loaded with the field deferred, need a query.
+
+    Parameters:
+        sender (Model): The model class.
+        instance (Model): The instance about to be saved.
+        field_name (str): The name of its file field.
+        raw (bool): The `raw` argument of pre_save; fixtures are not looked up.
+
+    Returns:
+        str: The stored name, or None for a new instance.
+    """
+    if instance.pk is None or raw:
+        return None
+    stored = instance.__dict__.get(f'_stored_{field_name}', DEFERRED)
+    if not instance._state.adding and stored is not DEFERRED:
+        return stored
+    return sender.objects.filter(pk=instance.pk).values_list(field_name, flat=True).first()
+
+
+def update_references(previous, current):
+    if previous != current:
+        add_reference(current)
+        remove_reference(previous)
+
+
+def referenced_names():
+    counts = Counter()
+    for queryset in (
+        Car.objects.exclude(car_photo='').values_list('car_photo', flat=True),
+        Profile.objects.exclude(image='').values_list('image', flat=True),
+    ):
+        counts.update(name for name in queryset.iterator() if is_content_addressed(name))
+    return counts
+
+
+def find_legacy_file(name, sources):
+    for source in sources:
+        try:
+            path = safe_join(source, name)
+        except SuspiciousFileOperation:
+            continue
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def migrate_legacy_files(storage=default_storage, sources=None, dry_run=False):
+    """
+    Copy the files of cars and profiles stored before content addressing into the content-addressed storage
+    and point the rows at the copies.
+
+    A legacy name like `static/image/car.jpg` is looked up in each of `sources` in turn (by default
+    MEDIA_ROOT and the project directory, which was the media root back then). Every file is stored once,
+    however many rows use it. The rows are updated without signals and their references counted; the
+    originals are left in place. Names whose file can't be found are reported and left unchanged.
+
+    Parameters:
+        storage (Storage): The content-addressed storage.
+        sources (list): The directories to look for the legacy files in.
+        dry_run (bool): Only report what would be migrated.
+
+    Returns:
+        dict: The number of `files` copied, `rows` updated and the sorted list of `missing` names.
+    """
+    if sources is None:
+        sources = [settings.MEDIA_ROOT, str(settings.BASE_DIR)]
+    stored = {}
+    missing = set()
+    stats = {'files': 0, 'rows': 0}
+    for model, field_name in ((Car, 'car_photo'), (Profile, 'image')):
+        rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+        for pk, name in rows.values_list('pk', field_name).iterator():
+            if is_content_addressed(name) or name in missing:
+                continue
+            if name not in stored:
+                path = find_legacy_file(name, sources)
+                if path is None:
+                    missing.add(name)
+                    continue
+                stats['files'] += 1
+                if dry_run:
+                    stored[name] = name
+                else:
+                    with open(path, 'rb') as legacy_file:
+                        stored[name] = storage.save(os.path.basename(name), File(legacy_file))
+            if dry_run:
+                stats['rows'] += 1
+                continue
+            with transaction.atomic():
+                # Skipped if the row got another file since it was read.
+                if model.objects.filter(pk=pk, **{field_name: name}).update(**{field_name: stored[name]}):
+                    add_reference(stored[name])
+                    stats['rows'] += 1
+    stats['missing'] = sorted(missing)
+    return stats
+
+
+def derived_names(name):
+    return [variant_name(name, variant, extension) for variant in VARIANTS for extension in FORMATS]
+
+
+def collect_garbage(storage=default_storage, grace_period=GARBAGE_GRACE_PERIOD, batch_size=1000, dry_run=False):
+    """
+    Delete the stored files that no Car or Profile refers to any more.
+
+    The reference counts are first recounted from the Car and Profile rows, which repairs any drift of the
+    counters. Then the blobs without references that haven't been touched for `grace_period` are deleted in
+    batches, together with their image variants, and finally any file under the content directory without a
+    MediaBlob row (left behind by a rolled back upload) that is older than `grace_period`.
+
+    Parameters:
+        storage (Storage): The content-addressed storage.
+        grace_period (timedelta): How long an unreferenced file is kept, so uploads in progress survive.
+        batch_size (int): The number of blobs handled per query.
+        dry_run (bool): Only count what would be deleted.
+
+    Returns:
+        dict: The number of `repaired` counters, `deleted` blobs, `orphans` (files without a row) and `freed`
+            bytes.
+    """
+    counts = referenced_names()
+    cutoff = now() - grace_period
+    stats = {'repaired': 0, 'deleted': 0, 'orphans': 0, 'freed': 0}
+
+    last_id = 0
+    while True:
+        blobs = list(MediaBlob.objects.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not blobs:
+            break
+        last_id = blobs[-1].id
+        for blob in blobs:
+            references = counts.get(blob.name, 0)
+            if blob.references != references:
+                stats['repaired'] += 1
+                if not dry_run:
+                    MediaBlob.objects.filter(pk=blob.pk).update(references=references)
+            if references or blob.updated >= cutoff:
+                continue
+            if not dry_run:
+                with transaction.atomic():
+                    deleted, _ = MediaBlob.objects.filter(pk=blob.pk, references=0, updated__lt=cutoff).delete()
+                if not deleted:
+                    continue
+                for name in [blob.name, *derived_names(blob.name)]:
+                    storage.delete(name)
+                forget_variants(blob.name)
+            stats['deleted'] += 1
+            stats['freed'] += blob.size
+
+    known = set()
+    for directory, _, files in os.walk(storage.path(CONTENT_PREFIX)):
+        if os.path.basename(directory) == 'variants':
+            continue
+        for filename in files:
+            path = os.path.join(directory, filename)
+            known.add(os.path.relpath(path, storage.location).replace(os.sep, '/'))
+            if len(known) >= batch_size:
+                delete_orphans(storage, known, cutoff, stats, dry_run)
+                known = set()
+    delete_orphans(storage, known, cutoff, stats, dry_run)
+    return stats
+
+
+def delete_orphans(storage, names, cutoff, stats, dry_run):
+    stored = set(MediaBlob.objects.filter(name__in=names).values_list('name', flat=True))
+    for name in names - stored:
+        if storage.get_modified_time(name) >= cutoff:
+            continue
+        stats['orphans'] += 1
+        stats['freed'] += storage.size(name)
+        if not dry_run:
+            for derived in [name, *derived_names(name)]:
+                storage.delete(derived)
+            forget_variants(name)
@@ -0,0 +1,235 @@
+import random
+import string
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import IntegerField, Max
+from django.db.models.functions import Cast, Substr
+from django.utils.timezone import now
+
+from carservice.facets import invalidate_facet_counts
+from carservice.models import Car, Offer, Rent
+from carservice.validators import VIN_CHECK_DIGIT_INDEX, vin_check_digit
+from users.models import Profile
+
+BATCH_SIZE = 5000
+# Generated users are named `synthetic<N>`, numbered on from the highest N in the database.
+USERNAME_PREFIX = 'synthetic'
+# Share of the cars that are offered for rent.
+OFFER_SHARE = 0.8
+# How the latest rent of an offer ends up; the rents before it are all finished.
+CURRENT_RENT_WEIGHTS = {Rent.FINISHED: 60, Rent.ACTIVE: 20, Rent.PENDING: 10, Rent.OVERDUE: 10}
+LOCATIONS = ['Warsaw', 'Krakow', 'Lodz', 'Wroclaw', 'Poznan', 'Gdansk', 'Szczecin', 'Lublin', 'Katowice', None]
+MODELS = {
+    'Volkswagen': ['Golf', 'Passat', 'Polo', 'Tiguan', 'Touran'],
+    'BMW': ['Series 3', 'Series 5', 'X3', 'X5', 'Series 1'],
+    'Audi': ['A3', 'A4', 'A6', 'Q5', 'Q7'],
+    'Ford': ['Focus', 'Fiesta', 'Mondeo', 'Kuga', 'Mustang'],
+    'Opel': ['Astra', 'Corsa', 'Insignia', 'Zafira', 'Mokka'],
+    'Mercedes-Benz': ['C-Class', 'E-Class', 'A-Class', 'GLC', 'Sprinter'],
+    'Renault': ['Clio', 'Megane', 'Captur', 'Kadjar', 'Scenic'],
+    'Skoda': ['Octavia', 'Fabia', 'Superb', 'Kodiaq', 'Karoq'],
+    'Toyota': ['Corolla', 'Yaris', 'RAV4', 'Auris', 'C-HR'],
+    'Peugeot': ['208', '308', '3008', '508', '2008'],
+    'Hyundai': ['i30', 'Tucson', 'i20', 'Kona', 'Santa Fe'],
+    'Citroën': ['C3', 'C4', 'C5 Aircross', 'Berlingo', 'C1'],
+    'Volvo': ['XC60', 'XC90', 'V60', 'S60', 'XC40'],
+    'Nissan': ['Qashqai', 'Micra', 'Juke', 'X-Trail', 'Leaf'],
+    'Fiat': ['500', 'Panda', 'Tipo', 'Punto', 'Doblo'],
+    'Seat': ['Leon', 'Ibiza', 'Ateca', 'Arona', 'Tarraco'],
+    'Mazda': ['Mazda3', 'Mazda6', 'CX-5', 'CX-30', 'MX-5'],
+    'Honda': ['Civic', 'CR-V', 'Jazz', 'HR-V', 'Accord'],
+    'Suzuki': ['Vitara', 'Swift', 'SX4 S-Cross', 'Ignis', 'Jimny'],
+    'Jeep': ['Renegade', 'Compass', 'Wrangler', 'Cherokee', 'Avenger'],
+    'Dacia': ['Duster', 'Sandero', 'Logan', 'Jogger', 'Spring'],
+    'Mitsubishi': ['Outlander', 'ASX', 'Space Star', 'Eclipse Cross', 'L200'],
+    'MINI': ['Cooper', 'Countryman', 'Clubman', 'Paceman', 'Cabrio'],
+    'Other': ['Model 3', 'Model Y', 'Ioniq', 'Niro', 'Ceed'],
+}
+# Characters allowed in a VIN: digits and letters other than I, O and Q.
+VIN_CHARACTERS = ''.join(char for char in string.digits + string.ascii_uppercase if char not in 'IOQ')
+# The VIN positions after the check digit encode a serial number, numbered on from the highest car id (see
+# `next_car_serial`), so generated VINs don't repeat each other. A real VIN could still match one by chance.
+SERIAL_LENGTH = 17 - VIN_CHECK_DIGIT_INDEX - 1
+
+
+def synthetic_vin(rng, serial):
+    """
+    Build a valid VIN: random characters, the serial number in base 33 after the check digit, and the check
+    digit computed for the rest.
+
+    Parameters:
+        rng (Random): The random number generator.
+        serial (int): A number unique to this car.
+
+    Returns:
+        str: The VIN.
+    """
+    prefix = ''.join(rng.choice(VIN_CHARACTERS) for _ in range(VIN_CHECK_DIGIT_INDEX))
+    digits = []
+    for _ in range(SERIAL_LENGTH):
+        serial, digit = divmod(serial, len(VIN_CHARACTERS))
+        digits.append(VIN_CHARACTERS[digit])
+    vin = f'{prefix}0{"".join(reversed(digits))}'
+    return f'{prefix}{vin_check_digit(vin)}{vin[VIN_CHECK_DIGIT_INDEX + 1:]}'
+
+
+def insert(model, objects, key):
+    """
+    bulk_create a batch and make sure every object has its primary key, looking the keys up by the unique
+    field `key` on databases that can't return them from a bulk insert.
+    """
+    model.objects.bulk_create(objects)
+    if objects and objects[0].pk is None:
+        ids = dict(model.objects.filter(**{f'{key}__in': [getattr(obj, key) for obj in objects]}).values_list(key, 'id'))
+        for obj in objects:
+            obj.pk = ids[getattr(obj, key)]
+    return objects
+
+
+def batches(count, batch_size):
+    for start in range(0, count, batch_size):
+        yield start, min(batch_size, count - start)
+
+
+def next_user_number():
+    highest = User.objects.filter(username__regex=rf'^{USERNAME_PREFIX}[0-9]+$').aggregate(
+        highest=Max(Cast(Substr('username', len(USERNAME_PREFIX) + 1), IntegerField())),
+    )['highest']
+    return 0 if highest is None else highest + 1
+
+
+def create_users(rng, count, password, batch_size):
+    first = next_user_number()
+    password_hash = make_password(password)
+    ids = []
+    for start, size in batches(count, batch_size):
+        users = [
+            User(username=f'{USERNAME_PREFIX}{first + index}', email=f'{USERNAME_PREFIX}{first + index}@example.com',
+                 password=password_hash)
+            for index in range(start, start + size)
+        ]
+        with transaction.atomic():
+            insert(User, users, 'username')
+            Profile.objects.bulk_create([Profile(user=user, location=rng.choice(LOCATIONS)) for user in users])
+        ids.extend(user.pk for user in users)
+    return ids
+
+
+def next_car_serial():
+    # Every serial is lower than the id of its car (ids start at 1 and are never reused), so numbering on from
+    # the highest id never repeats a serial, even after cars were deleted.
+    return Car.objects.aggregate(highest=Max('id'))['highest'] or 0
+
+
+def create_cars(rng, count, owner_ids, batch_size):
+    first = next_car_serial()
+    year = now().year
+    brands = list(MODELS)
+    offers = []
+    for start, size in batches(count, batch_size):
+        cars = []
+        for index in range(start, start + size):
+            brand = rng.choice(brands)
+            car = Car(
+                vin=synthetic_vin(rng, first + index), car_brand=brand, car_model=rng.choice(MODELS[brand]),
+                car_mileage=rng.randint(0, 400000), date_of_prod=rng.randint(year - 25, year),
+                user_id=rng.choice(owner_ids),
+            )
+            car.update_search_fields()
+            cars.append(car)
+        with transaction.atomic():
+            insert(Car, cars, 'vin')
+            batch = [
+                Offer(car=car, user_id=car.user_id, price=float(rng.randrange(50, 500, 5)),
+                      description=f'{car.car_brand} {car.car_model} from {car.date_of_prod}, well kept.')
+                for car in cars if rng.random() < OFFER_SHARE
+            ]
+            insert(Offer, batch, 'car_id')
+        offers.extend((offer.pk, offer.user_id) for offer in batch)
+    return offers
+
+
+def offer_rents(rng, offer_id, owner_id, count, renter_ids, today):
+    """
+    Generate the rent history of an offer, newest first: the current rent in a state drawn from
+    CURRENT_RENT_WEIGHTS, then finished rents going back in time without overlapping.
+    """
+    states, weights = zip(*CURRENT_RENT_WEIGHTS.items())
+    state = rng.choices(states, weights)[0]
+    duration = rng.randint(1, 30)
+    if state == Rent.PENDING:
+        start = today + timedelta(days=rng.randint(1, 14))
+    elif state == Rent.ACTIVE:
+        start = today - timedelta(days=rng.randint(0, duration))
+    else:
+        start = today - timedelta(days=duration + rng.randint(1, 30))
+    close_rent = state == Rent.FINISHED
+
+    for _ in range(count):
+        end = start + timedelta(days=duration)
+        position = rng.randrange(len(renter_ids))
+        renter_id = renter_ids[position]
+        if renter_id == owner_id and len(renter_ids) > 1:
+            # Owners don't rent their own cars.
+            renter_id = renter_ids[position - 1]
+        yield Rent(
+            offer_id=offer_id, user_id=renter_id, rent_start=start, duration=duration, rent_end=end,
+            close_rent=close_rent, status=Rent.status_for(start, end, close_rent, today),
+        )
+        duration = rng.randint(1, 30)
+        # The history is in the past even when the current rent is still pending.
+        start = min(start, today) - timedelta(days=duration + rng.randint(1, 10))
+        close_rent = True
+
+
+def create_rents(rng, count, offers, renter_ids, batch_size):
+    today = now().date()
+    per_offer, extra = divmod(count, len(offers)) if offers else (0, 0)
+    batch = []
+    created = 0
+    for index, (offer_id, owner_id) in enumerate(offers):
+        rents = per_offer + (index < extra)
+        batch.extend(offer_rents(rng, offer_id, owner_id, rents, renter_ids, today))
+        if len(batch) >= batch_size or index == len(offers) - 1:
+            with transaction.atomic():
+                Rent.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    return created
+
+
+def generate_dataset(users, cars, rents, seed=0, password='password', batch_size=BATCH_SIZE):
+    """
+    Fill the database with a realistic, reproducible data set for performance work.
+
+    Creates users with profiles, cars with valid VINs spread over every brand (OFFER_SHARE of them offered)
+    and rents spread evenly over the offers. Each offer gets a non-overlapping rent history ending with a
+    current rent that is finished, active, pending or overdue. Every row is inserted with `bulk_create` in
+    batches of `batch_size`, all users share one password hash, and the same seed on an empty database
+    produces the same data. The availability of every offer is recomputed and the cached facet counts are
+    invalidated at the end.
+
+    Parameters:
+        users (int): The number of users to create; cars and rents belong to random ones of them.
+        cars (int): The number of cars to create.
+        rents (int): The number of rents to create.
+        seed (int): The seed of the random number generator.
+        password (str): The password of every user.
+        batch_size (int): The number of rows inserted at once.
+
+    Returns:
+        dict: The number of `users`, `cars`, `offers` and `rents` created.
+    """
+    if users < 1:
+        raise ValueError('At least one user is needed to own the cars.')
+    rng = random.Random(seed)
+    user_ids = create_users(rng, users, password, batch_size)
+    offers = create_cars(rng, cars, user_ids, batch_size)
+    created_rents = create_rents(rng, rents, offers, user_ids, batch_size)
+    # bulk_create skips the receivers that maintain the offers' availability.
+    Offer.objects.refresh_availability()
+    invalidate_facet_counts()
+    return {'users': len(user_ids), 'cars': cars, 'offers': len(offers), 'rents': created_rents}
@@ -1,13 +1,110 @@
+from django.db import transaction
 from django.utils.timezone import now
 
-from carservice.models import Rent
+from carservice.availability import stale_offers
+from carservice.facets import invalidate_facet_counts
+from carservice.models import Offer, Rent, StatusWatermark
 
+STATUS_SWEEP = 'rent_status'
+REFRESH_BATCH_SIZE = 500
 
-def update_status(self):
-    rents = Rent.objects.exclude(status=Rent.FINISHED)
-    for rent in rents:
-        if rent.rent_start <= now().date() <= rent.rent_end:
-            rent.status = Rent.ACTIVE
-        elif now().date() > rent.rent_end:
-            rent.status = Rent.OVERDUE
-        rent.save()
+
+def apply_status_transitions(today=None, since=None):
+    """
+    Move open rents between pending, active and overdue with one set-based UPDATE per target status.
+
+    A rent is pending before `rent_start`, active from `rent_start` to `rent_end` (inclusive) and overdue
+    after `rent_end`. Closed and finished rents are left untouched. Rows that already carry the right status
+    are excluded, so repeated calls on the same day do not rewrite anything. The availability of the offers
+    of the moved rents is updated in the same transaction.
+
+    When `since` is given, the statuses are assumed to be correct as of that date and only rents whose
+    `rent_start` or `rent_end` crossed a date boundary in between are considered, which keeps the cost
+    proportional to the number of changed rents when `rent_start` and `rent_end` are indexed.
+
+    Parameters:
+        today (date): The date to evaluate the rents against. Defaults to the current date.
+        since (date): The date the statuses were last brought up to date, or None for a full pass.
+
+    Returns:
+        dict: The number of rents moved into each status, keyed by the target status.
+    """
+    if today is None:
+        today = now().date()
+
+    rents = Rent.objects.filter(close_rent=False).exclude(status=Rent.FINISHED)
+    activated = rents.filter(rent_start__lte=today, rent_end__gte=today)
+    overdue = rents.filter(rent_end__lt=today)
+    if since is None:
+        transitions = (
+            (Rent.ACTIVE, activated),
+            (Rent.OVERDUE, overdue),
+            (Rent.PENDING, rents.filter(rent_start__gt=today)),
+        )
+    else:
+        transitions = (
+            (Rent.ACTIVE, activated.filter(rent_start__gt=since)),
+            (Rent.OVERDUE, overdue.filter(rent_end__gte=since)),
+        )
+
+    counts = {}
+    changed_offers = set()
+    with transaction.atomic():
+        for status, queryset in transitions:
+            changed = queryset.exclude(status=status)
+            changed_offers.update(changed.values_list('offer_id', flat=True))
+            counts[status] = changed.update(status=status)
+        # Only the offers of the moved rents may have become available (overdue) or not.
+        offer_ids = sorted(changed_offers)
+        for start in range(0, len(offer_ids), REFRESH_BATCH_SIZE):
+            Offer.objects.filter(pk__in=offer_ids[start:start + REFRESH_BATCH_SIZE]).refresh_availability()
+        if any(counts.values()):
+            transaction.on_commit(invalidate_facet_counts)
+    return counts
+
+
+def sweep_rent_status(today=None):
+    """
+    Bring rent statuses up to date incrementally, starting from the persisted watermark.
+
+    The first sweep runs a full pass. Later sweeps only look at rents that crossed a date boundary since the
+    watermark, and a second sweep on the same day does nothing and returns an empty dict.
+
+    Parameters:
+        today (date): The date to sweep up to. Defaults to the current date.
+
+    Returns:
+        dict: The number of rents moved into each status, keyed by the target status.
+    """
+    if today is None:
+        today = now().date()
+
+    with transaction.atomic():
+        watermark = StatusWatermark.objects.select_for_update().filter(name=STATUS_SWEEP).first()
+        if watermark is not None and watermark.swept_until >= today:
+            return {}
+
+        counts = apply_status_transitions(today, since=watermark.swept_until if watermark else None)
+        StatusWatermark.objects.update_or_create(name=STATUS_SWEEP, defaults={'swept_until': today})
+    return counts
+
+
+def repair_offer_availability(batch_size=500, dry_run=False):
+    """
+    Find the offers whose stored availability doesn't match their rents and recompute it.
+
+    Parameters:
+        batch_size (int): The number of offers updated per transaction.
+        dry_run (bool): Only find the inconsistent offers.
+
+    Returns:
+        list: The ids of the offers that were inconsistent.
+    """
+    offer_ids = stale_offers()
+    if dry_run or not offer_ids:
+        return offer_ids
+    for start in range(0, len(offer_ids), batch_size):
+        with transaction.atomic():
+            Offer.objects.filter(pk__in=offer_ids[start:start + batch_size]).refresh_availability()
+    invalidate_facet_counts()
+    return offer_ids
@@ -0,0 +1,21 @@
+from django import template
+
+from carservice.images import image_sources
+
+register = template.Library()
+
+
+@register.inclusion_tag('responsive_image.html')
+def responsive_image(field_file, alt, sizes='200px', css_class='', style='', loading='lazy'):
+    """
+    Render an uploaded image as a <picture> with WebP and JPEG srcsets, so the browser downloads the smallest
+    variant that fills `sizes`, lazily by default.
+
+    Usage:
+        {% load responsive_images %}
+        {% responsive_image offer.car.car_photo 'Car photo' sizes='200px' css_class='rounded offer-image' %}
+    """
+    return {
+        **image_sources(field_file),
+        'alt': alt, 'sizes': sizes, 'css_class': css_class, 'style': style, 'loading': loading,
+    }
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from carservice.models import Car, Offer, Rent
+from carservice.views import all_offers, carsearch, offer_detail, offer_detail_search, rent_panel
+
+
+class TestAsyncViews(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.owner = User.objects.create_user(username='owner', password='testpassword')
+        self.car = Car.objects.create(
+            vin='1G8MG35X48Y106575', car_mileage=1000, car_brand='Opel', car_model='Astra', user=self.owner,
+        )
+        self.offer = Offer.objects.create(car=self.car, price=100.0, user=self.owner)
+        cache.clear()
+
+    async def login(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+
+    def test_views_are_async(self):
+        for view in (all_offers, carsearch, offer_detail, offer_detail_search, rent_panel):
+            self.assertTrue(asyncio.iscoroutinefunction(view), view.__name__)
+
+    async def test_login_required(self):
+        response = await self.async_client.get(reverse('all_offers'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, f"{settings.LOGIN_URL}?next={reverse('all_offers')}")
+
+    async def test_user_loaded_by_middleware(self):
+        await self.login()
+        response = await self.async_client.get(reverse('all_offers'))
+        self.assertIs(type(response.asgi_request.user), User)
+        self.assertEqual(response.asgi_request.user, self.user)
+
+    def test_user_loaded_by_decorator_under_wsgi(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('all_offers'))
+        self.assertIs(type(response.wsgi_request.user), User)
+
+    async def test_all_offers(self):
+        await self.login()
+        response = await self.async_client.get(reverse('all_offers'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([offer.id for offer in response.context['offers']], [self.offer.id])
+        self.assertContains(response, 'Opel Astra')
+
+    async def test_all_offers_with_facets(self):
+        await self.login()
+        response = await self.async_client.get(reverse('all_offers'), {'brand': 'Opel'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([offer.id for offer in response.context['offers']], [self.offer.id])
+
+    async def test_carsearch(self):
+        await self.login()
+        response = await self.async_client.get(reverse('carsearch'), {'search': 'astra'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['offers'], [self.offer])
+
+    async def test_offer_detail(self):
+        await self.login()
+        response = await self.async_client.get(reverse('offer_detail', kwargs={'offer_id': self.offer.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['offer'], self.offer)
+
+    async def test_offer_detail_not_found(self):
+        await self.login()
+        response = await self.async_client.get(reverse('offer_detail_search', kwargs={'offer_id': 0}))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_rent_panel(self):
+        await self.login()
+        await Rent.objects.acreate(offer=self.offer, user=self.user, rent_start=date(2030, 1, 1), duration=2)
+        response = await self.async_client.get(reverse('rent_panel'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['rents_as_renter']), 1)
+        self.assertEqual(len(response.context['rents_as_owner']), 0)
@@ -0,0 +1,136 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.utils.timezone import now
+
+from carservice.availability import available_offers, is_available, overlapping_rents, stale_offers
+from carservice.models import Car, Offer, Rent
+from carservice.tasks import apply_status_transitions
+
+
+class TestAvailability(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='testuser', password='12345')
+        car = Car.objects.create(car_model='Astra', car_brand='Opel', car_mileage=100000, user=self.user)
+        self.offer = Offer.objects.create(price=100.0, car=car, user=self.user)
+        self.today = now().date()
+        self.rent = Rent.objects.create(
+            offer=self.offer, user=self.user, rent_start=self.today + timedelta(days=5), duration=3
+        )
+
+    def day(self, days):
+        return self.today + timedelta(days=days)
+
+    def test_overlapping_ranges(self):
+        self.assertFalse(is_available(self.offer, self.day(4), self.day(5)))
+        self.assertFalse(is_available(self.offer, self.day(6), self.day(7)))
+        self.assertFalse(is_available(self.offer, self.day(8), self.day(10)))
+        self.assertFalse(is_available(self.offer, self.day(1), self.day(12)))
+
+    def test_disjoint_ranges(self):
+        self.assertTrue(is_available(self.offer, self.day(1), self.day(4)))
+        self.assertTrue(is_available(self.offer, self.day(9), self.day(12)))
+
+    def test_closed_rents_do_not_block(self):
+        self.rent.close_rent = True
+        self.rent.save()
+        self.assertFalse(overlapping_rents(self.offer, self.rent.rent_start, self.rent.rent_end).exists())
+
+
+class TestOfferAvailability(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='owner', password='12345')
+        self.renter = User.objects.create(username='renter', password='12345')
+        car = Car.objects.create(car_model='Astra', car_brand='Opel', car_mileage=100000, user=self.owner)
+        self.offer = Offer.objects.create(price=100.0, car=car, user=self.owner)
+        self.today = now().date()
+
+    def assertAvailability(self, is_available, current_rent_end=None):
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.is_available, is_available)
+        self.assertEqual(self.offer.current_rent_end, current_rent_end)
+        self.assertEqual(available_offers().filter(pk=self.offer.pk).exists(), is_available)
+
+    def rent(self, days_from_today=0, duration=3):
+        return Rent.objects.create(
+            offer=self.offer, user=self.renter, rent_start=self.today + timedelta(days=days_from_today),
+            duration=duration,
+        )
+
+    def test_rent_lifecycle(self):
+        self.assertAvailability(True)
+        rent = self.rent()
+        self.assertAvailability(False, rent.rent_end)
+
+        rent.close_rent = True
+        rent.save()
+        self.assertAvailability(True)
+
+        pending = self.rent(days_from_today=5)
+        self.assertAvailability(False, pending.rent_end)
+        pending.delete()
+        self.assertAvailability(True)
+
+    def test_rolled_back_rent_leaves_offer_available(self):
+        try:
+            with transaction.atomic():
+                self.rent()
+                raise IntegrityError
+        except IntegrityError:
+            pass
+        self.assertAvailability(True)
+
+    def test_status_transitions(self):
+        rent = self.rent()
+        Rent.objects.filter(pk=rent.pk).update(rent_end=self.today - timedelta(days=1))
+
+        apply_status_transitions(self.today)
+
+        self.assertAvailability(True)
+
+    def test_stale_offer_instance_keeps_availability(self):
+        stale = Offer.objects.get(pk=self.offer.pk)
+        rent = self.rent()
+        stale.price = 120.0
+        stale.save()
+
+        self.assertAvailability(False, rent.rent_end)
+        self.assertEqual(self.offer.price, 120.0)
+
+    def test_status_transitions_refresh_only_moved_offers(self):
+        car = Car.objects.create(
+            vin='1' * 17, car_model='Corsa', car_brand='Opel', car_mileage=1000, user=self.owner,
+        )
+        untouched = Offer.objects.create(price=100.0, car=car, user=self.owner)
+        Offer.objects.filter(pk=untouched.pk).update(is_available=False)
+        rent = self.rent()
+        Rent.objects.filter(pk=rent.pk).update(rent_end=self.today - timedelta(days=1))
+
+        apply_status_transitions(self.today)
+
+        self.assertAvailability(True)
+        self.assertFalse(Offer.objects.get(pk=untouched.pk).is_available)
+
+    def test_repair_command(self):
+        rent_end = self.today + timedelta(days=2)
+        Rent.objects.bulk_create([Rent(
+            offer=self.offer, user=self.renter, rent_start=self.today, duration=2, rent_end=rent_end,
+            status=Rent.ACTIVE,
+        )])
+        self.assertEqual(stale_offers(), [self.offer.pk])
+
+        out = StringIO()
+        call_command('repair_offer_availability', '--dry-run', stdout=out)
+        self.assertIn('Found 1 inconsistent offers', out.getvalue())
+        self.assertAvailability(True)
+
+        call_command('repair_offer_availability', stdout=out)
+        self.assertAvailability(False, rent_end)
+        self.assertEqual(stale_offers(), [])
+
+    def test_catalogue_does_not_join_rents(self):
+        self.assertNotIn('carservice_rent', str(available_offers().order_by('price', 'id').query))
@@ -0,0 +1,86 @@
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils.timezone import now
+
+from carservice.catalogue import CARD_PREFIX, catalogue_offers, offer_cards
+from carservice.models import Car, Offer, Rent
+from carservice.pagination import page_queryset
+
+
+class TestCatalogueCache(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='testpassword')
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.cheap = self.create_offer('Opel', 50.0, self.owner)
+        self.expensive = self.create_offer('BMW', 300.0, self.owner)
+        self.own = self.create_offer('Audi', 100.0, self.user)
+
+    def create_offer(self, brand, price, user):
+        car = Car.objects.create(
+            vin=f'{Car.objects.count():017d}', car_brand=brand, car_model='Model', car_mileage=1000, user=user,
+        )
+        return Offer.objects.create(car=car, price=price, user=user)
+
+    def listed(self):
+        self.client.force_login(self.user)
+        return [offer.id for offer in self.client.get(reverse('all_offers')).context['offers']]
+
+    def test_offers_are_sorted_by_price(self):
+        self.assertEqual(self.listed(), [self.cheap.id, self.expensive.id])
+
+    def test_own_offers_are_excluded_per_request(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('all_offers'))
+        self.assertEqual([row.id for row in response.context['offers']], [self.cheap.id, self.expensive.id])
+        self.assertContains(response, 'BMW Model')
+        self.assertNotContains(response, 'Audi Model')
+
+    def test_next_page_seeks_in_partial_index(self):
+        page = page_queryset(catalogue_offers(self.user), ('price', 'id'), 24, [50.0, self.cheap.id], None)
+        self.assertIn('SEARCH carservice_offer USING INDEX offer_available_price_idx', page.explain())
+
+    def test_rent_removes_only_the_rented_offer(self):
+        offer_cards([self.cheap.id, self.expensive.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            Rent.objects.create(offer=self.cheap, user=self.owner, rent_start=now().date(), duration=2)
+
+        self.assertEqual(self.listed(), [self.expensive.id])
+        self.assertIsNone(cache.get(f'{CARD_PREFIX}{self.cheap.id}'))
+        self.assertIsNotNone(cache.get(f'{CARD_PREFIX}{self.expensive.id}'))
+
+    def test_car_change_evicts_card(self):
+        offer_cards([self.expensive.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.expensive.car.car_model = 'X5'
+            self.expensive.car.save()
+        self.assertIn('BMW X5', offer_cards([self.expensive.id])[0])
+
+    def test_price_change_moves_offer(self):
+        self.listed()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.expensive.price = 10.0
+            self.expensive.save()
+        self.assertEqual(self.listed(), [self.expensive.id, self.cheap.id])
+        self.assertIn('10.0 PLN/day', offer_cards([self.expensive.id])[0])
+
+    def test_deleted_offer_leaves_catalogue(self):
+        self.listed()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheap.delete()
+        self.assertEqual(self.listed(), [self.expensive.id])
+
+
+class TestCatalogueFileCache(TestCatalogueCache):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name}
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        super().setUp()
@@ -0,0 +1,103 @@
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils.timezone import now
+
+from carservice.facets import (
+    COUNTS_LOCK, facet_counts, facet_options, invalidate_facet_counts, refresh_stale_facet_counts,
+)
+from carservice.models import Car, Offer, Rent
+from carservice.tasks import apply_status_transitions
+
+
+class TestFacets(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='testpassword')
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.bmw = self.create_offer('BMW', 150.0, 2018, 40000)
+        self.opel = self.create_offer('Opel', 80.0, 2005, 150000)
+
+    def create_offer(self, brand, price, year, mileage):
+        car = Car.objects.create(
+            vin=f'{Car.objects.count():017d}', car_brand=brand, car_model='Model', date_of_prod=year,
+            car_mileage=mileage, user=self.owner,
+        )
+        return Offer.objects.create(car=car, price=price, user=self.owner)
+
+    def test_counts(self):
+        counts = facet_counts()
+        self.assertEqual(counts[('brand', 'BMW')], 1)
+        self.assertEqual(counts[('brand', 'Audi')], 0)
+        self.assertEqual(counts[('price', '100-200')], 1)
+        self.assertEqual(counts[('price', '-100')], 1)
+        self.assertEqual(counts[('year', '2015-2020')], 1)
+        self.assertEqual(counts[('mileage', '100000-200000')], 1)
+
+    def test_counts_are_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            facet_counts()
+        with self.assertNumQueries(0):
+            facet_counts()
+
+    def test_committed_changes_mark_counts_stale(self):
+        facet_counts()
+        with self.captureOnCommitCallbacks(execute=True):
+            audi = self.create_offer('Audi', 600.0, 2021, 1000)
+        with self.captureOnCommitCallbacks(execute=True):
+            Rent.objects.create(offer=self.bmw, user=self.user, rent_start=now().date(), duration=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.opel.price = 250.0
+            self.opel.save()
+
+        counts = facet_counts()
+        self.assertEqual(counts[('brand', 'Audi')], 1)
+        self.assertEqual(counts[('brand', 'BMW')], 0)
+        self.assertEqual(counts[('price', '-100')], 0)
+        self.assertEqual(counts[('price', '200-500')], 1)
+        self.assertEqual(counts[('price', '500-')], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            audi.car.delete()
+        self.assertEqual(facet_counts()[('brand', 'Audi')], 0)
+
+    def test_counts_are_kept_while_another_process_recounts(self):
+        facet_counts()
+        invalidate_facet_counts()
+        cache.add(COUNTS_LOCK, True)
+        self.create_offer('Audi', 600.0, 2021, 1000)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(facet_counts()[('brand', 'Audi')], 0)
+        cache.delete(COUNTS_LOCK)
+        self.assertTrue(refresh_stale_facet_counts())
+        self.assertEqual(facet_counts()[('brand', 'Audi')], 1)
+
+    @override_settings(FACET_COUNTS_TIMEOUT=0)
+    def test_timeout(self):
+        facet_counts()
+        self.create_offer('Audi', 600.0, 2021, 1000)
+        self.assertEqual(facet_counts()[('brand', 'Audi')], 1)
+
+    def test_status_engine_invalidates_counts(self):
+        facet_counts()
+        rent = Rent.objects.create(offer=self.bmw, user=self.user, rent_start=now().date(), duration=3)
+        Rent.objects.filter(pk=rent.pk).update(rent_end=now().date().replace(year=2000))
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_status_transitions()
+        self.assertEqual(facet_counts()[('brand', 'BMW')], 1)
+
+    def test_options_without_counts(self):
+        options = facet_options(QueryDict(), counts={})[0]['options']
+        self.assertEqual(options[0]['count'], None)
+
+    def test_all_offers_filters(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('all_offers'), {'brand': 'BMW'})
+        self.assertEqual(list(response.context['offers']), [self.bmw])
+        response = self.client.get(reverse('all_offers'), {'price': '-100', 'mileage': '100000-200000'})
+        self.assertEqual(list(response.context['offers']), [self.opel])
+        response = self.client.get(reverse('all_offers'), {'year': '2020-', 'brand': 'Unknown'})
+        self.assertEqual(list(response.context['offers']), [])
+        self.assertContains(response, 'BMW (1)')
@@ -0,0 +1,165 @@
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from carservice.catalogue import CARD_PREFIX, offer_cards
+from carservice import images
+from carservice.images import VARIANTS, generate_variants, has_variants, image_sources, variant_name
+from carservice.models import Car, Offer
+
+
+def image_file(width=1600, height=900, image_format='PNG'):
+    buffer = io.BytesIO()
+    mode = 'RGBA' if image_format == 'PNG' else 'RGB'
+    Image.new(mode, (width, height), (200, 30, 30, 255)[:len(mode)]).save(buffer, image_format)
+    return ContentFile(buffer.getvalue(), name=f'photo.{image_format.lower()}')
+
+
+class ImageTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_VARIANT_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+
+
+class TestGenerateVariants(ImageTestCase):
+    def test_variants(self):
+        name = default_storage.save('static/image/photo.png', image_file())
+        self.assertFalse(has_variants(name))
+
+        written = generate_variants(name)
+
+        self.assertEqual(len(written), len(VARIANTS) * 2)
+        self.assertTrue(has_variants(name))
+        for variant, width in VARIANTS.items():
+            with default_storage.open(variant_name(name, variant, 'webp')) as variant_file:
+                image = Image.open(variant_file)
+                self.assertEqual((image.format, image.width), ('WEBP', width))
+                self.assertEqual(image.height, round(width * 900 / 1600))
+        self.assertEqual(generate_variants(name), [])
+
+    def test_small_images_are_not_upscaled(self):
+        name = default_storage.save('static/image/photo.png', image_file(100, 50))
+        generate_variants(name)
+        with default_storage.open(variant_name(name, 'full', 'jpeg')) as variant_file:
+            self.assertEqual(Image.open(variant_file).size, (100, 50))
+
+    def test_unreadable_image(self):
+        name = default_storage.save('static/image/photo.png', ContentFile(b'not an image'))
+        self.assertEqual(generate_variants(name), [])
+        self.assertEqual(generate_variants('static/image/missing.png'), [])
+
+    def test_image_sources(self):
+        car = Car.objects.create(
+            vin='1G1JC1240WM100000', car_mileage=1000, car_brand='Opel', car_model='Astra', date_of_prod=2020,
+            user=self.user, car_photo=default_storage.save('static/image/photo.png', image_file()),
+        )
+        default_storage.delete(variant_name(car.car_photo.name, 'full', 'jpeg'))
+        self.assertEqual(image_sources(car.car_photo), {'src': car.car_photo.url, 'srcsets': {}})
+
+        generate_variants(car.car_photo.name, force=True)
+        sources = image_sources(car.car_photo)
+        self.assertTrue(sources['src'].endswith('.card.jpeg'))
+        self.assertIn('.thumb.webp 160w', sources['srcsets']['webp'])
+
+        html = Template(
+            "{% load responsive_images %}{% responsive_image car.car_photo 'Car photo' css_class='rounded' %}"
+        ).render(Context({'car': car}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('class="rounded"', html)
+
+    def test_image_sources_are_not_checked_in_the_storage_again(self):
+        name = default_storage.save('static/image/photo.png', image_file())
+        self.assertFalse(has_variants(name))
+        generate_variants(name)
+        # Removed behind the cache's back, so only the cached answer can still know about them.
+        default_storage.delete(variant_name(name, 'full', 'jpeg'))
+        self.assertTrue(has_variants(name))
+
+        cache.clear()
+        self.assertFalse(has_variants(name))
+
+
+class TestVariantSignals(ImageTestCase):
+    def test_car_photo_upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            car = Car.objects.create(
+                vin='1G1JC1240WM100000', car_mileage=1000, car_brand='Opel', car_model='Astra',
+                date_of_prod=2020, user=self.user, car_photo=image_file(),
+            )
+        self.assertTrue(has_variants(car.car_photo.name))
+
+    def test_variants_evict_offer_card(self):
+        car = Car.objects.create(
+            vin='1G1JC1240WM100000', car_mileage=1000, car_brand='Opel', car_model='Astra', date_of_prod=2020,
+            user=self.user,
+        )
+        offer = Offer.objects.create(car=car, user=self.user, price=100, description='Opel')
+        offer_cards([offer.id])
+        self.assertIsNotNone(cache.get(f'{CARD_PREFIX}{offer.id}'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            car.car_photo = image_file()
+            car.save()
+
+        self.assertIsNone(cache.get(f'{CARD_PREFIX}{offer.id}'))
+        self.assertIn('srcset', offer_cards([offer.id])[0])
+
+    def test_profile_image_upload(self):
+        from users.models import Profile
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = Profile.objects.create(user=self.user, image=image_file(400, 400, 'JPEG'))
+        self.assertTrue(has_variants(profile.image.name))
+
+    def test_backfill_command(self):
+        name = default_storage.save('static/image/photo.png', image_file())
+        Car.objects.bulk_create([Car(
+            vin='1G1JC1240WM100000', car_mileage=1000, car_brand='Opel', car_model='Astra', date_of_prod=2020,
+            user=self.user, car_photo=name,
+        )])
+        out = io.StringIO()
+        call_command('generate_image_variants', stdout=out)
+        self.assertTrue(has_variants(name))
+        self.assertIn('Rendered variants of 1 of 1 images.', out.getvalue())
+
+
+class TestVariantQueue(ImageTestCase):
+    def setUp(self):
+        super().setUp()
+        # The pool is created with the settings of its first use.
+        images.shutdown()
+
+    def create_car(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Car.objects.create(
+                vin='1G1JC1240WM100000', car_mileage=1000, car_brand='Opel', car_model='Astra',
+                date_of_prod=2020, user=self.user, car_photo=image_file(),
+            )
+
+    @override_settings(IMAGE_VARIANT_WORKERS=1)
+    def test_shutdown_renders_the_queue(self):
+        car = self.create_car()
+        images.shutdown()
+        self.assertTrue(has_variants(car.car_photo.name))
+
+    @override_settings(IMAGE_VARIANT_WORKERS=1, IMAGE_VARIANT_QUEUE=0)
+    def test_full_queue_skips(self):
+        with self.assertLogs('carservice.images', 'WARNING') as logs:
+            car = self.create_car()
+        images.shutdown()
+        self.assertFalse(has_variants(car.car_photo.name))
+        self.assertIn('queue is full', logs.output[0])
@@ -0,0 +1,153 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from carservice.catalogue import catalogue_offers
+from carservice.importer import check_batch, import_fleet, insert_batch, read_rows
+from carservice.models import Car, Offer
+
+HEADER = 'vin,car_brand,car_model,car_mileage,date_of_prod,price,description\n'
+VALID_ROWS = [
+    'JH4DB1550LS000111,Opel,Astra,120000,2015,150,Family car\n',
+    '5NPEB4AC1DH576656,Hyundai,i30,80000,2013,,\n',
+    '1G1JC1240WM100000,Mercedes-Benz,C-Class,50000,2020,300,\n',
+]
+
+
+class TestImportFleet(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+
+    def import_csv(self, text, **kwargs):
+        errors = []
+        result = import_fleet(read_rows(io.StringIO(text), 'csv'), self.user, on_error=errors.append, **kwargs)
+        return result, errors
+
+    def test_imports_cars_and_offers(self):
+        result, errors = self.import_csv(HEADER + ''.join(VALID_ROWS), batch_size=2)
+
+        self.assertEqual((result.rows, result.cars, result.offers, result.failed), (3, 3, 2, 0))
+        self.assertEqual(errors, [])
+        car = Car.objects.get(vin='1G1JC1240WM100000')
+        self.assertEqual((car.user, car.search_brand, car.search_model), (self.user, 'mercedes benz', 'c class'))
+        self.assertEqual(car.offer.price, 300)
+        self.assertFalse(Offer.objects.filter(car__vin='5NPEB4AC1DH576656').exists())
+
+    def test_reports_invalid_rows(self):
+        rows = [
+            'JH4DB1551LS000111,Opel,Astra,120000,2015,,\n',
+            '5NPEB4AC1DH576656,Tesla,Model 3,80000,2013,,\n',
+            '1G1JC1240WM100000,Opel,Astra,2000000,1800,5,\n',
+            'JH4DB1550LS000111,Opel,Astra,120000,2015,,\n',
+            'jh4db1550ls000111,Opel,Astra,120000,2015,,\n',
+        ]
+        result, errors = self.import_csv(HEADER + ''.join(rows))
+
+        self.assertEqual((result.rows, result.cars, result.failed), (5, 1, 4))
+        self.assertEqual([error.line for error in errors], [2, 3, 4, 6])
+        self.assertEqual(set(errors[0].errors), {'vin'})
+        self.assertEqual(set(errors[1].errors), {'car_brand'})
+        self.assertEqual(set(errors[2].errors), {'car_mileage', 'date_of_prod', 'price'})
+        self.assertEqual(errors[3].errors, {'vin': 'Car with this Vin already exists.'})
+
+    def test_skips_existing_vins(self):
+        self.import_csv(HEADER + VALID_ROWS[0])
+        result, errors = self.import_csv(HEADER + ''.join(VALID_ROWS))
+
+        self.assertEqual((result.cars, result.failed), (2, 1))
+        self.assertEqual(errors[0].vin, 'JH4DB1550LS000111')
+
+    def test_ndjson(self):
+        lines = [
+            json.dumps({'vin': 'JH4DB1550LS000111', 'car_brand': 'Opel', 'car_model': 'Astra',
+                        'car_mileage': 120000, 'date_of_prod': 2015, 'price': 150.5}),
+            '',
+            'not json',
+        ]
+        errors = []
+        result = import_fleet(read_rows(io.StringIO('\n'.join(lines)), 'ndjson'), self.user, on_error=errors.append)
+
+        self.assertEqual((result.rows, result.cars, result.offers, result.failed), (2, 1, 1, 1))
+        self.assertEqual(errors[0].line, 3)
+
+    def test_ndjson_value_types(self):
+        row = {'vin': 'JH4DB1550LS000111', 'car_brand': 'Opel', 'car_model': 'Astra',
+               'car_mileage': 120000, 'date_of_prod': 2015, 'price': 150.5}
+        lines = [
+            json.dumps({**row, 'car_brand': ['Opel'], 'car_model': 7, 'description': {'a': 1}}),
+            json.dumps({**row, 'vin': ['JH4DB1550LS000111'], 'car_mileage': 1.5e3, 'date_of_prod': True}),
+            json.dumps({**row, 'price': [150]}),
+            '{"vin": "JH4DB1550LS000111", "car_brand": "Opel", "car_model": "Astra", "car_mileage": 1, '
+            '"date_of_prod": 2015, "price": NaN}',
+        ]
+        errors = []
+        result = import_fleet(read_rows(io.StringIO('\n'.join(lines)), 'ndjson'), self.user, on_error=errors.append)
+
+        self.assertEqual((result.rows, result.cars, result.failed), (4, 0, 4))
+        self.assertEqual(set(errors[0].errors), {'car_brand', 'car_model', 'description'})
+        self.assertEqual(set(errors[1].errors), {'vin', 'car_mileage', 'date_of_prod'})
+        self.assertEqual(errors[1].errors['vin'], 'Enter a valid value.')
+        self.assertEqual(errors[2].errors['price'], 'Enter a valid value.')
+        self.assertEqual(errors[3].errors['price'], 'Enter a number.')
+
+    def test_vin_added_after_check(self):
+        rows = list(read_rows(io.StringIO(HEADER + ''.join(VALID_ROWS)), 'csv'))
+        accepted, failed = check_batch(rows, self.user)
+        Car.objects.create(
+            vin='5NPEB4AC1DH576656', car_brand='Opel', car_model='Astra', car_mileage=1, date_of_prod=2015,
+            user=self.user,
+        )
+        cars, offers, duplicates = insert_batch(accepted)
+
+        self.assertEqual((len(accepted), failed), (3, []))
+        self.assertEqual((cars, offers), (2, 2))
+        self.assertEqual(duplicates[0].line, 3)
+        self.assertEqual(duplicates[0].errors, {'vin': 'Car with this Vin already exists.'})
+        self.assertEqual(Car.objects.count(), 3)
+        self.assertEqual(Offer.objects.count(), 2)
+
+    def test_offers_are_listed(self):
+        other = User.objects.create_user(username='other')
+        self.import_csv(HEADER + VALID_ROWS[0])
+        self.assertEqual(catalogue_offers(other).count(), 1)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'fleet.csv')
+            report = os.path.join(directory, 'report.csv')
+            with open(path, 'w') as fleet_file:
+                fleet_file.write(HEADER + ''.join(VALID_ROWS) + 'JH4DB1550LS000111,Opel,Astra,1,2015,,\n')
+            out = io.StringIO()
+            call_command('import_fleet', path, user='testuser', report=report, stdout=out)
+            with open(report) as report_file:
+                report_lines = report_file.read().splitlines()
+
+        self.assertIn('imported 3 cars and 2 offers, 1 rows failed', out.getvalue())
+        self.assertEqual(len(report_lines), 2)
+        self.assertTrue(report_lines[1].startswith('5,JH4DB1550LS000111,'))
+
+    def test_upload(self):
+        self.client.login(username='testuser', password='testpassword')
+        fleet_file = SimpleUploadedFile('fleet.csv', (HEADER + ''.join(VALID_ROWS)).encode())
+        response = self.client.post(reverse('car_import'), {'fleet_file': fleet_file})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result'].cars, 3)
+        self.assertEqual(Car.objects.filter(user=self.user).count(), 3)
+
+    @override_settings(FLEET_IMPORT_MAX_ROWS=2)
+    def test_upload_too_many_rows(self):
+        self.client.login(username='testuser', password='testpassword')
+        fleet_file = SimpleUploadedFile('fleet.csv', (HEADER + ''.join(VALID_ROWS)).encode())
+        response = self.client.post(reverse('car_import'), {'fleet_file': fleet_file})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('more than 2 rows', response.context['form'].errors['fleet_file'][0])
+        self.assertFalse(Car.objects.exists())
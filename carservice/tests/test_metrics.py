@@ -0,0 +1,137 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+
+from carservice.metrics import (
+    ARCHIVE_FILE, AVAILABLE_OFFERS, OPEN_RENTS, OVERDUE_RENTS, REQUESTS, Histogram, load_gauges, refresh_gauges,
+    refresh_stale_gauges,
+)
+from carservice.models import Car, Offer, Rent
+
+
+class TestHistogram(SimpleTestCase):
+    def test_exposition(self):
+        histogram = Histogram('latency_seconds', 'Latency.', ['view'], buckets=(0.1, 1.0))
+        histogram.observe(('home',), 0.05)
+        histogram.observe(('home',), 0.5)
+        histogram.observe(('say "hi"',), 2.0)
+
+        self.assertEqual(histogram.expose(), [
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{view="home",le="0.1"} 1',
+            'latency_seconds_bucket{view="home",le="1.0"} 2',
+            'latency_seconds_bucket{view="home",le="+Inf"} 2',
+            'latency_seconds_sum{view="home"} 0.55',
+            'latency_seconds_count{view="home"} 2',
+            'latency_seconds_bucket{view="say \\"hi\\"",le="0.1"} 0',
+            'latency_seconds_bucket{view="say \\"hi\\"",le="1.0"} 0',
+            'latency_seconds_bucket{view="say \\"hi\\"",le="+Inf"} 1',
+            'latency_seconds_sum{view="say \\"hi\\""} 2.0',
+            'latency_seconds_count{view="say \\"hi\\""} 1',
+        ])
+
+    def test_merge(self):
+        histogram = Histogram('latency_seconds', 'Latency.', ['view'], buckets=(0.1, 1.0))
+        histogram.observe(('home',), 0.05)
+        snapshot = json.loads(json.dumps(histogram.snapshot()))
+
+        self.assertEqual(histogram.merge([snapshot, snapshot]), {('home',): ([2, 2, 2], 0.1)})
+
+
+class TestMetricsView(TestCase):
+    def test_requests_are_counted(self):
+        self.client.get(reverse('home'))
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('carservice_request_duration_seconds_bucket{view="home",le="+Inf"}', body)
+        self.assertIn('carservice_requests_total{view="home",status="200"}', body)
+        self.assertIn('carservice_db_queries_total{view="home"}', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_workers_are_summed(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # A worker that is still running and one that exited, each with one request of a view of its own.
+        exited = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True)
+        for pid, view in ((os.getppid(), 'running'), (int(exited.stdout), 'exited')):
+            with open(os.path.join(directory.name, f'{pid}.json'), 'w') as snapshot_file:
+                json.dump({REQUESTS.name: [[[view, '200'], 1]]}, snapshot_file)
+
+        with override_settings(METRICS_DIR=directory.name):
+            self.client.get(reverse('home'))
+            body = self.client.get(reverse('metrics')).content.decode()
+            # The exited worker was archived, and is counted once on the next scrape too.
+            self.assertIn(
+                'carservice_requests_total{view="exited",status="200"} 1',
+                self.client.get(reverse('metrics')).content.decode(),
+            )
+
+        self.assertIn('carservice_requests_total{view="running",status="200"} 1', body)
+        self.assertIn('carservice_requests_total{view="exited",status="200"} 1', body)
+        self.assertIn('carservice_requests_total{view="home",status="200"}', body)
+        files = ['.lock', ARCHIVE_FILE, f'{os.getppid()}.json', f'{os.getpid()}.json']
+        self.assertEqual(sorted(os.listdir(directory.name)), sorted(files))
+
+
+class TestGauges(TestCase):
+    def test_refresh_gauges(self):
+        user = User.objects.create_user(username='testuser', password='testpassword')
+        today = now().date()
+        offers = []
+        for index in range(3):
+            car = Car.objects.create(
+                vin=f'{index:017d}', car_mileage=1000, car_brand='Opel', car_model='Astra', user=user,
+            )
+            offers.append(Offer.objects.create(car=car, price=100.0, user=user))
+        Rent.objects.bulk_create([
+            Rent(offer=offers[0], user=user, rent_start=today, duration=2, rent_end=today + timedelta(days=2),
+                 status=Rent.ACTIVE),
+            Rent(offer=offers[1], user=user, rent_start=today - timedelta(days=5), duration=2,
+                 rent_end=today - timedelta(days=3), status=Rent.OVERDUE),
+            Rent(offer=offers[2], user=user, rent_start=today - timedelta(days=9), duration=2,
+                 rent_end=today - timedelta(days=7), status=Rent.FINISHED, close_rent=True),
+        ])
+        Offer.objects.refresh_availability()
+
+        refresh_gauges(today)
+
+        self.assertEqual(OPEN_RENTS.values, {(Rent.ACTIVE,): 1, (Rent.OVERDUE,): 1})
+        self.assertEqual(AVAILABLE_OFFERS.values, {(): 2})
+        self.assertEqual(OVERDUE_RENTS.values, {(): 1})
+
+    @override_settings(METRICS_GAUGE_INTERVAL=60)
+    def test_gauges_are_computed_once_per_interval(self):
+        self.assertTrue(refresh_stale_gauges())
+        AVAILABLE_OFFERS.set_all({})
+        with self.assertNumQueries(0):
+            self.assertFalse(refresh_stale_gauges())
+            load_gauges()
+        self.assertEqual(AVAILABLE_OFFERS.values, {(): 0})
+
+    @override_settings(METRICS_GAUGE_INTERVAL=0)
+    def test_scrape_only_reads_the_cache(self):
+        with self.assertNumQueries(0):
+            load_gauges()
+        self.assertEqual(AVAILABLE_OFFERS.values, {})
+
+        refresh_stale_gauges()
+        with self.assertNumQueries(0):
+            load_gauges()
+        self.assertEqual(AVAILABLE_OFFERS.values, {(): 0})
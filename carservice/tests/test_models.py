@@ -50,3 +50,10 @@ class TestRentSaveMethod(TestCase):
         rent.rent_end = rent.rent_start + timedelta(days=10)
         rent.save()
         self.assertEqual(rent.rent_start + timedelta(days=10), rent.rent_end)
+
+    def test_save_method_overdue(self):
+        user = User.objects.create(username='testuser', password='12345')
+        car = Car.objects.create(car_model='Astra', car_brand='Opel', car_mileage=100000, user=user)
+        offer = Offer.objects.create(price=100.0, car=car, user=user)
+        rent = Rent.objects.create(offer=offer, user=user, duration=2, rent_start=now().date() - timedelta(days=5))
+        self.assertEqual(rent.status, Rent.OVERDUE)
@@ -0,0 +1,111 @@
+from asgiref.sync import sync_to_async
+from django.test import TestCase, RequestFactory
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from carservice.models import Car, Offer
+from carservice.pagination import apaginate, paginate, encode_cursor
+
+
+class TestPaginate(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        prices = [50.0, 10.0, 30.0, 30.0, 20.0, 40.0, 30.0]
+        cars = Car.objects.bulk_create([
+            Car(vin=f'{index:017d}', car_mileage=1000, car_brand='Opel', car_model='Astra', user=self.user)
+            for index in range(len(prices))
+        ])
+        Offer.objects.bulk_create([Offer(car=car, price=price, user=self.user) for car, price in zip(cars, prices)])
+        self.expected = list(Offer.objects.order_by('price', 'id'))
+
+    def get_page(self, query=''):
+        return paginate(self.factory.get(f'/?{query}'), Offer.objects.all(), ordering=('price', 'id'), per_page=3)
+
+    def test_walk_forward_and_back(self):
+        pages = [self.get_page()]
+        while pages[-1].next_query:
+            pages.append(self.get_page(pages[-1].next_query))
+
+        self.assertEqual([offer for page in pages for offer in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(pages[0].previous_query, '')
+
+        previous = self.get_page(pages[-1].previous_query)
+        self.assertEqual(list(previous), list(pages[1]))
+        first = self.get_page(previous.previous_query)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertEqual(first.previous_query, '')
+
+    def test_invalid_cursor_returns_first_page(self):
+        self.assertEqual(list(self.get_page('after=not-a-cursor')), self.expected[:3])
+        self.assertEqual(list(self.get_page(f'after={encode_cursor([1])}')), self.expected[:3])
+
+    def test_prefix_keeps_other_parameters(self):
+        request = self.factory.get('/?renter_after=abc')
+        page = paginate(request, Offer.objects.all(), per_page=3, prefix='owner_')
+        self.assertIn('renter_after=abc', page.next_query)
+        self.assertIn('owner_after=', page.next_query)
+
+    def test_car_read_view_is_paginated(self):
+        self.client.force_login(self.user)
+        Car.objects.bulk_create([
+            Car(vin=f'X{index:016d}', car_mileage=1000, car_brand='Opel', car_model='Astra', user=self.user)
+            for index in range(30)
+        ])
+        response = self.client.get(reverse('car_read'))
+        self.assertEqual(len(response.context['cars']), 24)
+        response = self.client.get(reverse('car_read') + '?' + response.context['cars'].next_query)
+        self.assertEqual(len(response.context['cars']), 13)
+
+
+class TestAsyncPaginate(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        cars = Car.objects.bulk_create([
+            Car(vin=f'{index:017d}', car_mileage=1000, car_brand='Opel', car_model='Astra', user=self.user)
+            for index in range(5)
+        ])
+        Offer.objects.bulk_create([Offer(car=car, price=10.0 * (index % 3), user=self.user) for index, car in enumerate(cars)])
+
+    async def test_matches_paginate(self):
+        for query in ('', f'after={encode_cursor([10.0, 2])}', f'before={encode_cursor([20.0, 3])}'):
+            request = self.factory.get(f'/?{query}')
+            page = await apaginate(request, Offer.objects.all(), ordering=('price', 'id'), per_page=2)
+            expected = await sync_to_async(paginate)(
+                request, Offer.objects.all(), ordering=('price', 'id'), per_page=2,
+            )
+            self.assertEqual(list(page), list(expected))
+            self.assertEqual((page.next_query, page.previous_query), (expected.next_query, expected.previous_query))
+
+
+class TestTamperedCursors(TestCase):
+    CURSORS = ([{'a': 1}], ['x'], ['10', 1], [10.0, 'x'], [True, 1], [None, 1], [1, 2, 3])
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_login(self.user)
+        car = Car.objects.create(
+            vin='1G8MG35X48Y106575', car_mileage=1000, car_brand='Opel', car_model='Astra', user=self.user,
+        )
+        Offer.objects.create(car=car, price=100.0, user=self.user)
+
+    def test_paginated_views_show_the_first_page(self):
+        urls = [
+            (reverse('car_read'), ''),
+            (reverse('offer_read'), ''),
+            (reverse('all_offers'), ''),
+            (reverse('all_offers') + '?brand=Opel&', ''),
+            (reverse('rent_panel'), 'owner_'),
+            (reverse('rent_panel'), 'renter_'),
+            (reverse('rent_archive'), 'owner_'),
+            (reverse('rent_archive'), 'renter_'),
+        ]
+        for url, prefix in urls:
+            for cursor in self.CURSORS:
+                for direction in ('after', 'before'):
+                    separator = '' if url.endswith('&') else '?'
+                    with self.subTest(url=url, cursor=cursor, direction=direction):
+                        response = self.client.get(f'{url}{separator}{prefix}{direction}={encode_cursor(cursor)}')
+                        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,76 @@
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils.timezone import now
+
+from carservice.models import Car, Offer, Rent
+from carservice.pdf import cached_confirmation, invalidate_confirmation
+
+
+class TestRentConfirmationPdf(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_dir = directory.name
+        settings = override_settings(RENT_PDF_CACHE_DIR=self.cache_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        car = Car.objects.create(car_model='Astra', car_brand='Opel', car_mileage=100000, user=self.user)
+        offer = Offer.objects.create(price=100.0, car=car, user=self.user)
+        self.rent = Rent.objects.create(offer=offer, user=self.user, duration=2, rent_start=now().date())
+        self.url = reverse('rent_confirmation_pdf', args=[self.rent.id])
+        self.client.force_login(self.user)
+
+    def cached_files(self):
+        directory = os.path.join(self.cache_dir, str(self.rent.id))
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def test_download_is_cached_and_conditional(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        response.close()
+        etag = response['ETag']
+        self.assertEqual(len(self.cached_files()), 1)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_rent_change_invalidates_cached_file(self):
+        response = self.client.get(self.url)
+        response.close()
+        etag = response['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rent.duration = 5
+            self.rent.save()
+        self.assertEqual(self.cached_files(), [])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_new_version_replaces_the_others(self):
+        path, digest = cached_confirmation(self.rent)
+        self.rent.duration = 5
+        self.rent.save()
+
+        new_path, new_digest = cached_confirmation(self.rent)
+        self.assertEqual(self.cached_files(), [f'{new_digest}.pdf'])
+
+        # Another request rendered the same version meanwhile; its file is kept.
+        invalidate_confirmation(self.rent.id, keep=new_digest)
+        self.assertTrue(os.path.exists(new_path))
+        self.assertFalse(os.path.exists(path))
+
+    def test_other_users_rent_is_not_found(self):
+        other = User.objects.create_user(username='other', password='testpassword')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
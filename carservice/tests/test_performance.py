@@ -0,0 +1,73 @@
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from carservice.models import Car, Offer
+from carservice.performance import PerformanceMiddleware, RequestMetrics, request_measured, should_log
+
+SERVER_TIMING = re.compile(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+class TestPerformanceMiddleware(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        car = Car.objects.create(
+            vin='1G8MG35X48Y106575', car_mileage=1000, car_brand='Opel', car_model='Astra', user=self.user,
+        )
+        self.offer = Offer.objects.create(car=car, price=100.0, user=self.user)
+        self.measured = []
+        request_measured.connect(self.receive, sender=PerformanceMiddleware)
+        self.addCleanup(request_measured.disconnect, self.receive, sender=PerformanceMiddleware)
+
+    def receive(self, sender, request, metrics, **kwargs):
+        self.measured.append(metrics)
+
+    def test_server_timing_counts_queries(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('car_read'))
+
+        self.assertEqual(int(SERVER_TIMING.fullmatch(response['Server-Timing']).group(1)), len(context))
+        metrics = self.measured[-1]
+        self.assertEqual((metrics.view, metrics.method, metrics.status), ('car_read', 'GET', 200))
+        self.assertEqual(metrics.size, len(response.content))
+
+    async def test_async_view_queries_are_counted(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse('offer_detail', kwargs={'offer_id': self.offer.id}))
+
+        self.assertGreater(int(SERVER_TIMING.fullmatch(response['Server-Timing']).group(1)), 0)
+        self.assertEqual(self.measured[-1].view, 'offer_detail')
+
+    def test_unresolved_url(self):
+        self.client.get('/no-such-page/')
+        self.assertEqual((self.measured[-1].view, self.measured[-1].status), ('<unresolved>', 404))
+
+    @override_settings(PERFORMANCE_LOG_SAMPLE_RATE=1)
+    def test_sampled_log_line(self):
+        with self.assertLogs('carservice.performance', 'INFO') as logs:
+            self.client.get(reverse('home'))
+
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['view'], 'home')
+        self.assertEqual(set(line), {'view', 'method', 'status', 'duration_ms', 'queries', 'sql_ms', 'size'})
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('home')))
+
+
+class TestShouldLog(TestCase):
+    def metrics(self, duration):
+        return RequestMetrics('home', 'GET', 200, duration, 0, 0.0, 0)
+
+    @override_settings(PERFORMANCE_LOG_SAMPLE_RATE=0, PERFORMANCE_LOG_SLOW_MS=500)
+    def test_slow_requests_are_always_logged(self):
+        self.assertFalse(should_log(self.metrics(0.1)))
+        self.assertTrue(should_log(self.metrics(0.6)))
@@ -0,0 +1,69 @@
+from datetime import timedelta
+from itertools import count
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils.timezone import now
+
+from carservice.models import Car, Offer, Rent
+from carservice.tests.utils import QueryBudgetMixin
+
+
+class TestListViewQueryBudget(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='testuser', password='testpassword')
+        self.owner = User.objects.create_user(username='owner', password='testpassword')
+        self.client.force_login(self.user)
+        self.vins = count()
+
+    def create_offers(self, size, user):
+        cars = Car.objects.bulk_create([
+            Car(vin=f'{next(self.vins):017d}', car_mileage=1000, car_brand='Opel', car_model='Astra', user=user)
+            for _ in range(size)
+        ])
+        return Offer.objects.bulk_create([Offer(car=car, price=100.0, user=user) for car in cars])
+
+    def create_rents(self, size, owner, renter, close_rent=False):
+        rent_start = now().date()
+        Rent.objects.bulk_create([
+            Rent(
+                offer=offer, user=renter, rent_start=rent_start, duration=1, rent_end=rent_start + timedelta(days=1),
+                close_rent=close_rent, status=Rent.FINISHED if close_rent else Rent.ACTIVE,
+            )
+            for offer in self.create_offers(size, owner)
+        ])
+
+    def populate_rents(self, size, close_rent=False):
+        self.create_rents(size, self.owner, self.user, close_rent)
+        self.create_rents(size, self.user, self.owner, close_rent)
+
+    def populate_catalogue(self, size):
+        self.create_offers(size, self.owner)
+        cache.clear()
+
+    def test_all_offers(self):
+        # Cold cache: includes the queries that rebuild the facet counts and render the cards.
+        self.assertViewQueryBudget(reverse('all_offers'), 5, self.populate_catalogue)
+
+    def test_all_offers_warm_cache(self):
+        self.populate_catalogue(100)
+        self.client.get(reverse('all_offers'))
+        # Only the page of offers itself.
+        with self.assertQueryBudget(1):
+            self.client.get(reverse('all_offers'))
+
+    def test_car_read(self):
+        self.assertViewQueryBudget(reverse('car_read'), 4, lambda size: self.create_offers(size, self.owner))
+
+    def test_offer_read(self):
+        self.assertViewQueryBudget(reverse('offer_read'), 4, lambda size: self.create_offers(size, self.owner))
+
+    def test_rent_panel(self):
+        self.assertViewQueryBudget(reverse('rent_panel'), 5, self.populate_rents)
+
+    def test_rent_archive(self):
+        self.assertViewQueryBudget(
+            reverse('rent_archive'), 5, lambda size: self.populate_rents(size, close_rent=True)
+        )
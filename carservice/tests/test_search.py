@@ -0,0 +1,61 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from carservice.models import Car, Offer
+from carservice.search import normalize, search_offers
+
+
+class TestNormalize(TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize('C-Class'), 'c class')
+        self.assertEqual(normalize('  Model   3 '), 'model 3')
+        self.assertEqual(normalize('Citroën'), 'citroen')
+        self.assertEqual(normalize('MERCEDES-BENZ'), 'mercedes benz')
+
+
+class TestSearchOffers(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.offers = {}
+        cars = [
+            ('Mercedes-Benz', 'C-Class'), ('Mercedes-Benz', 'CLA'), ('Other', 'Model 3'),
+            ('Opel', 'Astra'), ('Opel', 'Astra GTC'), ('Citroën', 'C3'),
+        ]
+        for index, (brand, model) in enumerate(cars):
+            car = Car.objects.create(
+                vin=f'{index:017d}', car_mileage=1000, car_brand=brand, car_model=model, user=self.user
+            )
+            self.offers[model] = Offer.objects.create(car=car, price=100.0, user=self.user)
+
+    def search(self, phrase):
+        return list(search_offers(Offer.objects.all(), phrase))
+
+    def test_multi_word_model(self):
+        self.assertEqual(self.search('model 3'), [self.offers['Model 3']])
+        self.assertEqual(self.search('Mercedes C-Class'), [self.offers['C-Class']])
+        self.assertEqual(self.search('mercedes benz c class'), [self.offers['C-Class']])
+
+    def test_prefix(self):
+        self.assertEqual(self.search('merc'), [self.offers['C-Class'], self.offers['CLA']])
+        self.assertEqual(self.search('citroen c'), [self.offers['C3']])
+
+    def test_exact_match_ranks_first(self):
+        self.assertEqual(self.search('opel astra'), [self.offers['Astra'], self.offers['Astra GTC']])
+        self.assertEqual(self.search('cla'), [self.offers['CLA']])
+
+    def test_empty_phrase(self):
+        self.assertEqual(self.search(' - '), [])
+
+    def test_search_fields_follow_updates(self):
+        car = self.offers['CLA'].car
+        car.car_model = 'GLA'
+        car.save(update_fields=['car_model'])
+        self.assertEqual(self.search('gla'), [self.offers['CLA']])
+
+    def test_reindex_command(self):
+        Car.objects.update(search_brand='', search_model='')
+        call_command('reindex_car_search', stdout=StringIO())
+        self.assertEqual(self.search('astra gtc'), [self.offers['Astra GTC']])
@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from carservice.models import Car
+from carservice.slow_queries import (
+    ProcessRotatingFileHandler, full_scans, log_files, read_entries, record_slow_query, summarize,
+)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+class TestSlowQueryLog(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        Car.objects.create(
+            vin='1G8MG35X48Y106575', car_mileage=1000, car_brand='Opel', car_model='Astra', user=self.user,
+        )
+
+    def logged(self, action):
+        with self.assertLogs('carservice.slow_queries', 'WARNING') as logs, \
+                connection.execute_wrapper(record_slow_query):
+            action()
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_view_query_is_logged_with_plan(self):
+        self.client.force_login(self.user)
+        entries = self.logged(lambda: self.client.get(reverse('car_read')))
+
+        cars = [entry for entry in entries if 'FROM "carservice_car"' in entry['sql']]
+        self.assertTrue(cars)
+        self.assertEqual(cars[0]['view'], 'car_read')
+        self.assertRegex(cars[0]['code'], r'^carservice.\w+\.py:\d+ \w+$')
+        self.assertTrue(cars[0]['plan'])
+
+    def test_full_scan_and_template_line(self):
+        template = Template('{% for car in cars %}\n{{ car.vin }}{% endfor %}')
+        entries = self.logged(lambda: template.render(Context({'cars': Car.objects.filter(car_model='Astra')})))
+
+        self.assertEqual(entries[0]['full_scans'], ['carservice_car'])
+        self.assertEqual(entries[0]['template'], '<unknown source>:1')
+        self.assertIsNone(entries[0]['view'])
+
+
+class TestSummary(SimpleTestCase):
+    def test_full_scans(self):
+        plan = ['SCAN carservice_car', 'SEARCH carservice_offer USING INDEX x (car_id=?)', 'SCAN t USING COVERING INDEX i']
+        self.assertEqual(full_scans(plan), ['carservice_car'])
+
+    def test_summarize_groups_statements(self):
+        entries = [
+            {'sql': 'SELECT * FROM a WHERE id IN (%s, %s)', 'duration_ms': 30, 'view': 'all_offers', 'full_scans': []},
+            {'sql': 'SELECT * FROM a WHERE id IN (%s)', 'duration_ms': 20, 'view': 'car_read', 'full_scans': []},
+            {'sql': 'SELECT * FROM b', 'duration_ms': 40, 'view': None, 'full_scans': ['b']},
+        ]
+        first, second = summarize(entries)
+        self.assertEqual((first.sql, first.count, first.total_ms, first.max_ms), ('SELECT * FROM a WHERE id IN (...)', 2, 50, 30))
+        self.assertEqual(first.views, {'all_offers': 1, 'car_read': 1})
+        self.assertEqual((second.full_scans, second.views), (['b'], {'-': 1}))
+
+    def test_command_reads_rotated_logs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow_queries.log')
+            for name, duration in (('slow_queries.log.1', 10), ('slow_queries.log', 5)):
+                with open(os.path.join(directory, name), 'w') as log:
+                    log.write(json.dumps({'sql': 'SELECT 1', 'duration_ms': duration, 'full_scans': ['t']}) + '\nnot json\n')
+
+            self.assertEqual([entry['duration_ms'] for entry in read_entries(path)], [10, 5])
+            stdout = StringIO()
+            call_command('slow_queries', file=path, stdout=stdout)
+
+        self.assertIn('15 ms total, 2 times, max 10 ms  FULL SCAN of t', stdout.getvalue())
+
+
+class TestProcessRotatingFileHandler(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'slow_queries.log')
+
+    def handler(self):
+        handler = ProcessRotatingFileHandler(self.path, maxBytes=200, backupCount=1, delay=True)
+        self.addCleanup(handler.close)
+        return handler
+
+    def log(self, handler, duration):
+        message = json.dumps({'sql': 'SELECT 1', 'duration_ms': duration})
+        handler.handle(logging.makeLogRecord({'msg': message, 'levelno': logging.WARNING}))
+
+    def test_file_per_process(self):
+        handler = self.handler()
+        self.log(handler, 1)
+        child = os.fork()
+        if child == 0:
+            try:
+                self.log(handler, 2)
+            finally:
+                os._exit(0)
+        os.waitpid(child, 0)
+        self.log(handler, 3)
+
+        self.assertEqual(
+            sorted(os.path.basename(path) for path, _, _ in log_files(self.path)),
+            sorted([f'slow_queries.{os.getpid()}.log', f'slow_queries.{child}.log']),
+        )
+        self.assertEqual(sorted(entry['duration_ms'] for entry in read_entries(self.path)), [1, 2, 3])
+
+    def test_rotation_keeps_files_of_running_processes(self):
+        # Process ids above the kernel's limit never run.
+        for age, pid in enumerate([2 ** 30 + 3, 2 ** 30 + 2, 2 ** 30 + 1]):
+            exited = f'{self.path[:-4]}.{pid}.log'
+            with open(exited, 'w') as log:
+                log.write(json.dumps({'sql': 'SELECT 1', 'duration_ms': 10 + age}) + '\n')
+            os.utime(exited, (time.time() - age * 60,) * 2)
+
+        handler = self.handler()
+        for duration in range(10):
+            self.log(handler, duration)
+
+        files = {os.path.basename(path) for path, _, _ in log_files(self.path)}
+        self.assertEqual(files, {
+            f'slow_queries.{2 ** 30 + 3}.log', f'slow_queries.{os.getpid()}.log', f'slow_queries.{os.getpid()}.log.1',
+        })
+        self.assertEqual([entry['duration_ms'] for entry in read_entries(self.path)][0], 10)
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase
+
+from Carshering.sqlite.base import DatabaseWrapper
+
+
+class TestTunedSQLite(SimpleTestCase):
+    def wrapper(self, **options):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_dict = {
+            **connection.settings_dict,
+            'ENGINE': 'Carshering.sqlite',
+            'NAME': os.path.join(directory.name, 'db.sqlite3'),
+            'OPTIONS': options,
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias='tuned')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        wrapper = self.wrapper(
+            timeout=2.5,
+            pragmas={'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'mmap_size': 2 ** 20, 'cache_size': -2048},
+        )
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -2048)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 2500)
+        self.assertEqual(self.pragma(wrapper, 'foreign_keys'), 1)
+
+    def test_invalid_pragma(self):
+        wrapper = self.wrapper(pragmas={'journal_mode': 'WAL; DROP TABLE auth_user'})
+        with self.assertRaises(ImproperlyConfigured):
+            wrapper.ensure_connection()
+
+    def test_immediate_transactions_take_the_write_lock(self):
+        wrapper = self.wrapper(transaction_mode='IMMEDIATE', pragmas={'journal_mode': 'WAL'})
+        wrapper.ensure_connection()
+        wrapper._start_transaction_under_autocommit()
+        self.addCleanup(wrapper.connection.rollback)
+
+        other = sqlite3.connect(wrapper.settings_dict['NAME'], timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        other.execute('SELECT 1').fetchall()
+        with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+            other.execute('BEGIN IMMEDIATE')
+
+    def test_deferred_is_the_default(self):
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        wrapper._start_transaction_under_autocommit()
+        self.addCleanup(wrapper.connection.rollback)
+
+        other = sqlite3.connect(wrapper.settings_dict['NAME'], timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        other.execute('BEGIN IMMEDIATE')
+        other.execute('ROLLBACK')
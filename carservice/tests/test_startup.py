@@ -0,0 +1,44 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from carservice.startup import DEFERRED_MODULES, ImportTime, parse_importtime, profile_startup
+
+IMPORTTIME_OUTPUT = '''import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      1500 |       2500 |     reportlab.lib
+import time:      3000 |       5500 |   reportlab
+import time:       400 |       6020 | carservice.pdf
+'''
+
+
+class TestParseImporttime(SimpleTestCase):
+    def test_parse(self):
+        self.assertEqual(parse_importtime(IMPORTTIME_OUTPUT), [
+            ImportTime('_io', 0.12, 0.12, 1),
+            ImportTime('reportlab.lib', 1.5, 2.5, 2),
+            ImportTime('reportlab', 3.0, 5.5, 1),
+            ImportTime('carservice.pdf', 0.4, 6.02, 0),
+        ])
+
+    def test_ignores_other_output(self):
+        self.assertEqual(parse_importtime('Traceback (most recent call last):\n'), [])
+
+
+class TestStartupBudget(SimpleTestCase):
+    def test_startup_within_budget(self):
+        profile = profile_startup()
+
+        self.assertLessEqual(profile.elapsed, settings.STARTUP_BUDGET_MS)
+        imported = {entry.module.partition('.')[0] for entry in profile.imports}
+        for module in DEFERRED_MODULES:
+            self.assertNotIn(module, imported)
+
+    def test_command_fails_over_budget(self):
+        stdout = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('profile_startup', budget=0, limit=5, stdout=stdout)
+        self.assertIn('cumulative ms', stdout.getvalue())
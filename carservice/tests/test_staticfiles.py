@@ -0,0 +1,72 @@
+import gzip
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+
+from carservice.staticfiles import accepted_encodings, brotli
+
+PIPELINE = 'carservice.staticfiles.CompressedManifestStaticFilesStorage'
+
+
+class TestStaticPipeline(TestCase):
+    def setUp(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': PIPELINE}}
+        overrides = override_settings(STATIC_ROOT=static_root, STORAGES=storages)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command('collectstatic', interactive=False, verbosity=0, stdout=io.StringIO())
+
+    def test_hashed_and_compressed_copies(self):
+        hashed = staticfiles_storage.stored_name('base/base.css')
+        self.assertRegex(hashed, r'^base/base\.[0-9a-f]{12}\.css$')
+
+        with open(staticfiles_storage.path(hashed), 'rb') as original:
+            data = original.read()
+        with gzip.open(staticfiles_storage.path(hashed) + '.gz') as compressed:
+            self.assertEqual(compressed.read(), data)
+        self.assertEqual(os.path.exists(staticfiles_storage.path(hashed) + '.br'), brotli is not None)
+        self.assertFalse(os.path.exists(staticfiles_storage.path('image/car.jpg') + '.gz'))
+
+    def test_template_urls(self):
+        html = Template("{% load static %}{% static 'base/base.css' %} {% static 'image/missing.png' %}").render(
+            Context()
+        )
+        self.assertRegex(html, r'^/static/base/base\.[0-9a-f]{12}\.css /static/image/missing\.png$')
+
+    def test_serves_precompressed_immutable_file(self):
+        url = staticfiles_storage.url('base/base.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        with open(staticfiles_storage.path(staticfiles_storage.stored_name('base/base.css')), 'rb') as original:
+            self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), original.read())
+
+    def test_serves_identity_and_revalidates_unhashed_names(self):
+        response = self.client.get('/static/base/base.css', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+
+        response = self.client.get('/static/base/base.css', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_files(self):
+        self.assertEqual(self.client.get('/static/base/missing.css').status_code, 404)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('gzip, deflate, br'), {'gzip', 'deflate', 'br'})
+        self.assertEqual(accepted_encodings('br;q=0, gzip;q=0.5'), {'gzip'})
+        self.assertEqual(accepted_encodings(''), {''})
@@ -0,0 +1,202 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from carservice.images import variant_name
+from carservice.models import Car, MediaBlob
+from carservice.storage import ContentAddressedStorage, collect_garbage
+from users.models import Profile
+
+
+class StorageTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root, IMAGE_VARIANT_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+
+    def create_car(self, vin, photo):
+        return Car.objects.create(
+            vin=vin, car_mileage=1000, car_brand='Opel', car_model='Astra', date_of_prod=2020, user=self.user,
+            car_photo=photo,
+        )
+
+    def age_blobs(self):
+        MediaBlob.objects.update(updated=now() - timedelta(days=2))
+
+
+class TestContentAddressedStorage(StorageTestCase):
+    def test_same_content_is_stored_once(self):
+        first = default_storage.save('static/image/a.JPG', ContentFile(b'photo'))
+        second = default_storage.save('static/image/b.jpg', ContentFile(b'photo'))
+        third = default_storage.save('static/image/c.jpg', ContentFile(b'other photo'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+        self.assertRegex(first, r'^content/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(MediaBlob.objects.count(), 2)
+        with default_storage.open(first) as stored:
+            self.assertEqual(stored.read(), b'photo')
+
+    def test_saving_an_existing_file_again(self):
+        stored = default_storage.save('photo.jpg', ContentFile(b'photo'))
+        variant = variant_name(stored, 'card', 'jpeg')
+        default_storage.save_derived(variant, ContentFile(b'card'))
+
+        # A storage that doesn't see the stored file, like a second upload checking at the same moment.
+        class RacingStorage(ContentAddressedStorage):
+            def exists(self, name):
+                return False
+
+        racing = RacingStorage()
+        self.assertEqual(racing.save('photo.jpg', ContentFile(b'photo')), stored)
+        # In a thread, so a save that looks for a free name forever fails the test instead of hanging it.
+        names = []
+        thread = threading.Thread(
+            target=lambda: names.append(racing.save_derived(variant, ContentFile(b'new card'))), daemon=True,
+        )
+        thread.start()
+        thread.join(timeout=5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(names, [variant])
+        self.assertEqual(MediaBlob.objects.filter(name=stored).count(), 1)
+        with default_storage.open(variant) as variant_file:
+            self.assertEqual(variant_file.read(), b'new card')
+        self.assertEqual(os.listdir(os.path.dirname(default_storage.path(variant))), [os.path.basename(variant)])
+
+    def test_reference_counts(self):
+        photo = default_storage.save('photo.jpg', ContentFile(b'photo'))
+        other = default_storage.save('photo.jpg', ContentFile(b'other photo'))
+        first = self.create_car('JH4DB1550LS000111', photo)
+        second = self.create_car('5NPEB4AC1DH576656', photo)
+        profile = Profile.objects.create(user=self.user, image=photo)
+        self.assertEqual(MediaBlob.objects.get(name=photo).references, 3)
+
+        second.car_photo = other
+        second.save()
+        profile.delete()
+        self.assertEqual(MediaBlob.objects.get(name=photo).references, 1)
+        self.assertEqual(MediaBlob.objects.get(name=other).references, 1)
+
+        first.save()
+        first.delete()
+        self.assertEqual(MediaBlob.objects.get(name=photo).references, 0)
+
+    def test_saving_a_loaded_instance_does_not_look_up_its_file(self):
+        photo = default_storage.save('photo.jpg', ContentFile(b'photo'))
+        other = default_storage.save('photo.jpg', ContentFile(b'other photo'))
+        car = Car.objects.get(pk=self.create_car('JH4DB1550LS000111', photo).pk)
+
+        with CaptureQueriesContext(connection) as context:
+            car.car_model = 'Corsa'
+            car.save()
+            car.car_photo = other
+            car.save()
+        self.assertFalse([query for query in context.captured_queries if 'car_photo' in query['sql'].split('FROM')[0]
+                          and query['sql'].startswith('SELECT')])
+        self.assertEqual(MediaBlob.objects.get(name=photo).references, 0)
+        self.assertEqual(MediaBlob.objects.get(name=other).references, 1)
+
+        # A car built by hand for an existing row still looks the stored name up.
+        Car(pk=car.pk, vin=car.vin, car_mileage=1000, car_brand='Opel', car_model='Astra', date_of_prod=2020,
+            user=self.user, car_photo=photo).save()
+        self.assertEqual(MediaBlob.objects.get(name=photo).references, 1)
+        self.assertEqual(MediaBlob.objects.get(name=other).references, 0)
+
+    def test_media_view(self):
+        photo = default_storage.save('photo.jpg', ContentFile(b'photo'))
+        response = self.client.get(default_storage.url(photo))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(b''.join(response.streaming_content), b'photo')
+        self.assertEqual(self.client.get('/media/content/missing.jpg').status_code, 404)
+
+
+class TestCollectGarbage(StorageTestCase):
+    def test_deletes_unreferenced_files(self):
+        kept = default_storage.save('kept.jpg', ContentFile(b'kept'))
+        dropped = default_storage.save('dropped.jpg', ContentFile(b'dropped'))
+        default_storage.save_derived(variant_name(dropped, 'thumb', 'webp'), ContentFile(b'variant'))
+        self.create_car('JH4DB1550LS000111', kept)
+        self.age_blobs()
+
+        stats = collect_garbage()
+
+        self.assertEqual((stats['deleted'], stats['freed']), (1, len(b'dropped')))
+        self.assertTrue(default_storage.exists(kept))
+        self.assertFalse(default_storage.exists(dropped))
+        self.assertFalse(default_storage.exists(variant_name(dropped, 'thumb', 'webp')))
+        self.assertEqual(list(MediaBlob.objects.values_list('name', flat=True)), [kept])
+
+    def test_grace_period_and_dry_run(self):
+        dropped = default_storage.save('dropped.jpg', ContentFile(b'dropped'))
+        self.assertEqual(collect_garbage()['deleted'], 0)
+
+        self.age_blobs()
+        self.assertEqual(collect_garbage(dry_run=True)['deleted'], 1)
+        self.assertTrue(default_storage.exists(dropped))
+
+    def test_repairs_counts_and_removes_orphan_files(self):
+        photo = default_storage.save('photo.jpg', ContentFile(b'photo'))
+        self.create_car('JH4DB1550LS000111', photo)
+        MediaBlob.objects.update(references=5)
+        orphan = default_storage.save_derived('content/aa/bb/orphan.jpg', ContentFile(b'orphan'))
+        old = (now() - timedelta(days=2)).timestamp()
+        os.utime(default_storage.path(orphan), (old, old))
+
+        stats = collect_garbage()
+
+        self.assertEqual((stats['repaired'], stats['deleted'], stats['orphans']), (1, 0, 1))
+        self.assertEqual(MediaBlob.objects.get(name=photo).references, 1)
+        self.assertFalse(default_storage.exists(orphan))
+
+    def test_command(self):
+        default_storage.save('dropped.jpg', ContentFile(b'dropped'))
+        self.age_blobs()
+        out = io.StringIO()
+        call_command('collect_media_garbage', stdout=out)
+        self.assertIn('Deleted 1 unreferenced files', out.getvalue())
+
+
+class TestMigrateMedia(StorageTestCase):
+    def test_copies_legacy_files(self):
+        source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source)
+        os.makedirs(os.path.join(source, 'static', 'image'))
+        with open(os.path.join(source, 'static', 'image', 'car.jpg'), 'wb') as legacy_file:
+            legacy_file.write(b'legacy photo')
+        first = self.create_car('JH4DB1550LS000111', 'static/image/car.jpg')
+        second = self.create_car('5NPEB4AC1DH576656', 'static/image/car.jpg')
+        missing = self.create_car('1G1JC1240WM100000', 'static/image/missing.jpg')
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('migrate_media', '--dry-run', '--source', source, stdout=out, stderr=err)
+        self.assertIn('Would copy 1 files for 2 cars and profiles.', out.getvalue())
+        self.assertEqual(Car.objects.get(pk=first.pk).car_photo.name, 'static/image/car.jpg')
+
+        call_command('migrate_media', '--source', source, stdout=out, stderr=err)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertRegex(first.car_photo.name, r'^content/.*\.jpg$')
+        self.assertEqual(second.car_photo.name, first.car_photo.name)
+        self.assertEqual(MediaBlob.objects.get(name=first.car_photo.name).references, 2)
+        with default_storage.open(first.car_photo.name) as stored:
+            self.assertEqual(stored.read(), b'legacy photo')
+        self.assertEqual(Car.objects.get(pk=missing.pk).car_photo.name, 'static/image/missing.jpg')
+        self.assertIn('Not found, left unchanged: static/image/missing.jpg', err.getvalue())
@@ -0,0 +1,91 @@
+import io
+from itertools import groupby
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.timezone import now
+
+from carservice.availability import stale_offers
+from carservice.models import Car, Offer, Rent
+from carservice.synthetic import generate_dataset
+from carservice.validators import VIN_CHECK_DIGIT_INDEX, vin_validator
+
+
+class TestGenerateDataset(TestCase):
+    def test_counts(self):
+        counts = generate_dataset(users=20, cars=100, rents=500, batch_size=30)
+
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Car.objects.count(), 100)
+        self.assertEqual(Offer.objects.count(), counts['offers'])
+        self.assertEqual(Rent.objects.count(), 500)
+        self.assertEqual(counts['rents'], 500)
+        self.assertTrue(User.objects.first().check_password('password'))
+        self.assertEqual(stale_offers(), [])
+
+    def test_user_numbers_continue_after_deletions(self):
+        generate_dataset(users=3, cars=0, rents=0)
+        User.objects.filter(username__in=['synthetic0', 'synthetic1']).delete()
+        User.objects.create_user(username='synthetic_admin')
+
+        generate_dataset(users=2, cars=0, rents=0)
+
+        self.assertEqual(
+            sorted(User.objects.values_list('username', flat=True)),
+            ['synthetic2', 'synthetic3', 'synthetic4', 'synthetic_admin'],
+        )
+
+    def test_vin_serials_continue_after_deletions(self):
+        generate_dataset(users=1, cars=4, rents=0)
+        Car.objects.filter(pk__in=Car.objects.order_by('id').values('id')[:2]).delete()
+        serials = {vin[VIN_CHECK_DIGIT_INDEX + 1:] for vin in Car.objects.values_list('vin', flat=True)}
+
+        generate_dataset(users=1, cars=4, rents=0)
+
+        new_serials = {vin[VIN_CHECK_DIGIT_INDEX + 1:] for vin in Car.objects.values_list('vin', flat=True)} - serials
+        self.assertEqual(len(new_serials), 4)
+
+    def test_vins_are_valid(self):
+        generate_dataset(users=5, cars=50, rents=0)
+
+        for vin in Car.objects.values_list('vin', flat=True):
+            vin_validator(vin)
+
+    def test_same_seed_gives_same_data(self):
+        generate_dataset(users=5, cars=20, rents=100, seed=7)
+        first = list(Rent.objects.order_by('id').values_list('rent_start', 'duration', 'status'))
+        Rent.objects.all().delete()
+        Offer.objects.all().delete()
+        Car.objects.all().delete()
+        User.objects.all().delete()
+
+        generate_dataset(users=5, cars=20, rents=100, seed=7)
+
+        self.assertEqual(list(Rent.objects.order_by('id').values_list('rent_start', 'duration', 'status')), first)
+
+    def test_rents_of_an_offer_do_not_overlap(self):
+        generate_dataset(users=10, cars=50, rents=1000)
+        today = now().date()
+
+        rents = Rent.objects.order_by('offer_id', 'rent_start').values_list('offer_id', 'rent_start', 'rent_end')
+        for offer_id, offer_rents in groupby(rents, key=lambda rent: rent[0]):
+            offer_rents = list(offer_rents)
+            for previous, following in zip(offer_rents, offer_rents[1:]):
+                self.assertLess(previous[2], following[1])
+        for rent in Rent.objects.all():
+            self.assertEqual(rent.status, Rent.status_for(rent.rent_start, rent.rent_end, rent.close_rent, today))
+            self.assertNotEqual(rent.user_id, rent.offer.user_id)
+        self.assertFalse(Rent.objects.filter(close_rent=True, rent_start__gt=today).exists())
+        self.assertEqual(
+            set(Rent.objects.values_list('status', flat=True)),
+            {Rent.FINISHED, Rent.ACTIVE, Rent.PENDING, Rent.OVERDUE},
+        )
+
+    def test_command(self):
+        out = io.StringIO()
+
+        call_command('generate_dataset', users=3, cars=10, rents=30, stdout=out)
+
+        self.assertIn('Created 3 users, 10 cars', out.getvalue())
+        self.assertEqual(Rent.objects.count(), 30)
@@ -0,0 +1,95 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.utils.timezone import now
+
+from carservice.models import Car, Offer, Rent, StatusWatermark
+from carservice.tasks import apply_status_transitions, sweep_rent_status, STATUS_SWEEP
+
+
+class RentTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='testuser', password='12345')
+        self.car = Car.objects.create(car_model='Astra', car_brand='Opel', car_mileage=100000, user=self.user)
+        self.offer = Offer.objects.create(price=100.0, car=self.car, user=self.user)
+        self.today = now().date()
+
+    def create_rent(self, days_from_today, duration, status, close_rent=False):
+        rent_start = self.today + timedelta(days=days_from_today)
+        return Rent.objects.bulk_create([Rent(
+            rent_start=rent_start, duration=duration, rent_end=rent_start + timedelta(days=duration),
+            status=status, close_rent=close_rent, offer=self.offer, user=self.user,
+        )])[0]
+
+
+class TestApplyStatusTransitions(RentTestCase):
+    def test_transitions(self):
+        activated = self.create_rent(0, 5, Rent.PENDING)
+        overdue = self.create_rent(-10, 5, Rent.ACTIVE)
+        pending = self.create_rent(3, 5, Rent.ACTIVE)
+        unchanged = self.create_rent(-1, 5, Rent.ACTIVE)
+        finished = self.create_rent(-10, 5, Rent.FINISHED, close_rent=True)
+
+        counts = apply_status_transitions()
+
+        self.assertEqual(counts, {Rent.ACTIVE: 1, Rent.OVERDUE: 1, Rent.PENDING: 1})
+        statuses = dict(Rent.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[activated.id], Rent.ACTIVE)
+        self.assertEqual(statuses[overdue.id], Rent.OVERDUE)
+        self.assertEqual(statuses[pending.id], Rent.PENDING)
+        self.assertEqual(statuses[unchanged.id], Rent.ACTIVE)
+        self.assertEqual(statuses[finished.id], Rent.FINISHED)
+
+    def test_rent_end_day_is_still_active(self):
+        rent = self.create_rent(-5, 5, Rent.PENDING)
+        apply_status_transitions()
+        rent.refresh_from_db()
+        self.assertEqual(rent.status, Rent.ACTIVE)
+
+    def test_repeated_run_changes_nothing(self):
+        self.create_rent(-10, 5, Rent.ACTIVE)
+        apply_status_transitions()
+        self.assertEqual(apply_status_transitions(), {Rent.ACTIVE: 0, Rent.OVERDUE: 0, Rent.PENDING: 0})
+
+    def test_since_only_touches_rents_that_crossed_a_boundary(self):
+        crossed_start = self.create_rent(-1, 5, Rent.PENDING)
+        crossed_end = self.create_rent(-4, 2, Rent.ACTIVE)
+        stale = self.create_rent(-20, 5, Rent.ACTIVE)
+
+        counts = apply_status_transitions(since=self.today - timedelta(days=2))
+
+        self.assertEqual(counts, {Rent.ACTIVE: 1, Rent.OVERDUE: 1})
+        statuses = dict(Rent.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[crossed_start.id], Rent.ACTIVE)
+        self.assertEqual(statuses[crossed_end.id], Rent.OVERDUE)
+        self.assertEqual(statuses[stale.id], Rent.ACTIVE)
+
+
+class TestSweepRentStatus(RentTestCase):
+    def test_first_sweep_is_full_and_sets_watermark(self):
+        self.create_rent(-20, 5, Rent.ACTIVE)
+        counts = sweep_rent_status()
+        self.assertEqual(counts[Rent.OVERDUE], 1)
+        self.assertEqual(StatusWatermark.objects.get(name=STATUS_SWEEP).swept_until, self.today)
+
+    def test_second_sweep_on_same_day_does_nothing(self):
+        sweep_rent_status()
+        self.create_rent(-20, 5, Rent.ACTIVE)
+        self.assertEqual(sweep_rent_status(), {})
+
+    def test_sweep_from_watermark(self):
+        StatusWatermark.objects.create(name=STATUS_SWEEP, swept_until=self.today - timedelta(days=1))
+        rent = self.create_rent(-3, 2, Rent.ACTIVE)
+        counts = sweep_rent_status()
+        self.assertEqual(counts, {Rent.ACTIVE: 0, Rent.OVERDUE: 1})
+        rent.refresh_from_db()
+        self.assertEqual(rent.status, Rent.OVERDUE)
+
+    def test_command_once(self):
+        self.create_rent(-20, 5, Rent.ACTIVE)
+        out = StringIO()
+        call_command('sweep_rent_status', once=True, stdout=out)
+        self.assertIn('Rent overdue: 1', out.getvalue())
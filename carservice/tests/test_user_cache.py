@@ -0,0 +1,77 @@
+import pickle
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.backends import CachedModelBackend, user_cache_key
+from users.forms import UserUpdateForm
+from users.models import Profile
+
+AUTH_TABLES = ('django_session', 'auth_user', 'users_profile')
+
+
+class TestUserCache(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        Profile.objects.create(user=self.user, location='Warsaw')
+        self.client.login(username='testuser', password='testpassword')
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in context.captured_queries if any(table in query['sql'] for table in AUTH_TABLES)]
+
+    def test_warm_request_runs_no_auth_queries(self):
+        self.assertTrue(self.auth_queries(reverse('profile')))
+        self.assertEqual(self.auth_queries(reverse('profile')), [])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions(self):
+        self.client.login(username='testuser', password='testpassword')
+        self.client.get(reverse('profile'))
+        self.assertEqual(self.auth_queries(reverse('profile')), [])
+
+    def test_cache_entry_leaves_the_password_hash_out(self):
+        self.client.get(reverse('profile'))
+
+        entry = cache.get(user_cache_key(self.user.id))
+        self.assertNotIn(self.user.password, pickle.dumps(entry).decode('latin-1'))
+        self.assertEqual(entry['session_auth_hash'], self.user.get_session_auth_hash())
+
+    def test_cached_user_loads_the_password_when_needed(self):
+        backend = CachedModelBackend()
+        backend.get_user(self.user.id)
+
+        with self.assertNumQueries(0):
+            user = backend.get_user(self.user.id)
+            self.assertEqual(user.profile.location, 'Warsaw')
+            self.assertEqual(user.get_session_auth_hash(), self.user.get_session_auth_hash())
+        self.assertTrue(user.check_password('testpassword'))
+
+        user.set_password('changedpassword')
+        self.assertNotEqual(user.get_session_auth_hash(), self.user.get_session_auth_hash())
+
+    def test_profile_update_invalidates_user(self):
+        self.client.get(reverse('profile'))
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.id)))
+
+        form = UserUpdateForm({'username': 'renamed', 'first_name': '', 'last_name': '', 'email': ''}, instance=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            form.save()
+
+        self.assertIsNone(cache.get(user_cache_key(self.user.id)))
+        self.assertContains(self.client.get(reverse('profile')), 'renamed')
+
+    def test_password_change_ends_sessions(self):
+        self.client.get(reverse('profile'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('changedpassword')
+            self.user.save()
+
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 302)
@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError
 from django.test import TestCase
 
 from carservice import validators
@@ -13,3 +14,40 @@ class TestVinValidator(TestCase):
         self.assertFalse(validators.vin_validator('1G1JC1240WM1000000'))
         self.assertFalse(validators.vin_validator('1G1JC1240WM10000A'))
         self.assertFalse(validators.vin_validator('1G1JC1240WM10000a'))
+
+    def test_vin_error(self):
+        self.assertEqual(validators.vin_error('JH4DB1550LS000111'), validators.VIN_OK)
+        self.assertEqual(validators.vin_error('jh4db1550ls000111'), validators.VIN_OK)
+        self.assertEqual(validators.vin_error(b'JH4DB1550LS000111'), validators.VIN_OK)
+        self.assertEqual(validators.vin_error('1G1JC1240WM10000'), validators.VIN_BAD_LENGTH)
+        self.assertEqual(validators.vin_error(None), validators.VIN_BAD_LENGTH)
+        self.assertEqual(validators.vin_error('JH4DB1550LS00011I'), validators.VIN_BAD_CHARACTERS)
+        self.assertEqual(validators.vin_error('JH4DB1550LS00011-'), validators.VIN_BAD_CHARACTERS)
+        self.assertEqual(validators.vin_error('JH4DB1550LS00011ł'), validators.VIN_BAD_CHARACTERS)
+        self.assertEqual(validators.vin_error('JH4DB1551LS000111'), validators.VIN_BAD_CHECKSUM)
+        self.assertEqual(validators.vin_error('JH4DB155ALS000111'), validators.VIN_BAD_CHECKSUM)
+
+    def test_check_digit_x(self):
+        vin = '1M8GDM9A_KP042788'
+        self.assertEqual(validators.vin_check_digit(vin.replace('_', '0')), 'X')
+        self.assertTrue(validators.vin_validator(vin.replace('_', 'X')))
+        self.assertTrue(validators.vin_validator(vin.replace('_', 'x')))
+
+    def test_validate_vins(self):
+        vins = ['JH4DB1550LS000111', '5NPEB4AC1DH576656', 'JH4DB1551LS000111', 'short', 'JH4DB1550LS00011O']
+        self.assertEqual(validators.validate_vins(vins), [
+            validators.VIN_OK, validators.VIN_OK, validators.VIN_BAD_CHECKSUM,
+            validators.VIN_BAD_LENGTH, validators.VIN_BAD_CHARACTERS,
+        ])
+        self.assertEqual(validators.validate_vins(iter(vins[:1])), [validators.VIN_OK])
+        self.assertEqual(validators.validate_vins([]), [])
+
+    def test_check_vin_number_messages(self):
+        for vin, message in [
+            ('JH4DB1550LS00011', 'VIN should be 17 characters long.'),
+            ('JH4DB1550LS00011Q', 'VIN should contain only numbers and letters other than I, O and Q.'),
+            ('JH4DB1551LS000111', 'VIN is invalid.'),
+        ]:
+            with self.assertRaisesMessage(ValidationError, message):
+                validators.check_vin_number(vin)
+        validators.check_vin_number('JH4DB1550LS000111')
@@ -1,7 +1,8 @@
 import datetime
 
+from django.db import connections
 from django.db.models import Q
-from django.test import TestCase, RequestFactory
+from django.test import TestCase, RequestFactory, TransactionTestCase
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils.timezone import now, timedelta
@@ -345,3 +346,94 @@ class TestRentCreateView(TestCase):
         current_time = now()
         max_difference = timedelta(milliseconds=5)
         self.assertAlmostEqual(rent_start, current_time, delta=max_difference)
+
+    def test_overlapping_rent_is_rejected(self):
+        renter = User.objects.create_user(username='renter', password='testpassword')
+        self.client.force_login(renter)
+        response = self.client.post(reverse('rent_create', args=[self.offer.id]), {
+            'rent_start': datetime.date.today(),
+            'duration': 3,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['message'], 'This offer is already rented in the selected dates.')
+        self.assertEqual(Rent.objects.filter(offer=self.offer).count(), 1)
+
+    def test_non_overlapping_future_rent_is_created(self):
+        renter = User.objects.create_user(username='renter', password='testpassword')
+        self.client.force_login(renter)
+        response = self.client.post(reverse('rent_create', args=[self.offer.id]), {
+            'rent_start': datetime.date.today() + timedelta(days=5),
+            'duration': 3,
+        })
+        self.assertRedirects(response, reverse('rent_panel'))
+        self.assertTrue(Rent.objects.filter(offer=self.offer, user=renter, status=Rent.PENDING).exists())
+
+
+class TestRentUpdateView(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', password='testpassword')
+        car = Car.objects.create(
+            vin='1G8MG35X48Y106575', car_mileage=1000, car_brand='Opel', car_model='Astra', user=owner,
+        )
+        self.offer = Offer.objects.create(car=car, price=123, description='test description', user=owner)
+        self.renter = User.objects.create_user(username='renter', password='testpassword')
+        self.today = datetime.date.today()
+        self.first = Rent.objects.create(
+            rent_start=self.today + timedelta(days=1), duration=2, offer=self.offer, user=self.renter,
+        )
+        self.second = Rent.objects.create(
+            rent_start=self.today + timedelta(days=6), duration=2, offer=self.offer, user=self.renter,
+        )
+        self.client.force_login(self.renter)
+
+    def move(self, rent, days):
+        return self.client.post(reverse('rent_update', args=[rent.id]), {
+            'rent_start': self.today + timedelta(days=days),
+            'duration': 2,
+        })
+
+    def test_overlapping_move_is_rejected(self):
+        response = self.move(self.second, 2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'This offer is already rented in the selected dates.', response.context['form'].non_field_errors(),
+        )
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.rent_start, self.today + timedelta(days=6))
+
+    def test_rent_can_move_within_its_own_dates(self):
+        response = self.move(self.second, 7)
+
+        self.assertRedirects(response, reverse('rent_panel'))
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.rent_end, self.today + timedelta(days=9))
+
+
+class TestRentCreateLocked(TransactionTestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', password='testpassword')
+        car = Car.objects.create(
+            vin='1G8MG35X48Y106575', car_mileage=1000, car_brand='Opel', car_model='Astra', user=owner,
+        )
+        self.offer = Offer.objects.create(car=car, price=123, description='test description', user=owner)
+        self.client.force_login(User.objects.create_user(username='renter', password='testpassword'))
+
+    def test_booking_while_another_writer_holds_the_database(self):
+        other = connections.create_connection('default')
+        other.ensure_connection()
+        other.connection.execute('BEGIN IMMEDIATE')
+        try:
+            response = self.client.post(reverse('rent_create', args=[self.offer.id]), {
+                'rent_start': datetime.date.today(),
+                'duration': 3,
+            })
+        finally:
+            other.connection.execute('ROLLBACK')
+            other.close()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context['message'], 'The offer is being booked by someone else right now. Please try again.',
+        )
+        self.assertFalse(Rent.objects.exists())
@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin that fails when a block of code or a view runs more SQL queries than its declared budget.
+
+    Unlike assertNumQueries, a budget is an upper bound, and assertViewQueryBudget checks it at several table
+    sizes, so a view whose query count grows with the number of rows (N+1) fails even if it fits the budget
+    on a small fixture.
+    """
+    budget_sizes = (1, 100, 1000)
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{index}. {query["sql"]}' for index, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(f'{executed} queries executed, budget is {budget}.\nCaptured queries were:\n{queries}')
+
+    def assertViewQueryBudget(self, url, budget, populate):
+        """
+        Request `url` after growing the data set to each of `budget_sizes` rows and check the query budget.
+
+        Parameters:
+            url (str): The URL to request with the test client.
+            budget (int): The maximum number of queries the request may run.
+            populate (callable): Called with the number of rows to add before each request.
+
+        Returns:
+            None
+        """
+        created = 0
+        for size in self.budget_sizes:
+            populate(size - created)
+            created = size
+            with self.subTest(rows=size), self.assertQueryBudget(budget):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
@@ -1,64 +1,135 @@
 from datetime import timedelta, date
+from operator import mul
 
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
 
-def vin_validator(vin):
+VIN_LENGTH = 17
+VIN_CHECK_DIGIT_INDEX = 8
+VIN_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+VIN_LETTER_VALUES = {
+    'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8,
+    'J': 1, 'K': 2, 'L': 3, 'M': 4, 'N': 5, 'P': 7, 'R': 9,
+    'S': 2, 'T': 3, 'U': 4, 'V': 5, 'W': 6, 'X': 7, 'Y': 8, 'Z': 9,
+}
+
+VIN_OK = 0
+VIN_BAD_LENGTH = 1
+VIN_BAD_CHARACTERS = 2
+VIN_BAD_CHECKSUM = 3
+
+VIN_INVALID_VALUE = 0xFF
+
+
+def _vin_translation_table():
+    table = bytearray([VIN_INVALID_VALUE]) * 256
+    for digit in range(10):
+        table[ord(str(digit))] = digit
+    for letter, value in VIN_LETTER_VALUES.items():
+        table[ord(letter)] = value
+        table[ord(letter.lower())] = value
+    return bytes(table)
+
+
+# Maps every byte of an ASCII VIN to its transliterated value, or to VIN_INVALID_VALUE if it can't appear in a VIN.
+VIN_TRANSLATION_TABLE = _vin_translation_table()
+
+
+def _vin_checksum(values):
+    return sum(map(mul, values, VIN_WEIGHTS)) % 11
+
+
+def vin_error(vin):
     """
-    Validate the VIN (Vehicle Identification Number) using the following formula:
-    - Transliterate letters to their numerical counterparts.
-    - Multiply the numbers by their assigned weights.
-    - Add up the products.
-    - Divide the total sum by 11 to find the remainder.
-    - If the remainder is 10, the check digit should be "X".
-    - Compare the calculated remainder with the expected check digit.
+    Validate a VIN (Vehicle Identification Number) and return an error code:
+    - VIN_BAD_LENGTH if it is not 17 characters long.
+    - VIN_BAD_CHARACTERS if it contains anything but digits and the letters allowed in VINs (not I, O or Q).
+    - VIN_BAD_CHECKSUM if the check digit (9th character) does not match. The letters are transliterated to
+      numbers, multiplied by their position weights and summed; the sum modulo 11 is the check digit, with 10
+      written as "X".
+    - VIN_OK otherwise.
+
+    Letters are accepted in either case. The transliteration is a single `bytes.translate` call with a
+    precomputed table.
 
     Parameters:
-        vin: (str): The VIN to be validated.
+        vin (str | bytes): The VIN to be validated.
 
     Returns:
-        bool: True if the VIN is valid, False otherwise.
+        int: One of the VIN_* error codes.
+    """
+    if isinstance(vin, str):
+        vin = vin.encode('ascii', 'replace')
+    elif not isinstance(vin, bytes):
+        return VIN_BAD_LENGTH
+    if len(vin) != VIN_LENGTH:
+        return VIN_BAD_LENGTH
+
+    values = vin.translate(VIN_TRANSLATION_TABLE)
+    if VIN_INVALID_VALUE in values:
+        return VIN_BAD_CHARACTERS
+
+    check_digit = vin[VIN_CHECK_DIGIT_INDEX]
+    expected_checksum = 10 if check_digit in b'Xx' else values[VIN_CHECK_DIGIT_INDEX]
+    if check_digit not in b'0123456789Xx' or _vin_checksum(values) != expected_checksum:
+        return VIN_BAD_CHECKSUM
+    return VIN_OK
+
+
+def validate_vins(vins):
+    """
+    Validate many VINs in one pass, e.g. for a fleet import.
+
+    Parameters:
+        vins (iterable): The VINs to be validated, as strings or bytes. A NumPy array of strings works too.
+
+    Returns:
+        list: The VIN_* error code of each VIN, in input order.
     """
-    values = {
-        'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8,
-        'J': 1, 'K': 2, 'L': 3, 'M': 4, 'N': 5, 'P': 7, 'R': 9,
-        'S': 2, 'T': 3, 'U': 4, 'V': 5, 'W': 6, 'X': 7, 'Y': 8, 'Z': 9,
-    }
+    return [vin_error(vin) for vin in vins]
+
 
-    weights = {
-        1: 8, 2: 7, 3: 6, 4: 5, 5: 4, 6: 3, 7: 2, 8: 10, 9: 0, 10: 9,
-        11: 8, 12: 7, 13: 6, 14: 5, 15: 4, 16: 3, 17: 2
-    }
+def vin_check_digit(vin):
+    """
+    Compute the check digit of a VIN, ignoring whatever is at the check digit position.
 
-    if len(vin) != 17:
-        return False
+    Parameters:
+        vin (str): A 17 character VIN.
 
-    checksum = 0
+    Returns:
+        str: The check digit ("0"-"9" or "X"), or None if the VIN has a bad length or characters.
+    """
+    error = vin_error(vin)
+    if error in (VIN_BAD_LENGTH, VIN_BAD_CHARACTERS):
+        return None
+    checksum = _vin_checksum(vin.encode('ascii').translate(VIN_TRANSLATION_TABLE))
+    return 'X' if checksum == 10 else str(checksum)
+
+
+def vin_validator(vin):
+    """
+    Validate the VIN (Vehicle Identification Number). See `vin_error` for the rules.
 
-    for index, char in enumerate(vin):
-        if index == 8:
-            continue
-        if char.isdigit():
-            value = int(char)
-        else:
-            value = values.get(char.upper())
-            if value is None:
-                return False
+    Parameters:
+        vin: (str): The VIN to be validated.
 
-        checksum += value * weights[index + 1]
+    Returns:
+        bool: True if the VIN is valid, False otherwise.
+    """
+    return vin_error(vin) == VIN_OK
 
-    if vin[8].isdigit():
-        expected_checksum = int(vin[8])
-    else:
-        expected_checksum = 10
 
-    return checksum % 11 == expected_checksum
+VIN_ERROR_MESSAGES = {
+    VIN_BAD_LENGTH: _('VIN should be 17 characters long.'),
+    VIN_BAD_CHARACTERS: _('VIN should contain only numbers and letters other than I, O and Q.'),
+    VIN_BAD_CHECKSUM: _('VIN is invalid.'),
+}
 
 
 def check_vin_number(vin):
     """
-    Check if the VIN is not too short, contains only letters and numbers and is valid. Call vin_validator function.
+    Check if the VIN has the right length, contains only allowed letters and numbers and has a valid check digit.
 
     Parameters:
         vin:
@@ -66,19 +137,10 @@ def check_vin_number(vin):
     Returns:
         None
     """
-    if not vin_validator(vin):
-        raise ValidationError(
-            _('VIN is invalid.'),
-            params={'vin': vin},
-        )
-    if len(vin) != 17:
-        raise ValidationError(
-            _('VIN is too short.'),
-            params={'vin': vin},
-        )
-    if not vin.isalnum():
+    error = vin_error(vin)
+    if error != VIN_OK:
         raise ValidationError(
-            _('VIN should contain only letters and numbers.'),
+            VIN_ERROR_MESSAGES[error],
             params={'vin': vin},
         )
 
@@ -1,22 +1,41 @@
+import hmac
 import io
+import os
 
-from django.http import FileResponse
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
 from django.urls import reverse_lazy
 from django.views.generic.edit import CreateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.utils.timezone import now
-from django.db.models import Q
+from django.db import OperationalError, transaction
 from django.views.generic import DeleteView
+from django.views.static import serve
 from django import forms
 
-from reportlab.pdfgen import canvas
-
+from carservice.availability import is_available, rent_end_for
+from carservice.catalogue import aoffer_cards, catalogue_offers
+from carservice.decorators import alogin_required
+from carservice.facets import afacet_counts, facet_options, filter_offers
+from carservice.importer import detect_format, import_fleet, read_rows
+from carservice.metrics import CONTENT_TYPE, exposition
 from carservice.models import Car, Offer, Rent
-from carservice.forms import CarUpdateForm, OfferUpdateForm, RentUpdateForm, RentDeleteForm, UpdateStatusForm
-from carservice.tasks import update_status
+from carservice.pagination import apaginate, paginate
+from carservice.pdf import open_confirmation
+from carservice.search import search_offers
+from carservice.shortcuts import aget_object_or_404
+from carservice.staticfiles import cache_control, content_type, precompressed_file
+from carservice.storage import IMMUTABLE_CACHE_CONTROL, is_content_addressed
+from carservice.forms import (
+    CarUpdateForm, OfferUpdateForm, RentUpdateForm, RentDeleteForm, UpdateStatusForm, FleetImportForm
+)
 
 
 class CarCreateView(LoginRequiredMixin, CreateView):
@@ -43,7 +62,7 @@ class CarReadView(LoginRequiredMixin, View):
             return Car.objects.filter(user=self.request.user)
 
     def get(self, request):
-        cars = self.get_queryset()
+        cars = paginate(request, self.get_queryset())
         return render(
             request, template_name='car_read.html',
             context={'cars': cars}
@@ -79,17 +98,44 @@ class CarDeleteView(LoginRequiredMixin, DeleteView):
         return queryset.filter(user=self.request.user)
 
 
-@login_required
-def carsearch(request):
+class CarImportView(LoginRequiredMixin, View):
+    """
+    Import the uploaded fleet file for the current user and show how many rows were imported and which
+    ones failed.
+    """
+    errors_shown = 100
+
+    def get(self, request):
+        return render(request, 'car_import.html', {'form': FleetImportForm()})
+
+    def post(self, request):
+        form = FleetImportForm(request.POST, request.FILES)
+        if not form.is_valid():
+            return render(request, 'car_import.html', {'form': form})
+
+        fleet_file = form.cleaned_data['fleet_file']
+        errors = []
+
+        def on_error(error):
+            if len(errors) < self.errors_shown:
+                errors.append(error)
+
+        stream = io.TextIOWrapper(fleet_file.file, encoding='utf-8-sig', errors='replace', newline='')
+        result = import_fleet(read_rows(stream, detect_format(fleet_file.name)), request.user, on_error=on_error)
+        return render(request, 'car_import.html', {
+            'form': FleetImportForm(), 'result': result, 'errors': errors,
+        })
+
+
+@alogin_required
+async def carsearch(request):
     """
     View function for searching car offers based on search terms.
 
-    The function retrieves the search term from the GET request parameters and performs a search in the database.
-    It splits the search term into brand and model terms, and then queries the `Offer` model to find matching car
-    offers. If both brand and model terms are provided, it searches for exact matches on both.
-    If only the brand term is provided, it searches for exact matches on brand or model.
-    If only the model term is provided, it searches for exact matches on model.
-    The search is case-insensitive.
+    The function retrieves the search term from the GET request parameters and looks it up in the normalized,
+    indexed search columns of `Car` (see `carservice.search.search_offers`). The phrase can name the brand,
+    the model or both, each part can be a prefix and multi-word models such as "Model 3" or "C-Class" are
+    supported. The search is case- and accent-insensitive and the best matches come first.
 
     Parameters:
         request (HttpRequest): The HTTP request object.
@@ -99,24 +145,10 @@ def carsearch(request):
 
     """
     search = request.GET.get('search')
-    offers = Offer.objects.none()
+    offers = []
 
     if search:
-        search_terms = search.split()
-        car_brand = ''
-        car_model = ''
-
-        if len(search_terms) > 0:
-            car_brand = search_terms[0]
-            if len(search_terms) > 1:
-                car_model = search_terms[1]
-
-        if car_brand and car_model:
-            offers = Offer.objects.filter(Q(car__car_brand__iexact=car_brand) & Q(car__car_model__iexact=car_model))
-        elif car_brand:
-            offers = Offer.objects.filter(Q(car__car_brand__iexact=car_brand) | Q(car__car_model__iexact=car_brand))
-        else:
-            offers = Offer.objects.filter(Q(car__car_model__iexact=car_model))
+        offers = [offer async for offer in search_offers(Offer.objects.select_related('car'), search)]
 
     context = {
         'offers': offers,
@@ -156,13 +188,14 @@ class OfferCreateView(LoginRequiredMixin, CreateView):
 
 class OfferReadView(LoginRequiredMixin, View):
     def get_queryset(self):
+        offers = Offer.objects.select_related('car')
         if self.request.user.is_superuser:
-            return Offer.objects.all()
+            return offers.all()
         else:
-            return Offer.objects.filter(user=self.request.user)
+            return offers.filter(user=self.request.user)
 
     def get(self, request):
-        offers = self.get_queryset()
+        offers = paginate(request, self.get_queryset())
 
         return render(
             request, template_name='offer_read.html',
@@ -200,29 +233,24 @@ class OfferDeleteView(LoginRequiredMixin, DeleteView):
 
 @login_required
 def rent_confirmation_pdf(request, rent_id):
-    rent = get_object_or_404(Rent, id=rent_id, user=request.user)
-
-    price_of_rent = rent.offer.price * rent.duration
-
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer)
-
-    p.setFont('Helvetica', 16)
+    rent = get_object_or_404(Rent.objects.select_related('offer__car', 'user'), id=rent_id, user=request.user)
 
-    p.drawString(100, 800, f'{rent.offer.car.car_brand} {rent.offer.car.car_model}')
-    p.drawString(100, 780, f'Rent Details for Rent ID: {rent_id}')
-    p.drawString(100, 760, f'User: {rent.user}')
-    p.drawString(100, 740, f'Rent Start: {rent.rent_start}')
-    p.drawString(100, 720, f'Duration: {rent.duration}')
-    p.drawString(100, 700, f'Rent End: {rent.rent_end}')
-    p.drawString(100, 680, f'Amount to pay: {price_of_rent} PLN.')
+    pdf_file, digest = open_confirmation(rent)
+    etag = f'"{digest}"'
 
-    p.save()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        filename = f'rent_confirmation_{rent_id}.pdf'
+        response = FileResponse(pdf_file, as_attachment=True, filename=filename)
+    else:
+        pdf_file.close()
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
-    buffer.seek(0)
-    filename = f'rent_confirmation_{rent_id}.pdf'
 
-    return FileResponse(buffer, as_attachment=True, filename=filename)
+# Tries of a booking that lost the SQLite write lock to a concurrent one before the user is asked to retry.
+BOOKING_ATTEMPTS = 2
 
 
 class RentCreateView(LoginRequiredMixin, CreateView):
@@ -238,18 +266,36 @@ class RentCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.user = self.request.user
+        for _ in range(BOOKING_ATTEMPTS):
+            try:
+                return self.book(form)
+            except OperationalError:
+                # Another booking held the database; nothing of this one was saved.
+                form.instance.pk = None
+        return self.render_to_response(self.get_context_data(
+            message='The offer is being booked by someone else right now. Please try again.',
+        ))
+
+    def book(self, form):
         offer_id = self.kwargs['offer_id']
-        offer = get_object_or_404(Offer, id=offer_id)
 
-        if offer.user == self.request.user:
-            return self.cannot_rent_own_car_response(offer)
+        # The offer row stays locked until the rent is saved, so concurrent bookings can't both pass the
+        # overlap check. SQLite ignores the lock but serializes writers, failing the second one with
+        # "database is locked" instead, which form_valid retries.
+        with transaction.atomic():
+            offer = get_object_or_404(Offer.objects.select_for_update(), id=offer_id)
 
-        if Rent.objects.filter(offer=offer, status__in=['Rent active', 'pending']).exists():
-            return self.offer_already_rented_response(offer)
+            if offer.user == self.request.user:
+                return self.cannot_rent_own_car_response(offer)
 
-        form.instance.offer = offer
+            rent_start = form.cleaned_data['rent_start']
+            rent_end = rent_end_for(rent_start, form.cleaned_data['duration'])
+            if not is_available(offer, rent_start, rent_end):
+                return self.offer_already_rented_response(offer)
 
-        return super().form_valid(form)
+            form.instance.offer = offer
+
+            return super().form_valid(form)
 
     def cannot_rent_own_car_response(self, offer):
         context = {
@@ -260,7 +306,7 @@ class RentCreateView(LoginRequiredMixin, CreateView):
 
     def offer_already_rented_response(self, offer):
         context = {
-            'message': 'This offer is already rented.',
+            'message': 'This offer is already rented in the selected dates.',
             'offer': offer,
         }
         return self.render_to_response(self.get_context_data(**context))
@@ -273,15 +319,36 @@ class RentUpdateView(LoginRequiredMixin, View):
         form = RentUpdateForm(instance=rent)
         return render(request, 'rent_update.html', {'form': form, 'rent': rent})
 
-    @staticmethod
-    def post(request, rent_id):
+    @classmethod
+    def post(cls, request, rent_id):
         rent = get_object_or_404(Rent, id=rent_id)
         form = RentUpdateForm(request.POST, instance=rent)
         if form.is_valid():
-            form.save()
-            return redirect('rent_read')
+            for _ in range(BOOKING_ATTEMPTS):
+                try:
+                    if cls.move(form):
+                        return redirect('rent_panel')
+                    form.add_error(None, 'This offer is already rented in the selected dates.')
+                    break
+                except OperationalError:
+                    pass
+            else:
+                form.add_error(None, 'The offer is being booked by someone else right now. Please try again.')
         return render(request, 'rent_update.html', {'form': form, 'rent': rent})
 
+    @staticmethod
+    def move(form):
+        # Checked and saved under the offer's lock like a new booking (see RentCreateView.book).
+        rent = form.instance
+        with transaction.atomic():
+            offer = Offer.objects.select_for_update().get(id=rent.offer_id)
+            rent_start = form.cleaned_data['rent_start']
+            rent_end = rent_end_for(rent_start, form.cleaned_data['duration'])
+            if not is_available(offer, rent_start, rent_end, exclude=rent):
+                return False
+            form.save()
+        return True
+
 
 class RentDeleteView(LoginRequiredMixin, View):
     @staticmethod
@@ -299,30 +366,36 @@ class RentDeleteView(LoginRequiredMixin, View):
         return render(request, 'rent_delete.html', {'form': form})
 
 
-@login_required
-def all_offers(request):
-    offers = Offer.objects.exclude(
-        user=request.user).exclude(rent__status='Rent active').exclude(rent__status='pending'
-                                                                       )
-    return render(request, 'all_offers.html', {'offers': offers})
+@alogin_required
+async def all_offers(request):
+    offers = filter_offers(catalogue_offers(request.user), request.GET)
+    offers = await apaginate(request, offers, ordering=('price', 'id'))
+    context = {
+        'offers': offers,
+        'cards': await aoffer_cards([offer.id for offer in offers]),
+        'facets': facet_options(request.GET, counts=await afacet_counts() or {}),
+    }
+    return render(request, 'all_offers.html', context)
 
 
-@login_required()
-def rent_panel(request):
+@alogin_required
+async def rent_panel(request):
     user = request.user
-    rents_as_owner = Rent.objects.filter(offer__user=user, close_rent=False)
-    rents_as_renter = Rent.objects.filter(user=user, close_rent=False)
-    return render(request, 'rent_panel.html', {'rents_as_owner': rents_as_owner, 'rents_as_renter': rents_as_renter})
+    rents = Rent.objects.select_related('offer__car', 'user')
+    rents_as_owner = await apaginate(request, rents.filter(offer__user=user, close_rent=False), prefix='owner_')
+    rents_as_renter = await apaginate(request, rents.filter(user=user, close_rent=False), prefix='renter_')
+    context = {'rents_as_owner': rents_as_owner, 'rents_as_renter': rents_as_renter}
+    return render(request, 'rent_panel.html', context)
 
 
 @login_required
 def rent_detail(request, rent_id):
-    rent = get_object_or_404(Rent, id=rent_id)
+    rent = get_object_or_404(Rent.objects.select_related('offer__car', 'offer__user'), id=rent_id)
     offer = rent.offer
     if request.method == 'POST':
         form = UpdateStatusForm(request.POST)
         if form.is_valid():
-            update_status(rent)
+            rent.save()
 
     if 'generate_pdf' in request.GET:
         return rent_confirmation_pdf(request, rent_id=rent.id)
@@ -330,15 +403,15 @@ def rent_detail(request, rent_id):
     return render(request, 'rent_detail.html', {'rent': rent, 'offer': offer})
 
 
-@login_required
-def offer_detail(request, offer_id):
-    offer = get_object_or_404(Offer, id=offer_id)
+@alogin_required
+async def offer_detail(request, offer_id):
+    offer = await aget_object_or_404(Offer.objects.select_related('car', 'user'), id=offer_id)
     return render(request, 'offer_detail.html', {'offer': offer})
 
 
-@login_required
-def offer_detail_search(request, offer_id):
-    offer = get_object_or_404(Offer, id=offer_id)
+@alogin_required
+async def offer_detail_search(request, offer_id):
+    offer = await aget_object_or_404(Offer.objects.select_related('car'), id=offer_id)
     return render(request, 'offer_detail_search.html', {'offer': offer})
 
 
@@ -354,7 +427,63 @@ def close_rent(request, rent_id):
 def rent_archive(request):
     user = request.user
 
-    rents_as_owner = Rent.objects.filter(offer__user=user, close_rent=True, status='Rent finished')
-    rents_as_renter = Rent.objects.filter(user=user, close_rent=True, status='Rent finished')
+    rents = Rent.objects.select_related('offer__car', 'offer__user', 'user')
+    rents_as_owner = paginate(
+        request, rents.filter(offer__user=user, close_rent=True, status='Rent finished'), prefix='owner_'
+    )
+    rents_as_renter = paginate(
+        request, rents.filter(user=user, close_rent=True, status='Rent finished'), prefix='renter_'
+    )
 
     return render(request, 'rent_archive.html', {'rents_as_owner': rents_as_owner, 'rents_as_renter': rents_as_renter})
+
+
+def media(request, path):
+    """
+    Serve an uploaded file. Content-addressed files never change under their name, so browsers and proxies
+    may cache them for a year without revalidating.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_content_addressed(path) and response.status_code == 200:
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def static_asset(request, path):
+    """
+    Serve a collected static file from STATIC_ROOT, using its precompressed brotli or gzip copy when the
+    client accepts it. Files with a content hash in their name are cacheable forever; the rest are
+    revalidated with Last-Modified.
+    """
+    try:
+        original = safe_join(settings.STATIC_ROOT, path)
+    except (SuspiciousFileOperation, ValueError):
+        raise Http404(path)
+    if not os.path.isfile(original):
+        raise Http404(path)
+
+    last_modified = os.stat(original).st_mtime
+    response = get_conditional_response(request, last_modified=int(last_modified))
+    if response is None:
+        served, encoding = precompressed_file(original, request.headers.get('Accept-Encoding', ''))
+        response = FileResponse(open(served, 'rb'), content_type=content_type(original))
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control(path)
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def metrics(request):
+    """
+    Expose the request, query and rental metrics in the Prometheus text format.
+
+    When METRICS_TOKEN is set, the scraper must send it as a bearer token. The request metrics cover every
+    worker process; the rental gauges are recomputed by one worker at most every METRICS_GAUGE_INTERVAL seconds.
+    """
+    if settings.METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get('Authorization', '').encode(), f'Bearer {settings.METRICS_TOKEN}'.encode(),
+    ):
+        return HttpResponse(status=401)
+    return HttpResponse(exposition(), content_type=CONTENT_TYPE)
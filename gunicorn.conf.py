@@ -0,0 +1,70 @@
+"""
+Gunicorn settings for serving TAKE&DRIVE in production.
+
+    gunicorn -c gunicorn.conf.py
+
+The application is imported once in the master and the workers are forked from it, so they start without
+importing Django again and share its memory until they write to it. Every worker is replaced after
+`GUNICORN_MAX_REQUESTS` requests (with some jitter, so they don't all restart at once), which bounds the memory
+a long-running worker can grow to.
+
+Environment:
+    PORT: The port to listen on (8001).
+    WEB_CONCURRENCY: The number of worker processes (2 * CPUs + 1).
+    GUNICORN_WORKER: `uvicorn` for the ASGI application or `sync` for the WSGI one. `uvicorn` by default: the
+        catalogue, offer, search and rent panel views are async and render on the event loop, while a sync
+        worker would run each of them through async_to_sync.
+    GUNICORN_THREADS: Threads per sync worker (1).
+    GUNICORN_MAX_REQUESTS: Requests served by a worker before it is replaced (1000, 0 disables it).
+    GUNICORN_MAX_REQUESTS_JITTER: The upper bound of the random number added to it (100).
+    GUNICORN_TIMEOUT: Seconds a silent worker gets before it is killed and restarted (30).
+"""
+import multiprocessing
+import os
+
+# The workers don't share memory, so their caches must live outside the process to be invalidated together,
+# and /metrics sums the request metrics every worker writes to a file.
+os.environ.setdefault("CACHE_BACKEND", "file")
+os.environ.setdefault("METRICS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "metrics"))
+
+WORKER_CLASSES = {
+    "sync": ("Carshering.wsgi:application", "sync"),
+    "uvicorn": ("Carshering.asgi:application", "uvicorn.workers.UvicornWorker"),
+}
+
+wsgi_app, worker_class = WORKER_CLASSES[os.getenv("GUNICORN_WORKER", "uvicorn")]
+bind = f"0.0.0.0:{os.getenv('PORT', 8001)}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 1))
+preload_app = True
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    # A database connection opened while preloading must not be shared by the forked workers.
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # Keep the rental gauges of /metrics and the catalogue's facet counts fresh in the background; requests only
+    # read them from the cache.
+    from carservice.facets import start_facet_refresher
+    from carservice.metrics import start_gauge_refresher
+
+    start_gauge_refresher()
+    start_facet_refresher()
+
+
+def worker_exit(server, worker):
+    # Keep the requests served since the last flush, and render the image variants still queued, when the
+    # worker is recycled or stopped.
+    from carservice import images
+    from carservice.metrics import request_store
+
+    request_store.flush()
+    images.shutdown()
@@ -5,7 +5,5 @@ class UsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "users"
 
-
-
-
-
+    def ready(self):
+        from users import signals  # noqa: F401
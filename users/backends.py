@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+UserModel = get_user_model()
+
+USER_CACHE_KEY = 'auth:user:{}'
+
+# Left out of the cache entries, which may end up on disk: the session auth hashes are kept instead.
+UNCACHED_FIELDS = ('password',)
+
+
+def user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id)
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def field_values(instance):
+    return {
+        field.attname: field.get_prep_value(getattr(instance, field.attname))
+        for field in instance._meta.concrete_fields
+        if field.attname not in UNCACHED_FIELDS
+    }
+
+
+def from_values(model, values):
+    # Missing fields are deferred, so reading them queries the database.
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+def cache_entry(user):
+    """
+    Parameters:
+        user (User): User loaded with its profile.
+
+    Returns:
+        dict: The user's and the profile's field values, without the password hash, and the session auth hashes
+        computed from it.
+    """
+    profile_field = UserModel.profile.related
+    profile = profile_field.get_cached_value(user, None)
+    return {
+        'user': field_values(user),
+        'profile': None if profile is None else field_values(profile),
+        'session_auth_hash': user.get_session_auth_hash(),
+        'session_auth_fallback_hashes': list(user.get_session_auth_fallback_hash()),
+    }
+
+
+def restore_user(entry):
+    """
+    Parameters:
+        entry (dict): Value returned by `cache_entry`.
+
+    Returns:
+        User: User with its profile, whose password is deferred. Until the password is loaded or set, the
+        session auth hashes are the cached ones.
+    """
+    user = from_values(UserModel, entry['user'])
+    profile_field = UserModel.profile.related
+    profile = None
+    if entry['profile'] is not None:
+        profile = from_values(profile_field.related_model, entry['profile'])
+        profile_field.field.set_cached_value(profile, user)
+    profile_field.set_cached_value(user, profile)
+
+    def get_session_auth_hash():
+        if 'password' in user.get_deferred_fields():
+            return entry['session_auth_hash']
+        return UserModel.get_session_auth_hash(user)
+
+    def get_session_auth_fallback_hash():
+        if 'password' in user.get_deferred_fields():
+            return iter(entry['session_auth_fallback_hashes'])
+        return UserModel.get_session_auth_fallback_hash(user)
+
+    user.get_session_auth_hash = get_session_auth_hash
+    user.get_session_auth_fallback_hash = get_session_auth_fallback_hash
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps the users of authenticated requests, with their profiles, in the cache for
+    USER_CACHE_TIMEOUT seconds, so a request doesn't query the user and the profile shown in the page header.
+
+    The cache entries hold field values rather than pickled users and leave the password hash out: only the
+    session auth hash, an HMAC of it under SECRET_KEY, is kept to verify the session.
+
+    The users/signals.py receivers evict a user when it or its profile is saved or deleted, which covers
+    profile edits, password changes (and with them the session auth hash) and deactivation.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            user = self.load_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, cache_entry(user), settings.USER_CACHE_TIMEOUT)
+        else:
+            user = restore_user(entry)
+        return user if self.user_can_authenticate(user) else None
+
+    def load_user(self, user_id):
+        try:
+            return UserModel.objects.select_related('profile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
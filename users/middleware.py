@@ -0,0 +1,31 @@
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth import get_user
+from django.contrib.auth import middleware
+from django.core.exceptions import ObjectDoesNotExist
+
+
+def resolve_user(request):
+    user = get_user(request)
+    if user.is_authenticated:
+        try:
+            # Loaded here because base.html shows the avatar and templates can't query in an async view.
+            user.profile
+        except ObjectDoesNotExist:
+            pass
+    return user
+
+
+class AuthenticationMiddleware(middleware.AuthenticationMiddleware):
+    """
+    `AuthenticationMiddleware` that loads the user (with their profile) up front for requests served through
+    ASGI.
+
+    Django already runs `process_request` of this middleware in a worker thread under ASGI, so the session and
+    the user are loaded there without another thread hop, and async views get a loaded `request.user` instead
+    of the lazy, sync-only one. Under WSGI the user stays lazy.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        if iscoroutinefunction(self):
+            request.user = resolve_user(request)
@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from carservice.images import has_variants, schedule_variants
+from carservice.storage import previous_name, remember_name, remove_reference, update_references
+from users.backends import invalidate_user
+from users.models import Profile
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Read the id now: a deleted instance has lost it by the time the transaction commits.
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+@receiver(post_init, sender=Profile)
+def profile_loaded(sender, instance, **kwargs):
+    remember_name(instance, 'image')
+
+
+@receiver(pre_save, sender=Profile)
+def remember_profile_image(sender, instance, raw=False, **kwargs):
+    instance._previous_image = previous_name(sender, instance, 'image', raw)
+
+
+@receiver(post_save, sender=Profile)
+def profile_image_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_references(instance._previous_image, instance.image.name)
+    remember_name(instance, 'image')
+    if instance.image and not has_variants(instance.image.name):
+        schedule_variants(instance.image.name)
+
+
+@receiver(post_delete, sender=Profile)
+def profile_deleted(sender, instance, **kwargs):
+    remove_reference(instance.image.name)